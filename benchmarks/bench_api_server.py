@@ -0,0 +1,101 @@
+"""
+Measure requests per second served by the OpenAI-compatible API server over
+real keep-alive HTTP connections, against the local fake chat model.
+
+Run with: python -m benchmarks.bench_api_server [--clients N] [--requests N]
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from personal_chatbot.api_server import ChatCompletionsServer
+from personal_chatbot.fake_llm import register_fake_provider
+from personal_chatbot.history_store import ChatHistoryStore
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(engine):
+    port = free_port()
+    app = ChatCompletionsServer(engine, ChatHistoryStore(":memory:")).app
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def drive(base_url, clients, requests, stream):
+    """
+    Send requests from each client, one at a time on its own conversation,
+    over a shared pool of keep-alive connections.
+    """
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+
+        async def client(index):
+            headers = {"X-Conversation-ID": f"bench-{index}"}
+            for _ in range(requests):
+                body = {
+                    "messages": [{"role": "user", "content": "ping"}],
+                    "stream": stream,
+                }
+                if stream:
+                    async with http.stream(
+                        "POST", "/v1/chat/completions", json=body, headers=headers
+                    ) as response:
+                        async for _ in response.aiter_lines():
+                            pass
+                else:
+                    response = await http.post(
+                        "/v1/chat/completions", json=body, headers=headers
+                    )
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(clients)))
+        return time.perf_counter() - start
+
+
+def run(engine, clients, requests):
+    server, thread, base_url = start_server(engine)
+    try:
+        results = {}
+        for mode, stream in (("json", False), ("sse", True)):
+            elapsed = asyncio.run(drive(base_url, clients, requests, stream))
+            results[mode] = {
+                "seconds": elapsed,
+                "requests_per_second": clients * requests / elapsed,
+            }
+        return {"clients": clients, "requests_per_client": requests, **results}
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = register_fake_provider("Fake-instant", context_window=None)
+    print(json.dumps(run(engine, args.clients, args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare system prompt / temperature switch latency and first-request latency
+when every switch rebuilds the LLMChainManager (the old behaviour) versus
+reconfiguring it in place with pooled clients.
+
+Run with: python -m benchmarks.bench_client_pool [--engine NAME] [--switches N]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from personal_chatbot.client_pool import CLIENT_POOL
+from personal_chatbot.fake_llm import register_fake_provider
+from personal_chatbot.llm_chain_manager import LLMChainManager
+
+# Simulated DNS + TLS setup paid by a client's first request
+CONNECT_LATENCY = 0.05
+
+
+def build_manager(engine, system_prompt, temperature):
+    manager = LLMChainManager(system_prompt=system_prompt, temperature=temperature)
+    manager.init_llm(engine)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+def first_request(manager):
+    start = time.perf_counter()
+    for _ in manager.stream("ping"):
+        pass
+    return time.perf_counter() - start
+
+
+def run(engine, switches):
+    prompts = [f"System prompt {i}" for i in range(switches)]
+    results = {"rebuild": {"switch": [], "first_request": []}}
+    results["reconfigure"] = {"switch": [], "first_request": []}
+
+    for i, prompt in enumerate(prompts):
+        CLIENT_POOL.clear()  # the old code built a fresh client every time
+        start = time.perf_counter()
+        manager = build_manager(engine, prompt, i % 2)
+        results["rebuild"]["switch"].append(time.perf_counter() - start)
+        results["rebuild"]["first_request"].append(first_request(manager))
+
+    manager = build_manager(engine, prompts[0], 0)
+    first_request(manager)
+    for i, prompt in enumerate(prompts):
+        start = time.perf_counter()
+        manager.set_system_prompt(prompt)
+        manager.set_temperature(i % 2)
+        results["reconfigure"]["switch"].append(time.perf_counter() - start)
+        results["reconfigure"]["first_request"].append(first_request(manager))
+
+    return {
+        mode: {name: statistics.median(values) for name, values in timings.items()}
+        for mode, timings in results.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engine", default=None, help="LLM_PROVIDERS entry")
+    parser.add_argument("--switches", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = args.engine or register_fake_provider(connect_latency=CONNECT_LATENCY)
+    print(json.dumps(run(engine, args.switches), indent=2))
+
+
+if __name__ == "__main__":
+    main()
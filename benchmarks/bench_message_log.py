@@ -0,0 +1,110 @@
+"""
+Compare the memory held by a long session when the UI keeps its own list of
+formatted strings next to the LLM memory's message objects (the old behaviour)
+versus one MessageLog read through views.
+
+Run with: python -m benchmarks.bench_message_log [--turns N] [--spill-dir DIR]
+"""
+
+import argparse
+import gc
+import json
+import tempfile
+import tracemalloc
+from collections import deque
+
+from langchain.schema import AIMessage, HumanMessage
+from langchain_core.chat_history import InMemoryChatMessageHistory
+
+from personal_chatbot.memory import TokenBudgetMemory, count_tokens
+from personal_chatbot.message_log import MessageLog
+
+# History budget of a mid-sized context window, as for the hosted providers
+MAX_TOKENS = 4000
+
+
+def exchange(turn):
+    user_input = f"Question {turn}: how does pandas groupby work with several keys?"
+    response = f"Answer {turn}: " + "groupby splits the frame into groups. " * 10
+    return user_input, response
+
+
+def measure(run_session):
+    """
+    Return the bytes still allocated after run_session, which returns the
+    objects the session keeps alive.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    session = run_session()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del session
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def legacy_session(turns):
+    chat_history = []
+    memory = InMemoryChatMessageHistory()
+    token_counts = deque()
+    for turn in range(turns):
+        user_input, response = exchange(turn)
+        chat_history.append(f"USER: {user_input}")
+        chat_history.append(f"AI: {response}")
+        memory.add_messages(
+            [HumanMessage(content=user_input), AIMessage(content=response)]
+        )
+        token_counts.extend((count_tokens(user_input), count_tokens(response)))
+        # The old window memory deleted its trimmed messages from the list
+        evicted = 0
+        while len(token_counts) > 2 and sum(token_counts) > MAX_TOKENS:
+            token_counts.popleft()
+            evicted += 1
+        del memory.messages[:evicted]
+    return chat_history, memory
+
+
+def message_log_session(turns, spill_dir=None):
+    spill_path = f"{spill_dir}/bench.jsonl" if spill_dir else None
+    log = MessageLog(spill_path=spill_path)
+    memory = TokenBudgetMemory(chat_memory=log, max_tokens=MAX_TOKENS)
+    for turn in range(turns):
+        user_input, response = exchange(turn)
+        memory.save_context({"human_input": user_input}, {"text": response})
+    return memory, log.lines({"user": "USER: ", "ai": "AI: "})
+
+
+def run(turns, spill_dir=None):
+    results = {
+        "legacy": measure(lambda: legacy_session(turns)),
+        "message_log": measure(lambda: message_log_session(turns, spill_dir)),
+    }
+    return {
+        "turns": turns,
+        **{f"{name}_bytes": allocated for name, allocated in results.items()},
+        **{
+            f"{name}_bytes_per_turn": allocated / turns
+            for name, allocated in results.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=10000)
+    parser.add_argument(
+        "--spill-dir", help="spill old turns here (default: a temp dir)"
+    )
+    args = parser.parse_args()
+
+    if args.spill_dir:
+        print(json.dumps(run(args.turns, args.spill_dir), indent=2))
+    else:
+        with tempfile.TemporaryDirectory() as spill_dir:
+            print(json.dumps(run(args.turns, spill_dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
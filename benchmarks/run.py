@@ -0,0 +1,212 @@
+"""
+Offline benchmark suite measuring the app's own overhead against the local fake
+chat model, written as JSON so results can be compared between commits.
+
+Run with: python -m benchmarks.run [--output FILE] [--compare FILE] [--quick]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from benchmarks import bench_api_server, bench_client_pool, bench_message_log
+from personal_chatbot.fake_llm import register_fake_provider
+from personal_chatbot.llm_chain_manager import LLMChainManager
+from personal_chatbot.prompts_managers import SystemPromptSelector, UserPromptSelector
+
+# Relative slowdown reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.2
+
+
+def build_manager(engine, system_prompt="You are a helpful assistant."):
+    manager = LLMChainManager(system_prompt=system_prompt, temperature=0.5)
+    manager.init_llm(engine)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def bench_chain_construction(engine, repeat):
+    return {"seconds": timed(lambda: build_manager(engine), repeat)}
+
+
+def bench_turn_overhead(engine, history_lengths):
+    """
+    Median time of one turn against a zero-latency model, by history length.
+    """
+    results = {}
+    for turns in history_lengths:
+        manager = build_manager(engine)
+        for i in range(turns):
+            manager.memory.save_context({"human_input": f"q{i}"}, {"text": f"a{i}"})
+        results[str(turns)] = timed(lambda: list(manager.stream("ping")), 5)
+    return results
+
+
+def bench_session_memory(engine, turns):
+    """
+    Bytes allocated by one session after the given number of turns.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    manager = build_manager(engine)
+    for _ in range(turns):
+        list(manager.stream("How does pandas groupby work?"))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return {"turns": turns, "bytes": allocated, "bytes_per_turn": allocated / turns}
+
+
+def bench_prompt_library_load(repeat):
+    return {
+        "seconds": timed(lambda: (SystemPromptSelector(), UserPromptSelector()), repeat)
+    }
+
+
+def bench_gradio_throughput(engine, sessions):
+    """
+    Requests per second served by GradioChatbot.send_message across sessions.
+    """
+    from personal_chatbot.chatbot_gr import GradioChatbot
+    from personal_chatbot.history_store import ChatHistoryStore
+
+    chatbot = GradioChatbot(history_store=ChatHistoryStore(":memory:"))
+
+    async def converse(session_id):
+        request = SimpleNamespace(session_hash=session_id)
+        chatbot.choose_engine(engine, request)
+        async for _ in chatbot.send_message("ping", request):
+            pass
+
+    async def run_all():
+        await asyncio.gather(*(converse(f"s{i}") for i in range(sessions)))
+
+    start = time.perf_counter()
+    asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "seconds": elapsed,
+        "requests_per_second": sessions / elapsed,
+    }
+
+
+def run_suite(quick=False):
+    instant = register_fake_provider("Fake-instant", context_window=None)
+    slow = register_fake_provider(
+        "Fake-slow", latency=0.1, tokens_per_second=200, context_window=None
+    )
+    repeat = 3 if quick else 20
+    return {
+        "chain_construction": bench_chain_construction(instant, repeat),
+        "turn_overhead": bench_turn_overhead(
+            instant, (0, 10, 50) if quick else (0, 10, 100, 1000)
+        ),
+        "session_memory": bench_session_memory(instant, 10 if quick else 200),
+        "prompt_library_load": bench_prompt_library_load(repeat),
+        "gradio_throughput": bench_gradio_throughput(slow, 4 if quick else 32),
+        "client_pool_switch": bench_client_pool.run(
+            register_fake_provider(
+                "Fake-connecting", connect_latency=bench_client_pool.CONNECT_LATENCY
+            ),
+            3 if quick else 20,
+        ),
+        "message_log_memory": bench_message_log_memory(1000 if quick else 10000),
+        "api_server_throughput": bench_api_server.run(
+            instant, 4 if quick else 32, 5 if quick else 20
+        ),
+    }
+
+
+def bench_message_log_memory(turns):
+    with tempfile.TemporaryDirectory() as spill_dir:
+        return bench_message_log.run(turns, spill_dir)
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def compare(current, previous, threshold=REGRESSION_THRESHOLD):
+    """
+    Return the metrics that got worse by more than the threshold. Throughput
+    metrics regress when they drop, everything else when it grows.
+    """
+    regressions = {}
+    old = flatten(previous["results"])
+    for name, value in flatten(current["results"]).items():
+        if name not in old or not old[name] or not isinstance(value, (int, float)):
+            continue
+        change = (value - old[name]) / old[name]
+        if name.endswith("per_second"):
+            change = -change
+        if change > threshold:
+            regressions[name] = {"previous": old[name], "current": value}
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "quick": args.quick,
+        "results": run_suite(args.quick),
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(json.dumps(report["results"], indent=2))
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(report, json.load(file))
+        if regressions:
+            print(json.dumps({"regressions": regressions}, indent=2))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,8 +21,44 @@ def start_gradio_interface():
     chatbot.launch()
 
 
+def start_api_server(argv):
+    """Serve an OpenAI-compatible chat completions API without a UI."""
+    from personal_chatbot.api_server import main
+
+    return main(argv)
+
+
+def start_workers(argv):
+    """Run several Gradio or API server processes sharing their sessions."""
+    from personal_chatbot.launcher import main
+
+    return main(argv)
+
+
+def start_batch_mode(argv):
+    """Run a system prompt over many inputs without a UI."""
+    from personal_chatbot.batch import main
+
+    return main(argv)
+
+
+def start_prompts_command(argv):
+    """Import or export a prompt library as JSON."""
+    from personal_chatbot.prompts_managers import main
+
+    return main(argv)
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "gradio":
         start_gradio_interface()
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        sys.exit(start_api_server(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "workers":
+        sys.exit(start_workers(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(start_batch_mode(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "prompts":
+        sys.exit(start_prompts_command(sys.argv[2:]))
     else:
         start_tk_interface()
@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .history_store import ChatHistoryStore
+from .llm_chain_manager import LLM_PROVIDERS
+from .prompts_managers import SystemPromptSelector
+from .session_backend import open_session_backend
+from .sessions import ChatSession, SessionStore
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+# Seconds an idle client connection is kept open for its next request
+KEEP_ALIVE = 75
+# Request header (or "conversation_id" body field) naming a server-side
+# conversation; requests without one are answered from their own messages
+CONVERSATION_HEADER = "x-conversation-id"
+
+
+def api_error(status_code, message, error_type="invalid_request_error"):
+    return JSONResponse(
+        {"error": {"message": message, "type": error_type}}, status_code=status_code
+    )
+
+
+def completion_chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def text_content(content):
+    """
+    Return the text of an OpenAI message content, a string or a list of parts.
+    """
+    if isinstance(content, list):
+        return "".join(
+            part.get("text", "") for part in content if isinstance(part, dict)
+        )
+    return content if isinstance(content, str) else ""
+
+
+class ChatCompletionsServer:
+    """
+    OpenAI-compatible chat completions over LLMChainManager. Models are the
+    named system prompts, optionally followed by "@" and an LLM_PROVIDERS entry
+    (e.g. "code_clarifier@Groq-llama3"). Requests carrying a conversation id
+    continue that conversation's memory and send only their newest user
+    message; other requests are answered from the messages they carry. With a
+    session backend, conversations continue on whichever worker process gets
+    their next request.
+    """
+
+    def __init__(self, engine, history_store=None, session_backend=None):
+        self.engine = engine
+        self.system_prompts_manager = SystemPromptSelector()
+        self.history_store = history_store or ChatHistoryStore()
+        if session_backend is None:
+            session_backend = open_session_backend()
+        self.sessions = SessionStore(self._new_session, session_backend)
+        # Conversation id -> [lock, number of requests holding or awaiting it]
+        self._locks = {}
+        self.app = self.create_app()
+
+    def _new_session(self, session_id):
+        return ChatSession(session_id=session_id, system_prompt=None, temperature=None)
+
+    def resolve_model(self, model):
+        """
+        Return (engine, system prompt name, temperature, system prompt) for a
+        model name, or None if either part is unknown.
+        """
+        name, _, engine = (model or "default").partition("@")
+        engine = engine or self.engine
+        prompts = self.system_prompts_manager.get_prompts()
+        if engine not in LLM_PROVIDERS or name not in prompts:
+            return None
+        temperature, system_prompt = prompts[name]
+        return engine, name, temperature, system_prompt
+
+    def list_models(self):
+        created = int(time.time())
+        return {
+            "object": "list",
+            "data": [
+                {"id": name, "object": "model", "created": created, "owned_by": "local"}
+                for name in self.system_prompts_manager.names()
+            ],
+        }
+
+    def prepare_session(self, conversation_id, engine, temperature, system_prompt):
+        """
+        Return the conversation's session set up for the request, continuing the
+        stored conversation the first time the id is seen.
+        """
+        session = self.sessions.get(conversation_id)
+        if session.llm_chain_manager is None or session.engine != engine:
+            session.engine = engine
+            session.system_prompt = system_prompt
+            session.temperature = temperature
+            session.init_llm_chain_manager()
+            if not session.message_log.records:
+                session.resume(self.history_store, conversation_id)
+        else:
+            session.system_prompt = system_prompt
+            session.temperature = temperature
+            session.reconfigure()
+        return session
+
+    @contextlib.asynccontextmanager
+    async def conversation_lock(self, conversation_id):
+        """
+        Hold the conversation's lock, so its turns run one at a time and keep
+        its memory in order. The lock is dropped once no request needs it.
+        """
+        entry = self._locks.setdefault(conversation_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[conversation_id]
+
+    def stateless_session(self, engine, temperature, system_prompt, history):
+        """
+        Return a throwaway session whose memory holds the request's earlier
+        user/assistant exchanges.
+        """
+        session = ChatSession(
+            session_id=f"api-{uuid.uuid4().hex}",
+            system_prompt=system_prompt,
+            temperature=temperature,
+            engine=engine,
+        )
+        session.init_llm_chain_manager()
+        pending = None
+        for message in history:
+            if message["role"] == "user":
+                pending = message["content"]
+            elif message["role"] == "assistant" and pending is not None:
+                session.llm_chain_manager.memory.add_turn(pending, message["content"])
+                pending = None
+        return session
+
+    async def chat_completions(self, request: Request):
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return api_error(400, "The request body is not valid JSON.")
+        if not isinstance(body, dict):
+            return api_error(400, "The request body must be a JSON object.")
+        model = body.get("model") or "default"
+        if not isinstance(model, str):
+            return api_error(400, "model must be a string.")
+        resolved = self.resolve_model(model)
+        if resolved is None:
+            return api_error(404, f"Unknown model: {model}", "model_not_found")
+        engine, name, temperature, system_prompt = resolved
+
+        raw_messages = body.get("messages") or []
+        if not isinstance(raw_messages, list) or not all(
+            isinstance(message, dict) for message in raw_messages
+        ):
+            return api_error(400, "messages must be a list of message objects.")
+        messages = [
+            {
+                "role": message.get("role"),
+                "content": text_content(message.get("content")),
+            }
+            for message in raw_messages
+        ]
+        if not messages or messages[-1]["role"] != "user":
+            return api_error(400, "The last message must be a user message.")
+        user_input = messages[-1]["content"]
+        system_messages = [m["content"] for m in messages if m["role"] == "system"]
+        if system_messages:
+            system_prompt = "\n\n".join(system_messages)
+        if body.get("temperature") is not None:
+            try:
+                temperature = min(max(float(body["temperature"]), 0.0), 1.0)
+            except (TypeError, ValueError):
+                return api_error(400, "temperature must be a number.")
+
+        conversation_id = request.headers.get(CONVERSATION_HEADER) or body.get(
+            "conversation_id"
+        )
+        if conversation_id is not None and not isinstance(conversation_id, str):
+            return api_error(400, "conversation_id must be a string.")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        usage = {}
+
+        async def answer():
+            lock = (
+                self.conversation_lock(conversation_id)
+                if conversation_id
+                else contextlib.nullcontext()
+            )
+            async with lock:
+                if conversation_id:
+                    session = self.prepare_session(
+                        conversation_id, engine, temperature, system_prompt
+                    )
+                else:
+                    session = self.stateless_session(
+                        engine, temperature, system_prompt, messages[:-1]
+                    )
+                chunks = []
+                async for chunk in session.llm_chain_manager.astream(user_input):
+                    chunks.append(chunk)
+                    yield chunk
+                if conversation_id:
+                    self.history_store.append_exchange(
+                        conversation_id, user_input, "".join(chunks)
+                    )
+                    self.sessions.save(conversation_id)
+                usage.update(session.llm_chain_manager.last_usage)
+
+        if body.get("stream"):
+            return StreamingResponse(
+                self.stream_events(answer(), completion_id, name),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+        try:
+            response = "".join([chunk async for chunk in answer()])
+        except Exception as e:
+            return api_error(502, str(e) or repr(e), "provider_error")
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": name,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": response},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    async def stream_events(self, chunks, completion_id, model):
+        """
+        Yield the answer as server-sent chat.completion.chunk events ending with
+        [DONE]. A provider failure is sent as an error event.
+        """
+
+        def event(data):
+            return f"data: {json.dumps(data)}\n\n"
+
+        yield event(completion_chunk(completion_id, model, {"role": "assistant"}))
+        try:
+            async for chunk in chunks:
+                yield event(completion_chunk(completion_id, model, {"content": chunk}))
+        except Exception as e:
+            yield event(
+                {"error": {"message": str(e) or repr(e), "type": "provider_error"}}
+            )
+        else:
+            yield event(completion_chunk(completion_id, model, {}, "stop"))
+        yield "data: [DONE]\n\n"
+
+    def create_app(self):
+        app = FastAPI(title="Personal Chatbot API")
+        app.add_api_route("/v1/models", self.list_models, methods=["GET"])
+        app.add_api_route(
+            "/v1/chat/completions", self.chat_completions, methods=["POST"]
+        )
+        return app
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Serve an OpenAI-compatible /v1/chat/completions API.",
+    )
+    parser.add_argument("--engine", required=True, choices=sorted(LLM_PROVIDERS))
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--keep-alive", type=int, default=KEEP_ALIVE, help="idle connection seconds"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = ChatCompletionsServer(args.engine)
+    uvicorn.run(
+        server.app,
+        host=args.host,
+        port=args.port,
+        timeout_keep_alive=args.keep_alive,
+    )
+    return 0
@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import csv
+import functools
+import glob
+import json
+import os
+import sys
+import time
+
+from .llm_chain_manager import LLM_PROVIDERS, SCHEDULER, LLMChainManager
+from .prompts_managers import SystemPromptSelector, UserPromptSelector
+from .templates import keyed_rows
+
+# Requests in flight at once unless --concurrency says otherwise
+DEFAULT_CONCURRENCY = 4
+
+
+def iter_inputs(source, field="input", id_field="id"):
+    """
+    Lazily yield (id, text) pairs from a JSONL file, a CSV file, a directory or
+    glob of text files, or a plain text file with one input per line.
+    """
+    if os.path.isdir(source) or glob.has_magic(source):
+        pattern = os.path.join(source, "*") if os.path.isdir(source) else source
+        for path in sorted(glob.glob(pattern)):
+            if os.path.isfile(path):
+                with open(path) as file:
+                    yield path, file.read()
+    elif source.endswith(".jsonl"):
+        with open(source) as file:
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    record = json.loads(line)
+                    yield str(record.get(id_field, number)), record[field]
+    elif source.endswith(".csv"):
+        with open(source, newline="") as file:
+            for number, row in enumerate(csv.DictReader(file), 1):
+                yield str(row.get(id_field) or number), row[field]
+    else:
+        with open(source) as file:
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    yield str(number), line.rstrip("\n")
+
+
+def iter_rows(source):
+    """
+    Lazily yield the records of a CSV or JSONL file as dicts.
+    """
+    with open(source, newline="") as file:
+        if source.endswith(".csv"):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def completed_ids(output):
+    """
+    Return the ids already answered without error in an earlier run.
+    """
+    done = set()
+    if os.path.exists(output):
+        with open(output) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interruption
+                if not record.get("error"):
+                    done.add(record["id"])
+    return done
+
+
+async def run_batch(
+    manager,
+    inputs,
+    output,
+    concurrency=DEFAULT_CONCURRENCY,
+    progress=None,
+    render=None,
+):
+    """
+    Answer every input not already in the output file and append one JSON line
+    per result as soon as it arrives. Returns (answered, failed, skipped).
+
+    render, if given, turns each input into the prompt text, e.g. a template
+    filling a CSV row; an input it rejects is recorded as failed like a provider
+    error, and the batch goes on.
+
+    Requests are paced by the provider's rate limits in the shared SCHEDULER,
+    and queue fairly with interactive sessions using the same provider.
+    """
+    done = completed_ids(output)
+    inputs = iter(inputs)
+    counts = {"answered": 0, "failed": 0, "skipped": 0}
+
+    with open(output, "a+") as file:
+        if file.tell():
+            # Terminate a line cut short by an interruption before appending
+            file.seek(file.tell() - 1)
+            if file.read(1) != "\n":
+                file.write("\n")
+
+        async def worker():
+            for input_id, text in inputs:
+                if input_id in done:
+                    counts["skipped"] += 1
+                    continue
+                start = time.perf_counter()
+                record = {"id": input_id, "input": text}
+                try:
+                    if render is not None:
+                        text = record["input"] = render(text)
+                    record["output"] = await manager.asend(text, commit=False)
+                    counts["answered"] += 1
+                except Exception as e:
+                    record["error"] = repr(e)
+                    counts["failed"] += 1
+                record["latency"] = time.perf_counter() - start
+                record["provider"] = manager.provider
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+                if progress:
+                    progress(counts)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return counts["answered"], counts["failed"], counts["skipped"]
+
+
+def build_manager(engine, system_prompt_name):
+    temperature, system_prompt = SystemPromptSelector().get_prompts()[
+        system_prompt_name
+    ]
+    manager = LLMChainManager(system_prompt=system_prompt, temperature=temperature)
+    manager.session_id = "batch"
+    manager.init_llm(engine)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="Apply a system prompt to many inputs and write JSONL results.",
+    )
+    parser.add_argument("--engine", required=True, choices=sorted(LLM_PROVIDERS))
+    parser.add_argument("--system-prompt", default="default")
+    parser.add_argument(
+        "--input", required=True, help="JSONL, CSV, text file, directory or glob"
+    )
+    parser.add_argument("--output", required=True, help="JSONL file, appended to")
+    parser.add_argument(
+        "--template",
+        help="user prompt whose [PLACEHOLDERS] are filled from each CSV/JSONL row",
+    )
+    parser.add_argument("--field", default="input", help="JSONL/CSV input field")
+    parser.add_argument("--id-field", default="id", help="JSONL/CSV id field")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--rpm", type=float, default=None, help="requests/minute")
+    parser.add_argument("--tpm", type=float, default=None, help="tokens/minute")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    provider_config = LLM_PROVIDERS[args.engine]
+    concurrency = args.concurrency or provider_config.get(
+        "max_concurrency", DEFAULT_CONCURRENCY
+    )
+    if args.rpm or args.tpm:
+        SCHEDULER.configure(
+            args.engine,
+            args.rpm or provider_config.get("requests_per_minute"),
+            args.tpm or provider_config.get("tokens_per_minute"),
+        )
+    manager = build_manager(args.engine, args.system_prompt)
+    render = None
+    if args.template:
+        template = UserPromptSelector().template(args.template)
+        render = functools.partial(template.render, strict=True)
+        inputs = keyed_rows(iter_rows(args.input), args.id_field)
+    else:
+        inputs = iter_inputs(args.input, args.field, args.id_field)
+
+    def progress(counts):
+        print(
+            "\ranswered {answered}, failed {failed}, skipped {skipped}".format(
+                **counts
+            ),
+            end="",
+            file=sys.stderr,
+        )
+
+    answered, failed, skipped = asyncio.run(
+        run_batch(
+            manager,
+            inputs,
+            args.output,
+            concurrency=concurrency,
+            progress=progress,
+            render=render,
+        )
+    )
+    print(
+        f"\nDone: {answered} answered, {failed} failed, {skipped} already done.",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
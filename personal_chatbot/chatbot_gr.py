@@ -1,27 +1,56 @@
 import gradio as gr
 
-from .llm_chain_manager import LLM_PROVIDERS, LLMChainManager
-from .prompts_managers import (
-    ChatHistoryPrompts,
-    SystemPromptSelector,
-    UserPromptSelector,
+from .compare import format_stats
+from .history_store import ChatHistoryStore
+from .llm_chain_manager import LLM_PROVIDERS, METRICS, SCHEDULER, Configuration
+from .prompts_managers import SystemPromptSelector, UserPromptSelector
+from .search import search_all
+from .session_backend import open_session_backend
+from .sessions import ChatSession, SessionStore
+
+# Percentile columns of the stats panel, in seconds
+STATS_COLUMNS = (
+    "latency_p50",
+    "latency_p95",
+    "latency_p99",
+    "time_to_first_token_p50",
+    "time_to_first_token_p95",
+    "queue_wait_p95",
+)
+
+# Fill-in fields available to a user prompt template; placeholders beyond these
+# stay in the text for hand editing
+TEMPLATE_FIELDS = 8
+
+# Columns of the rate limit panel, after the provider name
+RATE_LIMIT_COLUMNS = (
+    "queue_depth",
+    "granted",
+    "retries",
+    "throttled",
+    "wait_p50",
+    "wait_p95",
+    "wait_max",
 )
 
 
 class GradioChatbot:
-    def __init__(self):
+    def __init__(
+        self, concurrency_limit=None, history_store=None, session_backend=None
+    ):
         self.user_prompts_manager = UserPromptSelector()
         self.custom_system_prompts_manager = SystemPromptSelector()
-        self.chat_history_manager = ChatHistoryPrompts()
+        self.history_store = history_store or ChatHistoryStore()
 
-        self.system_prompt_options = list(
-            self.custom_system_prompts_manager.get_prompts().keys()
-        )
-        self.user_prompt_options = list(self.user_prompts_manager.get_prompts().keys())
+        self.system_prompt_options = self.custom_system_prompts_manager.names()
+        self.user_prompt_options = self.user_prompts_manager.names()
+
+        # Both libraries live in the prompt store, which keeps their search index
+        self.prompt_store = self.custom_system_prompts_manager.store
 
-        self.engine = None
-        self.chat_history = []
-        self.llm_chain_manager = None
+        # Number of send events Gradio runs at once; None means unlimited, leaving
+        # the per-provider "max_concurrency" limits in LLM_PROVIDERS in charge
+        self.concurrency_limit = concurrency_limit
 
         self.default_system_prompt_key = "default"
         (
@@ -31,89 +60,249 @@ class GradioChatbot:
             self.default_system_prompt_key
         ]
 
-    def init_llm_chain_manager(self):
-        self.llm_chain_manager = LLMChainManager(
-            system_prompt=self.system_prompt,
-            temperature=self.temperature,
+        # Every browser session gets its own engine, settings and conversation,
+        # shared with the other worker processes through the session backend
+        if session_backend is None:
+            session_backend = open_session_backend()
+        self.sessions = SessionStore(
+            lambda session_id: ChatSession(
+                session_id=session_id,
+                system_prompt=self.system_prompt,
+                temperature=self.temperature,
+            ),
+            session_backend,
         )
-        self.llm_chain_manager.init_llm(self.engine)
-        self.llm_chain_manager.init_prompt()
-        self.llm_chain_manager.init_memory()
-        self.llm_chain_manager.init_llm_chain()
-
-    def choose_engine(self, engine):
-        self.engine = engine
-        self.init_llm_chain_manager()
+
+    def session_key(self, request):
+        return getattr(request, "session_hash", None) or "default"
+
+    def get_session(self, request):
+        """
+        Return the ChatSession of the browser session behind the request.
+        """
+        return self.sessions.get(self.session_key(request))
+
+    def save_session(self, request):
+        """
+        Share the session's changes with the other worker processes.
+        """
+        self.sessions.save(self.session_key(request))
+
+    def drop_session(self, request: gr.Request):
+        self.sessions.drop(self.session_key(request))
+
+    def choose_engine(self, engine, request: gr.Request):
+        session = self.get_session(request)
+        session.engine = engine
+        session.init_llm_chain_manager()
+        self.save_session(request)
         return f"Engine set to: {engine}"
 
-    def change_system_prompt(self, new_prompt):
+    async def warm_up_engine(self, request: gr.Request):
+        """
+        Connect to the session's engine and check its credentials before the
+        first message, reporting a bad key or unreachable server right away.
+        """
+        session = self.get_session(request)
+        if not Configuration.WARMUP or session.llm_chain_manager is None:
+            return f"Engine set to: {session.engine}"
+        try:
+            seconds = await session.llm_chain_manager.awarm_up()
+        except Exception as e:
+            return f"Error: Engine {session.engine} is not reachable: {str(e)}"
+        return f"Engine set to: {session.engine} (ready in {seconds:.1f} s)"
+
+    def change_system_prompt(self, new_prompt, request: gr.Request):
         if new_prompt:
-            self.system_prompt = new_prompt
-            self.init_llm_chain_manager()
-            self.clear_memory()
+            session = self.get_session(request)
+            session.system_prompt = new_prompt
+            session.reconfigure()
+            self.clear_memory(request)
             return "System prompt updated successfully."
         else:
             return "Error: System prompt cannot be empty."
 
-    def set_system_prompt(self, selected_prompt):
+    def set_system_prompt(self, selected_prompt, request: gr.Request):
+        session = self.get_session(request)
         (
-            self.temperature,
-            self.system_prompt,
+            session.temperature,
+            session.system_prompt,
         ) = self.custom_system_prompts_manager.get_prompts()[selected_prompt]
-        self.init_llm_chain_manager()
-        self.clear_memory()
+        session.reconfigure()
+        self.clear_memory(request)
         return (
             f"System prompt set to: {selected_prompt}",
-            str(self.temperature),
-            self.system_prompt,
+            str(session.temperature),
+            session.system_prompt,
         )
 
     def set_user_prompt(self, selected_prompt):
+        """
+        Return the prompt text followed by one fill-in field update per
+        placeholder of the prompt, hiding the unused fields.
+        """
         prompt_text = self.user_prompts_manager.get_prompts()[selected_prompt]
-        return prompt_text
+        variables = self.user_prompts_manager.template(selected_prompt).variables
+        fields = [
+            gr.update(visible=True, label=name, value="")
+            for name in variables[:TEMPLATE_FIELDS]
+        ]
+        fields += [gr.update(visible=False)] * (TEMPLATE_FIELDS - len(fields))
+        return [prompt_text, *fields]
+
+    def fill_template(self, selected_prompt, *values):
+        """
+        Render the selected user prompt with the values of the fill-in fields.
+        """
+        if not selected_prompt:
+            return gr.update()
+        template = self.user_prompts_manager.template(selected_prompt)
+        return template.render(dict(zip(template.variables, values)))
 
-    def change_temperature(self, new_temperature):
+    def change_temperature(self, new_temperature, request: gr.Request):
         try:
             new_temperature = float(new_temperature)
             if 0 <= new_temperature <= 1:
-                self.temperature = new_temperature
-                self.llm_chain_manager.init_llm(self.engine)
-                self.llm_chain_manager.init_llm_chain()
+                session = self.get_session(request)
+                session.temperature = new_temperature
+                session.reconfigure()
+                self.save_session(request)
                 return "Temperature updated successfully."
             else:
                 return "Error: Temperature must be between 0 and 1."
         except ValueError:
             return "Error: Invalid input. Please enter a valid number."
 
-    def send_message(self, user_input):
+    async def send_message(self, user_input, request: gr.Request):
         if user_input:
+            session = self.get_session(request)
             try:
-                response = self.llm_chain_manager.llm_chain.predict(
-                    human_input=user_input
+                chunks = []
+                async for chunk in session.llm_chain_manager.astream(user_input):
+                    chunks.append(chunk)
+                    yield f"USER: {user_input}\nAI: {''.join(chunks)}"
+                response = "".join(chunks)
+                self.history_store.append_exchange(
+                    session.session_id, user_input, response
                 )
-                self.chat_history.append(f"USER: {user_input}")
-                self.chat_history.append(f"AI: {response}")
-                return "\n".join(self.chat_history[-2:])
+                self.save_session(request)
+                router = session.llm_chain_manager.router
+                if session.llm_chain_manager.last_response_cached:
+                    yield f"USER: {user_input}\nAI [cached]: {response}"
+                elif router and router.last_provider != session.engine:
+                    yield f"USER: {user_input}\nAI [{router.last_provider}]: {response}"
+                else:
+                    yield "\n".join(session.chat_history[-2:])
             except Exception as e:
-                return f"Error: An error occurred: {str(e)}"
+                yield f"Error: An error occurred: {str(e)}"
         else:
-            return "Error: User input cannot be empty."
+            yield "Error: User input cannot be empty."
 
-    def clear_memory(self):
-        self.llm_chain_manager.memory.clear()
-        self.chat_history = []
+    async def compare_providers(self, providers, user_input, request: gr.Request):
+        """
+        Send the input to every selected provider at once and stream the answers
+        into one column per provider, each followed by its latency and tokens.
+        """
+        columns = sorted(LLM_PROVIDERS)
+        if not providers or not user_input:
+            yield [gr.update(visible=column in (providers or [])) for column in columns]
+            return
+        comparison = self.get_session(request).get_comparison(providers)
+        texts = {provider: "" for provider in providers}
+        yield [gr.update(visible=column in texts, value="") for column in columns]
+        async for provider, chunk, stats in comparison.astream(user_input):
+            texts[provider] += chunk
+            if stats is not None:
+                texts[provider] += f"\n\n[{format_stats(stats)}]"
+            yield [
+                gr.update(value=texts[provider]) if column == provider else gr.update()
+                for column in columns
+            ]
+
+    def clear_memory(self, request: gr.Request):
+        session = self.get_session(request)
+        if session.llm_chain_manager:
+            session.llm_chain_manager.memory.clear()
+        if session.comparison:
+            session.comparison.clear_memory()
+        session.message_log.clear()
+        self.save_session(request)
         return "Memory cleared."
 
-    def save_chat_history(self):
+    def save_chat_history(self, request: gr.Request):
         try:
-            self.chat_history_manager.content = self.chat_history
-            self.chat_history_manager.modify_content()
-            self.chat_history_manager.dump_as_plain_text()
-            return "Chat history saved successfully."
+            filename = self.history_store.dump_as_plain_text(
+                self.get_session(request).session_id
+            )
+            return f"Chat history saved on the server to {filename}."
         except Exception as e:
             return f"Error: Failed to save chat history: {str(e)}"
 
-    def launch(self):
+    def list_system_prompts(self):
+        return gr.update(choices=self.custom_system_prompts_manager.names())
+
+    def list_user_prompts(self):
+        return gr.update(choices=self.user_prompts_manager.names())
+
+    def list_saved_sessions(self):
+        return gr.update(
+            choices=[session_id for session_id, *_ in self.history_store.sessions()]
+        )
+
+    def resume_session(self, session_id, request: gr.Request):
+        session = self.get_session(request)
+        if not session_id:
+            return "Error: Please choose a saved session.", ""
+        if session.llm_chain_manager is None:
+            return "Error: Please set an engine first.", ""
+        session.resume(self.history_store, session_id)
+        self.save_session(request)
+        return f"Resumed session: {session_id}", "\n".join(session.chat_history[-2:])
+
+    def search(self, query):
+        """
+        Return result rows for the search panel.
+        """
+        return [
+            [result["source"], result["title"], result["snippet"]]
+            for result in search_all(query, self.history_store, self.prompt_store)
+        ]
+
+    def get_stats(self):
+        """
+        Return one row of call metrics per provider for the stats panel.
+        """
+        rows = []
+        for provider, stats in METRICS.summary().items():
+            rows.append(
+                [provider, stats["calls"], stats["errors"]]
+                + [
+                    round(stats[key], 3) if stats[key] is not None else None
+                    for key in STATS_COLUMNS
+                ]
+                + [
+                    stats["prompt_tokens"],
+                    stats["completion_tokens"],
+                    stats["cache_read_tokens"],
+                    stats["cache_write_tokens"],
+                ]
+            )
+        return rows
+
+    def get_rate_limit_stats(self):
+        """
+        Return one row of rate limiter queue stats per rate-limited provider.
+        """
+        return [
+            [provider]
+            + [
+                round(value, 3) if isinstance(value, float) else value
+                for value in (stats[key] for key in RATE_LIMIT_COLUMNS)
+            ]
+            for provider, stats in SCHEDULER.stats().items()
+        ]
+
+    def launch(self, server_name=None, server_port=None):
         with gr.Blocks() as demo:
             gr.Markdown("# AI Chatbot")
 
@@ -145,6 +334,12 @@ class GradioChatbot:
                 )
                 set_user_prompt_button = gr.Button("Set User Prompt")
 
+            with gr.Row():
+                template_fields = [
+                    gr.Textbox(visible=False) for _ in range(TEMPLATE_FIELDS)
+                ]
+                fill_template_button = gr.Button("Fill In Template")
+
             user_input = gr.Textbox(label="User Input", lines=5)
             send_button = gr.Button("Send")
 
@@ -153,12 +348,61 @@ class GradioChatbot:
             clear_button = gr.Button("Clear Memory")
             save_button = gr.Button("Save Chat History")
 
+            with gr.Row():
+                saved_sessions_dropdown = gr.Dropdown(
+                    choices=[], label="Saved Sessions"
+                )
+                refresh_sessions_button = gr.Button("Refresh Sessions")
+                resume_button = gr.Button("Resume Session")
+
+            with gr.Accordion("Compare Providers", open=False):
+                compare_providers_input = gr.CheckboxGroup(
+                    choices=sorted(LLM_PROVIDERS.keys()), label="Providers"
+                )
+                compare_input = gr.Textbox(label="User Input", lines=3)
+                compare_button = gr.Button("Compare")
+                with gr.Row():
+                    compare_columns = [
+                        gr.Textbox(label=provider, lines=10, visible=False)
+                        for provider in sorted(LLM_PROVIDERS.keys())
+                    ]
+
+            with gr.Accordion("Search", open=False):
+                with gr.Row():
+                    search_input = gr.Textbox(
+                        label="Search saved chats and prompt libraries"
+                    )
+                    search_button = gr.Button("Search")
+                search_results = gr.Dataframe(
+                    headers=["Source", "Session / Prompt", "Match"], interactive=False
+                )
+
+            with gr.Accordion("Stats", open=False):
+                stats_table = gr.Dataframe(
+                    headers=["Provider", "Calls", "Errors"]
+                    + list(STATS_COLUMNS)
+                    + [
+                        "Prompt tokens",
+                        "Completion tokens",
+                        "Cache read tokens",
+                        "Cache write tokens",
+                    ],
+                    interactive=False,
+                )
+                rate_limit_table = gr.Dataframe(
+                    headers=["Provider"] + list(RATE_LIMIT_COLUMNS),
+                    label="Rate limits",
+                    interactive=False,
+                )
+                refresh_stats_button = gr.Button("Refresh Stats")
+
             # Connect components
+            engine_status = gr.Textbox(label="Status")
             engine_button.click(
                 self.choose_engine,
                 inputs=[engine_dropdown],
-                outputs=[gr.Textbox(label="Status")],
-            )
+                outputs=[engine_status],
+            ).then(self.warm_up_engine, outputs=[engine_status])
             system_prompt_button.click(
                 self.change_system_prompt,
                 inputs=[system_prompt_input],
@@ -173,9 +417,21 @@ class GradioChatbot:
                     system_prompt_input,
                 ],
             )
+            # Pick up prompts added by other windows or processes
+            system_prompt_dropdown.focus(
+                self.list_system_prompts, outputs=[system_prompt_dropdown]
+            )
+            user_prompt_dropdown.focus(
+                self.list_user_prompts, outputs=[user_prompt_dropdown]
+            )
             set_user_prompt_button.click(
                 self.set_user_prompt,
                 inputs=[user_prompt_dropdown],
+                outputs=[user_input, *template_fields],
+            )
+            fill_template_button.click(
+                self.fill_template,
+                inputs=[user_prompt_dropdown, *template_fields],
                 outputs=[user_input],
             )
             temperature_button.click(
@@ -183,10 +439,41 @@ class GradioChatbot:
                 inputs=[temperature_input],
                 outputs=[gr.Textbox(label="Status")],
             )
-            send_button.click(self.send_message, inputs=[user_input], outputs=[output])
+            send_button.click(
+                self.send_message,
+                inputs=[user_input],
+                outputs=[output],
+                concurrency_limit=self.concurrency_limit,
+            )
+            compare_button.click(
+                self.compare_providers,
+                inputs=[compare_providers_input, compare_input],
+                outputs=compare_columns,
+                concurrency_limit=self.concurrency_limit,
+            )
             clear_button.click(self.clear_memory, outputs=[output])
             save_button.click(
                 self.save_chat_history, outputs=[gr.Textbox(label="Status")]
             )
 
-        demo.launch()
+            refresh_sessions_button.click(
+                self.list_saved_sessions, outputs=[saved_sessions_dropdown]
+            )
+            resume_button.click(
+                self.resume_session,
+                inputs=[saved_sessions_dropdown],
+                outputs=[gr.Textbox(label="Status"), output],
+            )
+            search_button.click(
+                self.search, inputs=[search_input], outputs=[search_results]
+            )
+            search_input.submit(
+                self.search, inputs=[search_input], outputs=[search_results]
+            )
+            refresh_stats_button.click(self.get_stats, outputs=[stats_table])
+            refresh_stats_button.click(
+                self.get_rate_limit_stats, outputs=[rate_limit_table]
+            )
+            demo.unload(self.drop_session)
+
+        demo.launch(server_name=server_name, server_port=server_port)
@@ -1,9 +1,19 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+import uuid
 from tkinter import (
     END,
+    BooleanVar,
     Button,
+    Checkbutton,
     Entry,
+    Frame,
     Label,
     LabelFrame,
+    Listbox,
     OptionMenu,
     StringVar,
     Text,
@@ -12,14 +22,29 @@ from tkinter import (
 )
 from tkinter.scrolledtext import ScrolledText
 
-from .llm_chain_manager import LLM_PROVIDERS, LLMChainManager
-from .prompts_managers import (
-    ChatHistoryPrompts,
-    SystemPromptSelector,
-    UserPromptSelector,
-)
+from .compare import ProviderComparison, format_stats
+from .history_store import ChatHistoryStore
+from .llm_chain_manager import LLM_PROVIDERS, Configuration, LLMChainManager
+from .message_log import MessageLog
+from .prompt_browser import PromptBrowser, filtering_combobox, parse_temperature
+from .prompts_managers import SystemPromptSelector, UserPromptSelector
+from .request_worker import RequestWorker
 
 PAD = 2
+# Display prefixes of the chat history lines
+CHAT_HISTORY_PREFIXES = {"user": "USER: ", "ai": "  AI: "}
+
+
+def open_file(path):
+    """
+    Open the file in the desktop's default application, if the platform has one.
+    """
+    if sys.platform == "win32":
+        os.startfile(path)
+    elif sys.platform == "darwin":
+        subprocess.Popen(["open", path])
+    elif shutil.which("xdg-open"):
+        subprocess.Popen(["xdg-open", path])
 
 
 # GUI Class
@@ -32,19 +57,24 @@ class Chatbot:
         # Initialize prompts managers
         self.user_prompts_manager = UserPromptSelector()
         self.custom_system_prompts_manager = SystemPromptSelector()
-        self.chat_history_manager = ChatHistoryPrompts()
-
-        self.system_prompt_options = (
-            self.custom_system_prompts_manager.get_prompts().keys()
-        )
-        self.user_prompt_options = self.user_prompts_manager.get_prompts().keys()
+        self.history_store = ChatHistoryStore()
+        # Values entered in template forms, offered again for the same placeholder
+        self.template_values = {}
 
         # Choose engine
         self._choose_engine()
 
+    @property
+    def chat_history(self):
+        """
+        The conversation as display lines, rendered from the message log.
+        """
+        return self.message_log.lines(CHAT_HISTORY_PREFIXES)
+
     def _run_engine(self):
         self.root.title(f"{self.engine} AI Chatbot")
-        self.chat_history = []
+        self.session_id = uuid.uuid4().hex
+        self.message_log = MessageLog.for_session(self.session_id)
         self.default_system_prompt_key = "default"
         (
             self.temperature,
@@ -53,6 +83,9 @@ class Chatbot:
             self.default_system_prompt_key
         ]
 
+        # LLM requests run in the background so the window stays responsive
+        self.request_worker = RequestWorker(self.root)
+
         # Initialize GUI elements
         self.create_gui_elements()
 
@@ -62,6 +95,8 @@ class Chatbot:
         # Initialize LLMChain manager
         self.llm_chain_manager = None
         self.init_llm_chain_manager()
+        if Configuration.WARMUP:
+            self.warm_up_engine()
 
     def _choose_engine(self):
         self.root.title("Engine Selector")
@@ -139,43 +174,23 @@ class Chatbot:
         def save_new_prompt():
             prompt_name = entry_name.get()
             prompt_text = entry_text.get("1.0", END)
-            temperature = entry_temp.get()
+            temperature = parse_temperature(entry_temp.get())
 
             if not prompt_name or not prompt_text:
                 messagebox.showerror("Error", "Please enter a name and prompt text.")
                 return
 
-            try:
-                temperature = float(temperature)
-                if not (0 <= temperature <= 1):
-                    raise ValueError
-            except ValueError:
+            if temperature is None:
                 messagebox.showerror(
                     "Error", "Temperature must be a number between 0 and 1."
                 )
                 return
 
-            self.custom_system_prompts_manager.content[prompt_name] = (
-                temperature,
-                prompt_text,
-            )
-
-            self.custom_system_prompts_manager.modify_content()
-
-            # Update system prompt options
-            self.system_prompt_options = (
-                self.custom_system_prompts_manager.get_prompts().keys()
+            self.custom_system_prompts_manager.set_prompt(
+                prompt_name, (temperature, prompt_text)
             )
-            self.selected_system_prompt.set(prompt_name)  # Select the new prompt
-
-            # Update dropdown menu
-            menu = self.system_prompt_dropdown["menu"]
-            menu.delete(0, END)
-            for option in self.system_prompt_options:
-                menu.add_command(
-                    label=option,
-                    command=lambda v=option: self.selected_system_prompt.set(v),
-                )
+            # The dropdown lists the library when opened, so selecting is enough
+            self.selected_system_prompt.set(prompt_name)
 
             messagebox.showinfo("Success", "System prompt added successfully.")
             add_prompt_window.destroy()
@@ -209,21 +224,9 @@ class Chatbot:
                 messagebox.showerror("Error", "Please enter a name and prompt text.")
                 return
 
-            self.user_prompts_manager.content[prompt_name] = prompt_text
-            self.user_prompts_manager.modify_content()
-
-            # Update user prompt options
-            self.user_prompt_options = self.user_prompts_manager.get_prompts().keys()
-            self.selected_user_prompt.set(prompt_name)  # Select the new prompt
-
-            # Update dropdown menu
-            menu = self.user_prompt_dropdown["menu"]
-            menu.delete(0, END)
-            for option in self.user_prompt_options:
-                menu.add_command(
-                    label=option,
-                    command=lambda v=option: self.selected_user_prompt.set(v),
-                )
+            self.user_prompts_manager.set_prompt(prompt_name, prompt_text)
+            # The dropdown lists the library when opened, so selecting is enough
+            self.selected_user_prompt.set(prompt_name)
 
             messagebox.showinfo("Success", "User prompt added successfully.")
             add_prompt_window.destroy()
@@ -261,8 +264,8 @@ class Chatbot:
         spl_frame = LabelFrame(system_prompt_frame, text="System Prompt Library")
         spl_frame.pack(side="left", pady=PAD)
 
-        self.system_prompt_dropdown = OptionMenu(
-            spl_frame, self.selected_system_prompt, *self.system_prompt_options
+        self.system_prompt_dropdown = filtering_combobox(
+            spl_frame, self.selected_system_prompt, self.custom_system_prompts_manager
         )
         self.system_prompt_dropdown.pack(side="left", pady=PAD)
 
@@ -303,6 +306,13 @@ class Chatbot:
         self.send_message_button = self.create_button_element(
             user_frame, "Send", self.send_message
         )
+        self.cancel_request_button = self.create_button_element(
+            user_frame, "Cancel", self.cancel_request
+        )
+        self.request_status = StringVar()
+        Label(user_frame, textvariable=self.request_status, width=24).pack(
+            side="left", pady=PAD
+        )
 
         # User Prompt Library Selection
         upl_frame = LabelFrame(user_frame, text="User Prompt Library")
@@ -310,11 +320,11 @@ class Chatbot:
 
         self.selected_user_prompt = StringVar()
         self.selected_user_prompt.set(
-            sorted(self.user_prompt_options)[0]
+            next(iter(self.user_prompts_manager.names(limit=1)), "")
         )  # Default selection
 
-        self.user_prompt_dropdown = OptionMenu(
-            upl_frame, self.selected_user_prompt, *self.user_prompt_options
+        self.user_prompt_dropdown = filtering_combobox(
+            upl_frame, self.selected_user_prompt, self.user_prompts_manager
         )
         self.user_prompt_dropdown.pack(side="left", pady=PAD)
 
@@ -347,6 +357,12 @@ class Chatbot:
         self.save_history_button = self.create_button_element(
             ai_response_frame, "Save Chat History", self.save_chat_history
         )
+        self.resume_session_button = self.create_button_element(
+            ai_response_frame, "Resume Session", self.resume_session
+        )
+        self.compare_button = self.create_button_element(
+            ai_response_frame, "Compare Providers", self.compare_providers
+        )
 
     def create_gui_elements(self):
         """
@@ -364,11 +380,36 @@ class Chatbot:
             system_prompt=self.system_prompt,
             temperature=self.temperature,
         )
+        self.llm_chain_manager.session_id = self.session_id
         self.llm_chain_manager.init_llm(self.engine)
         self.llm_chain_manager.init_prompt()
-        self.llm_chain_manager.init_memory()
+        self.llm_chain_manager.init_memory(self.message_log)
         self.llm_chain_manager.init_llm_chain()
 
+    def warm_up_engine(self):
+        """
+        Connect to the engine and check its credentials in the background.
+        Messages sent meanwhile are queued behind the warm-up.
+        """
+        manager = self.llm_chain_manager
+
+        def warm_up():
+            manager.warm_up()
+            return []
+
+        def report_error(error):
+            self.update_request_status()
+            messagebox.showerror(
+                "Error", f"Engine {self.engine} is not reachable: {str(error)}"
+            )
+
+        self.request_worker.submit(
+            warm_up,
+            on_start=lambda: self.request_status.set("Connecting..."),
+            on_done=lambda _: self.update_request_status(),
+            on_error=report_error,
+        )
+
     def change_system_prompt(self):
         """
         Change the system prompt and update the LLMChain manager.
@@ -376,8 +417,10 @@ class Chatbot:
         new_prompt = self.system_prompt_box.get("1.0", "end-1c")
         if new_prompt:
             self.system_prompt = new_prompt
-            self.init_llm_chain_manager()
             self.clear_memory()
+            self.request_worker.when_idle(
+                lambda: self.llm_chain_manager.set_system_prompt(new_prompt)
+            )
             messagebox.showinfo("Success", "System prompt updated successfully.")
         else:
             messagebox.showerror("Error", "System prompt cannot be empty.")
@@ -386,18 +429,20 @@ class Chatbot:
         """
         Sets the system prompt based on the selected option.
         """
+        selected_prompt = self.selected_system_prompt.get()
+        if selected_prompt not in self.custom_system_prompts_manager.get_prompts():
+            messagebox.showerror("Error", f"Unknown system prompt: {selected_prompt}")
+            return
         (
             self.temperature,
             self.system_prompt,
-        ) = self.custom_system_prompts_manager.get_prompts()[
-            self.selected_system_prompt.get()
-        ]
+        ) = self.custom_system_prompts_manager.get_prompts()[selected_prompt]
         self.temperature_box.delete("1.0", END)
         self.temperature_box.insert(END, self.temperature)
         self.system_prompt_box.delete("1.0", END)
         self.system_prompt_box.insert(END, self.system_prompt)
-        self.init_llm_chain_manager()
         self.clear_memory()
+        self.request_worker.when_idle(self._apply_prompt_settings)
         messagebox.showinfo("Success", "System prompt updated successfully.")
 
     def set_user_prompt(self):
@@ -405,84 +450,61 @@ class Chatbot:
         Sets the user prompt in the input box based on the selected option.
         """
         selected_prompt = self.selected_user_prompt.get()
-        prompt_text = self.user_prompts_manager.get_prompts()[selected_prompt]
+        if selected_prompt not in self.user_prompts_manager.get_prompts():
+            messagebox.showerror("Error", f"Unknown user prompt: {selected_prompt}")
+            return
+        template = self.user_prompts_manager.template(selected_prompt)
+        if template.variables:
+            self.fill_template(template)
+            return
         self.input_box.delete("1.0", END)
-        self.input_box.insert(END, prompt_text)
+        self.input_box.insert(END, template.text)
+
+    def fill_template(self, template):
+        """
+        Opens a form with one field per placeholder of the template and puts the
+        rendered prompt in the input box.
+        """
+        form_window = Toplevel(self.root)
+        form_window.title("Fill In Template")
+
+        fields = {}
+        for name in template.variables:
+            Label(form_window, text=name).pack()
+            value = self.template_values.get(name, "")
+            if name.endswith("_TEXT"):
+                field = Text(form_window, height=8, width=80)
+                field.insert(END, value)
+            else:
+                field = Entry(form_window, width=80)
+                field.insert(0, value)
+            field.pack(pady=PAD)
+            fields[name] = field
+
+        def fill_in():
+            for name, field in fields.items():
+                if isinstance(field, Text):
+                    self.template_values[name] = field.get("1.0", "end-1c")
+                else:
+                    self.template_values[name] = field.get()
+            self.input_box.delete("1.0", END)
+            self.input_box.insert(END, template.render(self.template_values))
+            form_window.destroy()
+
+        Button(form_window, text="Fill In", command=fill_in).pack(pady=PAD)
 
     def edit_system_prompt(self):
-        """Opens a window to edit existing system prompts."""
-        edit_window = Toplevel(self.root)
-        edit_window.title("Edit System Prompt")
-
-        prompts = self.custom_system_prompts_manager.get_prompts()
-
-        def save_edits():
-            for name, (temp_entry, prompt_entry) in entries.items():
-                new_temp = temp_entry.get()
-                new_prompt = prompt_entry.get("1.0", END)
-                try:
-                    new_temp = float(new_temp)
-                    if not (0 <= new_temp <= 1):
-                        raise ValueError
-                except ValueError:
-                    messagebox.showerror(
-                        "Error",
-                        f"Invalid temperature for '{name}': Must be between 0 and 1.",
-                    )
-                    return
-
-                prompts[name] = (new_temp, new_prompt)
-            self.custom_system_prompts_manager.modify_content(prompts)
-            messagebox.showinfo("Success", "System prompts updated successfully.")
-            edit_window.destroy()
-
-        entries = {}
-        for name, (temperature, prompt) in prompts.items():
-            frame = LabelFrame(edit_window, text=name)
-            frame.pack(pady=PAD)
-
-            Label(frame, text="Temperature (0-1):").pack()
-            temp_entry = Entry(frame)
-            temp_entry.insert(0, temperature)
-            temp_entry.pack()
-
-            Label(frame, text="Prompt Text:").pack()
-            prompt_entry = Text(frame, height=5)
-            prompt_entry.insert(END, prompt)
-            prompt_entry.pack()
-
-            entries[name] = (temp_entry, prompt_entry)
-
-        Button(edit_window, text="Save Changes", command=save_edits).pack(pady=PAD)
+        """Opens a browser to edit the saved system prompts one at a time."""
+        PromptBrowser(
+            self.root,
+            "Edit System Prompt",
+            self.custom_system_prompts_manager,
+            with_temperature=True,
+        )
 
     def edit_user_prompt(self):
-        """Opens a window to edit existing user prompts."""
-        edit_window = Toplevel(self.root)
-        edit_window.title("Edit User Prompt")
-
-        prompts = self.user_prompts_manager.get_prompts()
-
-        def save_edits():
-            for name, prompt_entry in entries.items():
-                new_prompt = prompt_entry.get("1.0", END)
-                prompts[name] = new_prompt
-            self.user_prompts_manager.modify_content(prompts)
-            messagebox.showinfo("Success", "User prompts updated successfully.")
-            edit_window.destroy()
-
-        entries = {}
-        for name, prompt in prompts.items():
-            frame = LabelFrame(edit_window, text=name)
-            frame.pack(pady=PAD)
-
-            Label(frame, text="Prompt Text:").pack()
-            prompt_entry = Text(frame, height=5)
-            prompt_entry.insert(END, prompt)
-            prompt_entry.pack()
-
-            entries[name] = prompt_entry
-
-        Button(edit_window, text="Save Changes", command=save_edits).pack(pady=PAD)
+        """Opens a browser to edit the saved user prompts one at a time."""
+        PromptBrowser(self.root, "Edit User Prompt", self.user_prompts_manager)
 
     def change_temperature(self):
         """
@@ -492,8 +514,10 @@ class Chatbot:
             new_temperature = float(self.temperature_box.get("1.0", "end-1c"))
             if 0 <= new_temperature <= 1:
                 self.temperature = new_temperature
-                self.llm_chain_manager.init_llm(self.engine)
-                self.llm_chain_manager.init_llm_chain()
+                # Applied between requests, never under a running one
+                self.request_worker.when_idle(
+                    lambda: self.llm_chain_manager.set_temperature(new_temperature)
+                )
                 messagebox.showinfo("Success", "Temperature updated successfully.")
             else:
                 messagebox.showerror("Error", "Temperature must be between 0 and 1.")
@@ -502,51 +526,234 @@ class Chatbot:
 
     def send_message(self):
         """
-        Send user input to the LLMChain for processing and display the response.
+        Queue user input for the LLMChain and stream the response into the output
+        box once the request reaches the front of the queue.
         """
         user_input = self.input_box.get("1.0", "end-1c")
         if user_input:
-            try:
-                # Send user input to LangChain for processing
-                response = self.llm_chain_manager.llm_chain.predict(
-                    human_input=user_input
-                )
-
-                # Add user input and response to chat history
-                self.chat_history.append(f"USER: {user_input}\n")
-                self.chat_history.append(f"  AI: {response}\n")
-
-                # Display the response in the output box
-                self.output_box.delete("1.0", END)
-                for message in self.chat_history[-2:]:
-                    self.output_box.insert(END, message + "\n")
-                self.output_box.see(END)
-                self.input_box.delete("1.0", END)
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            self.input_box.delete("1.0", END)
+            self.request_worker.submit(
+                lambda: self.llm_chain_manager.stream(user_input, commit=False),
+                on_start=lambda: self._start_response(user_input),
+                on_chunk=self._append_response_chunk,
+                on_done=lambda response: self._finish_response(user_input, response),
+                on_error=self._fail_response,
+                commit=lambda response: self.llm_chain_manager.commit(
+                    user_input, response
+                ),
+            )
+            self.update_request_status()
         else:
             messagebox.showerror("Error", "User input cannot be empty.")
 
+    def cancel_request(self):
+        """
+        Abandon the in-flight request; queued requests are kept.
+        """
+        if self.request_worker.busy:
+            self.request_worker.cancel()
+            self.output_box.insert(END, "\n[cancelled]\n\n")
+            self.output_box.see(END)
+            self.update_request_status()
+
+    def update_request_status(self):
+        """
+        Show whether a request is in flight and how many are queued behind it.
+        """
+        if self.request_worker.busy:
+            status = "Waiting for response..."
+            if self.request_worker.pending_count:
+                status += f" ({self.request_worker.pending_count} queued)"
+        else:
+            status = ""
+        self.request_status.set(status)
+
+    def _start_response(self, user_input):
+        self.output_box.delete("1.0", END)
+        self.output_box.insert(END, f"USER: {user_input}\n\n  AI: ")
+        self.update_request_status()
+
+    def _append_response_chunk(self, chunk):
+        self.output_box.insert(END, chunk)
+        self.output_box.see(END)
+
+    def _finish_response(self, user_input, response):
+        router = self.llm_chain_manager.router
+        if self.llm_chain_manager.last_response_cached:
+            self.output_box.insert(END, "  [cached]")
+        elif router and router.last_provider != self.engine:
+            self.output_box.insert(END, f"  [{router.last_provider}]")
+        self.output_box.insert(END, "\n\n")
+        self.output_box.see(END)
+
+        self.history_store.append_exchange(self.session_id, user_input, response)
+        self.update_request_status()
+
+    def _fail_response(self, error):
+        self.update_request_status()
+        messagebox.showerror("Error", f"An error occurred: {str(error)}")
+
     def clear_memory(self):
         """
         Clear the LLM chain memory and chat history.
         """
-        self.llm_chain_manager.memory.clear()
-        self.chat_history = []
+        self.request_worker.cancel_all()
+        self.update_request_status()
         self.output_box.delete("1.0", END)
+        # A cancelled request may still be winding down on the manager
+        self.request_worker.when_idle(self._reset_conversation)
+
+    def _reset_conversation(self):
+        self.llm_chain_manager.memory.clear()
+        self.message_log.clear()
+
+    def _resume_conversation(self, session_id):
+        self.session_id = session_id
+        self.message_log = MessageLog.for_session(session_id)
+        memory = self.llm_chain_manager.memory
+        memory.chat_memory = self.message_log
+        self.llm_chain_manager.set_session_id(session_id)
+        self.history_store.resume(session_id, memory)
+        for message in self.chat_history[-2:]:
+            self.output_box.insert(END, message + "\n\n")
+        self.output_box.see(END)
+
+    def _apply_prompt_settings(self):
+        self.llm_chain_manager.set_temperature(self.temperature)
+        self.llm_chain_manager.set_system_prompt(self.system_prompt)
 
     def save_chat_history(self):
         """
-        Saves the current chat history to a JSON file.
+        Exports the current session from the chat history store to a text file.
         """
         try:
-            self.chat_history_manager.content = self.chat_history
-            self.chat_history_manager.modify_content()
-            self.chat_history_manager.dump_as_plain_text()
-            messagebox.showinfo("Success", "Chat history saved successfully.")
+            filename = self.history_store.dump_as_plain_text(self.session_id)
+            open_file(filename)
+            messagebox.showinfo("Success", f"Chat history saved to {filename}.")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save chat history: {str(e)}")
 
+    def resume_session(self):
+        """Opens a window to continue one of the saved sessions."""
+        resume_window = Toplevel(self.root)
+        resume_window.title("Resume Session")
+
+        sessions = self.history_store.sessions()
+        session_list = Listbox(resume_window, width=60)
+        for session_id, _, last_active, messages in sessions:
+            last_active = time.strftime("%Y-%m-%d %H:%M", time.localtime(last_active))
+            session_list.insert(END, f"{last_active}  ({messages} messages)")
+        session_list.pack(pady=PAD)
+
+        def resume_selected():
+            selection = session_list.curselection()
+            if not selection:
+                messagebox.showerror("Error", "Please select a session.")
+                return
+            session_id = sessions[selection[0]][0]
+            self.clear_memory()
+            # Runs after clear_memory's reset, once no request is running
+            self.request_worker.when_idle(lambda: self._resume_conversation(session_id))
+            resume_window.destroy()
+
+        Button(resume_window, text="Resume", command=resume_selected).pack(pady=PAD)
+
+    def compare_providers(self):
+        """
+        Opens a window sending the same input to several providers at once, with
+        one response column per provider.
+        """
+        compare_window = Toplevel(self.root)
+        compare_window.title("Compare Providers")
+
+        provider_frame = LabelFrame(compare_window, text="Providers")
+        provider_frame.pack(pady=PAD)
+        selected = {}
+        for provider in sorted(LLM_PROVIDERS.keys()):
+            selected[provider] = BooleanVar(value=provider == self.engine)
+            Checkbutton(
+                provider_frame, text=provider, variable=selected[provider]
+            ).pack(side="left")
+
+        input_frame = LabelFrame(compare_window, text="User Prompt")
+        input_frame.pack(pady=PAD)
+        input_box = self.create_text_element(
+            input_frame, 5, 120, self.input_box.get("1.0", "end-1c"), scrolled=True
+        )
+        columns_frame = Frame(compare_window)
+        columns_frame.pack(pady=PAD)
+        state = {"comparison": None, "workers": []}
+
+        def send():
+            providers = [name for name, var in selected.items() if var.get()]
+            user_input = input_box.get("1.0", "end-1c")
+            if not providers or not user_input:
+                messagebox.showerror(
+                    "Error", "Please choose providers and enter a user prompt."
+                )
+                return
+            comparison = state["comparison"]
+            if comparison is None or comparison.providers != providers:
+                for worker in state["workers"]:
+                    worker.cancel_all()
+                for widget in columns_frame.winfo_children():
+                    widget.destroy()
+                comparison = ProviderComparison(
+                    providers, self.system_prompt, self.temperature
+                )
+                state["comparison"] = comparison
+                state["workers"] = []
+                state["columns"] = {}
+                width = max(20, 120 // len(providers))
+                for provider in providers:
+                    column = LabelFrame(columns_frame, text=provider)
+                    column.pack(side="left", pady=PAD)
+                    status = StringVar()
+                    output = self.create_text_element(column, 20, width, scrolled=True)
+                    Label(column, textvariable=status).pack(pady=PAD)
+                    state["columns"][provider] = (output, status)
+                    state["workers"].append(RequestWorker(self.root))
+            # One worker per provider, so every column streams concurrently
+            for worker, provider in zip(state["workers"], providers):
+                submit(worker, comparison, provider, user_input)
+
+        def submit(worker, comparison, provider, user_input):
+            output, status = state["columns"][provider]
+
+            def on_start():
+                output.insert(END, f"USER: {user_input}\n\n  AI: ")
+                status.set("Waiting for response...")
+
+            def on_chunk(chunk):
+                output.insert(END, chunk)
+                output.see(END)
+
+            def on_done(response):
+                output.insert(END, "\n\n")
+                status.set(format_stats(comparison.stats(provider)))
+
+            def on_error(error):
+                output.insert(END, "\n\n")
+                status.set(format_stats(comparison.stats(provider, str(error))))
+
+            manager = comparison.managers[provider]
+            worker.submit(
+                lambda: manager.stream(user_input, commit=False),
+                on_start=on_start,
+                on_chunk=on_chunk,
+                on_done=on_done,
+                on_error=on_error,
+                commit=lambda response: manager.commit(user_input, response),
+            )
+
+        def close():
+            for worker in state["workers"]:
+                worker.cancel_all()
+            compare_window.destroy()
+
+        Button(input_frame, text="Compare", command=send).pack(side="left", pady=PAD)
+        compare_window.protocol("WM_DELETE_WINDOW", close)
+
     def on_exit(self):
         """
         Cleanup objects to be executed when the GUI is closed.
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _with_temperature(client, temperature):
+    variant = client.copy(update={"temperature": temperature})
+    # copy() leaves out fields declared with exclude=True, such as callbacks
+    for name in client.__fields__:
+        if name not in variant.__dict__:
+            variant.__dict__[name] = getattr(client, name)
+    return variant
+
+
+class ClientPool:
+    """
+    LRU pool of warm LLM clients keyed by (provider, params, temperature).
+
+    One base client is built per (provider, params); variants for other
+    temperatures are shallow copies of it, so they share its underlying HTTP
+    client and connection pool instead of opening new connections.
+    """
+
+    def __init__(self, max_size=32):
+        self.max_size = max_size
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, provider, llm_class, params, temperature=None):
+        key = (provider, _freeze(params), temperature)
+        with self._lock:
+            if key in self._clients:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return self._clients[key]
+            self.misses += 1
+
+            base_key = (provider, _freeze(params), None)
+            base = self._clients.get(base_key)
+            if base is None:
+                base = llm_class(**params)
+                self._put(base_key, base)
+            client = base
+            if temperature is not None and "temperature" in getattr(
+                llm_class, "__fields__", {}
+            ):
+                client = _with_temperature(base, temperature)
+            self._put(key, client)
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def _put(self, key, client):
+        self._clients[key] = client
+        self._clients.move_to_end(key)
+        while len(self._clients) > self.max_size:
+            self._clients.popitem(last=False)
+
+
+# Clients are shared by every LLMChainManager in the process
+CLIENT_POOL = ClientPool()
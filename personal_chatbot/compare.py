@@ -0,0 +1,89 @@
+import asyncio
+
+from .llm_chain_manager import LLMChainManager
+
+
+def format_stats(stats):
+    """
+    Render a provider's latency and token count for a compare column.
+    """
+    if stats["error"]:
+        return f"Error: {stats['error']}"
+    parts = []
+    if stats["latency"] is not None:
+        parts.append(f"{stats['latency']:.2f} s")
+    if stats["time_to_first_token"] is not None:
+        parts.append(f"first token {stats['time_to_first_token']:.2f} s")
+    if stats["completion_tokens"] is not None:
+        parts.append(f"{stats['completion_tokens']} tokens")
+    if stats["cached"]:
+        parts.append("cached")
+    return ", ".join(parts)
+
+
+class ProviderComparison:
+    """
+    Sends each input to several providers at once with the same system prompt and
+    temperature. Every provider keeps its own conversation, so follow-up inputs
+    continue each column's thread.
+    """
+
+    def __init__(self, providers, system_prompt, temperature):
+        self.providers = list(providers)
+        self.managers = {}
+        for provider in self.providers:
+            manager = LLMChainManager(
+                system_prompt=system_prompt, temperature=temperature
+            )
+            manager.init_llm(provider)
+            manager.init_prompt()
+            manager.init_memory()
+            manager.init_llm_chain()
+            self.managers[provider] = manager
+
+    def stats(self, provider, error=None):
+        """
+        Return the latency, token count and error of the provider's last turn.
+        """
+        manager = self.managers[provider]
+        return {
+            "latency": manager.last_timings["total"],
+            "time_to_first_token": manager.last_timings["time_to_first_token"],
+            "completion_tokens": manager.last_usage.get("completion_tokens"),
+            "cached": manager.last_response_cached,
+            "error": error,
+        }
+
+    def clear_memory(self):
+        for manager in self.managers.values():
+            manager.memory.clear()
+
+    async def astream(self, user_input):
+        """
+        Yield (provider, chunk, stats) events as chunks arrive from any provider.
+        Each provider's last event carries an empty chunk and its stats, every
+        other event has stats set to None. A failing provider does not affect
+        the others.
+        """
+        events = asyncio.Queue()
+
+        async def pump(provider):
+            error = None
+            try:
+                async for chunk in self.managers[provider].astream(user_input):
+                    await events.put((provider, chunk, None))
+            except Exception as e:
+                error = str(e) or repr(e)
+            await events.put((provider, "", self.stats(provider, error)))
+
+        tasks = [asyncio.create_task(pump(provider)) for provider in self.providers]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await events.get()
+                if event[2] is not None:
+                    remaining -= 1
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,200 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.pydantic_v1 import Field
+
+from .llm_chain_manager import LLM_PROVIDERS
+from .memory import count_tokens
+
+FAKE_PROVIDER = "Fake-local"
+
+
+class FakeLLMError(RuntimeError):
+    """
+    Simulated provider failure raised by FakeChatModel.
+    """
+
+
+class FakeRateLimitError(FakeLLMError):
+    """
+    Simulated HTTP 429 response, optionally carrying a Retry-After delay.
+    """
+
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("Simulated rate limit (429 Too Many Requests)")
+        self.retry_after = retry_after
+
+
+def _text(content):
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else block for block in content
+    )
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Local stand-in for a chat provider with configurable latency, token rate and
+    error rate, for offline tests and benchmarks.
+    """
+
+    response: str = "This is a response from the fake local model."
+    latency: float = 0.0
+    """Seconds before the first token."""
+    tokens_per_second: float = 0.0
+    """Streaming speed after the first token; 0 streams instantly."""
+    error_rate: float = 0.0
+    """Probability that a call fails with FakeLLMError before any token."""
+    rate_limited_calls: int = 0
+    """Number of first calls rejected with FakeRateLimitError."""
+    retry_after: Optional[float] = None
+    """Retry-After seconds carried by the simulated 429 responses."""
+    prompt_caching: bool = False
+    """Simulate Anthropic-style caching of prefixes ending in cache_control."""
+    cached_prefixes: set = Field(default_factory=set)
+    connect_latency: float = 0.0
+    """Extra delay paid by the first call of each instance (DNS, TLS, ...)."""
+    temperature: float = 0.7
+    seed: Optional[int] = None
+    connected: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"response": self.response, "latency": self.latency}
+
+    def _tokens(self):
+        words = self.response.split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def _delays(self):
+        self.calls += 1
+        if self.calls <= self.rate_limited_calls:
+            raise FakeRateLimitError(self.retry_after)
+        rng = random.Random(None if self.seed is None else self.seed + self.calls)
+        if rng.random() < self.error_rate:
+            raise FakeLLMError("Simulated provider error")
+        first = self.latency
+        if not self.connected:
+            first += self.connect_latency
+            self.connected = True
+        per_token = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+        return first, per_token
+
+    def _usage(self, messages: List[BaseMessage]):
+        input_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        output_tokens = len(self._tokens())
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _cache_usage(self, messages: List[BaseMessage]):
+        # Reads the longest cached prefix up to the last cache_control marker
+        # and writes the rest of it, reported in Anthropic's "usage" format
+        if not self.prompt_caching:
+            return {}
+        marked = [
+            i
+            for i, message in enumerate(messages)
+            if isinstance(message.content, list)
+            and any("cache_control" in block for block in message.content)
+        ]
+        read = write = 0
+        if marked:
+            tokens = 0
+            for i, message in enumerate(messages[: marked[-1] + 1]):
+                tokens += count_tokens(str(message.content))
+                # Cache hits depend on the content, not on where markers are
+                key = "\n".join(
+                    f"{m.type}:{_text(m.content)}" for m in messages[: i + 1]
+                )
+                if key in self.cached_prefixes:
+                    read = tokens
+            write = tokens - read
+            self.cached_prefixes.add(key)
+        return {
+            "usage": {
+                "cache_read_input_tokens": read,
+                "cache_creation_input_tokens": write,
+            }
+        }
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        first, per_token = self._delays()
+        time.sleep(first + per_token * len(self._tokens()))
+        message = AIMessage(
+            content=self.response,
+            usage_metadata=self._usage(messages),
+            response_metadata=self._cache_usage(messages),
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        first, per_token = self._delays()
+        await asyncio.sleep(first + per_token * len(self._tokens()))
+        message = AIMessage(
+            content=self.response,
+            usage_metadata=self._usage(messages),
+            response_metadata=self._cache_usage(messages),
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        first, per_token = self._delays()
+        time.sleep(first)
+        for chunk in self._chunks(messages):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            if per_token:
+                time.sleep(per_token)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        first, per_token = self._delays()
+        await asyncio.sleep(first)
+        for chunk in self._chunks(messages):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            if per_token:
+                await asyncio.sleep(per_token)
+
+    def _chunks(self, messages):
+        tokens = self._tokens()
+        for i, token in enumerate(tokens):
+            last = i == len(tokens) - 1
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=token,
+                    usage_metadata=self._usage(messages) if last else None,
+                    response_metadata=self._cache_usage(messages) if last else {},
+                )
+            )
+
+
+def register_fake_provider(name=FAKE_PROVIDER, context_window=8192, **params):
+    """
+    Add a FakeChatModel entry to LLM_PROVIDERS and return its name.
+    """
+    LLM_PROVIDERS[name] = {
+        "class": "personal_chatbot.fake_llm.FakeChatModel",
+        "context_window": context_window,
+        "params": params,
+    }
+    return name
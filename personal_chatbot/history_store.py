@@ -0,0 +1,197 @@
+import re
+import sqlite3
+import threading
+import time
+
+# Number of turns replayed into memory when a session is resumed
+RESUME_TURNS = 200
+
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query matching all of its words, the last one
+    as a prefix so results show up while typing.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class ChatHistoryStore:
+    """
+    Append-only chat history in SQLite (WAL mode), indexed by session and time.
+
+    Each turn is committed in its own transaction as it happens, so saving costs
+    O(1) per turn and a crash loses at most the turn in flight.
+    """
+
+    def __init__(self, path="chat_history.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS turns_session_time
+                ON turns (session_id, timestamp);
+            """
+        )
+        self._init_search_index()
+
+    def _init_search_index(self):
+        # Full-text index over the turns, kept up to date by an insert trigger
+        exists = self._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'turns_fts'"
+        ).fetchone()
+        self._connection.executescript(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts
+                USING fts5(content, content='turns', content_rowid='id');
+            CREATE TRIGGER IF NOT EXISTS turns_fts_insert AFTER INSERT ON turns
+            BEGIN
+                INSERT INTO turns_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+            """
+        )
+        if not exists:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT INTO turns_fts (turns_fts) VALUES ('rebuild')"
+                )
+
+    def append(self, session_id, role, content, timestamp=None):
+        """
+        Append one message to the session and return its id.
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO turns (session_id, timestamp, role, content) "
+                "VALUES (?, ?, ?, ?)",
+                (session_id, timestamp or time.time(), role, content),
+            )
+        return cursor.lastrowid
+
+    def append_exchange(self, session_id, user_input, response):
+        """
+        Append a user input and the AI response to it in one transaction.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO turns (session_id, timestamp, role, content) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (session_id, now, "user", user_input),
+                    (session_id, now, "ai", response),
+                ],
+            )
+
+    def sessions(self, limit=50):
+        """
+        Return (session_id, started, last_active, messages) of the most recently
+        active sessions.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT session_id, MIN(timestamp), MAX(timestamp), COUNT(*) "
+                "FROM turns GROUP BY session_id ORDER BY MAX(timestamp) DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def page(self, session_id, before_id=None, limit=100):
+        """
+        Return up to limit (id, timestamp, role, content) messages of the session
+        older than before_id, oldest first.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, timestamp, role, content FROM turns "
+                "WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (session_id, before_id or 2**63 - 1, limit),
+            ).fetchall()
+        return rows[::-1]
+
+    def iter_turns(self, session_id, page_size=100):
+        """
+        Lazily yield the session's messages newest first, one page at a time.
+        """
+        before_id = None
+        while True:
+            rows = self.page(session_id, before_id, page_size)
+            if not rows:
+                return
+            yield from reversed(rows)
+            before_id = rows[0][0]
+
+    def search(self, query, limit=20, session_id=None):
+        """
+        Return up to limit (id, session_id, timestamp, role, snippet) messages
+        matching every word of the query, best matches first.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT turns.id, turns.session_id, turns.timestamp, turns.role, "
+            "snippet(turns_fts, 0, '[', ']', '...', 16) "
+            "FROM turns_fts JOIN turns ON turns.id = turns_fts.rowid "
+            "WHERE turns_fts MATCH ?"
+        )
+        params = [match]
+        if session_id is not None:
+            sql += " AND turns.session_id = ?"
+            params.append(session_id)
+        sql += " ORDER BY bm25(turns_fts) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def resume(self, session_id, memory, turns=RESUME_TURNS):
+        """
+        Replay the session's most recent exchanges into the memory and return
+        them as (role, content) pairs, oldest first.
+        """
+        messages = [
+            (role, content)
+            for _, _, role, content in self.page(session_id, limit=2 * turns)
+        ]
+        # A page may start in the middle of an exchange
+        if messages and messages[0][0] != "user":
+            messages = messages[1:]
+        for (_, user_input), (_, response) in zip(messages[::2], messages[1::2]):
+            memory.add_turn(user_input, response)
+        return messages
+
+    def dump_as_plain_text(self, session_id, filename="chat_history.txt"):
+        """
+        Write the session to a text file page by page and return its name.
+        """
+        after_id = 0
+        with open(filename, "w") as file:
+            while True:
+                with self._lock:
+                    rows = self._connection.execute(
+                        "SELECT id, role, content FROM turns "
+                        "WHERE session_id = ? AND id > ? ORDER BY id LIMIT 500",
+                        (session_id, after_id),
+                    ).fetchall()
+                if not rows:
+                    break
+                for _, role, content in rows:
+                    file.write(f"{role.upper()}: {content}\n")
+                after_id = rows[-1][0]
+        return filename
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,194 @@
+import json
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .memory import count_tokens
+
+# Percentiles reported per provider by MetricsRecorder.summary
+PERCENTILES = (50, 95, 99)
+
+
+class MetricsRecorder:
+    """
+    Collects one record per LLM call in an in-process ring buffer and, when a
+    path is given, appends them to a size-rotated JSONL file.
+    """
+
+    def __init__(self, path=None, buffer_size=1000, max_bytes=10_000_000, backups=3):
+        self.buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._logger = None
+        if path:
+            self._logger = logging.getLogger(f"{__name__}.{path}")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            if not self._logger.handlers:
+                self._logger.addHandler(
+                    RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+                )
+
+    def record(self, **fields):
+        record = {"timestamp": time.time(), **fields}
+        with self._lock:
+            self.buffer.append(record)
+        if self._logger:
+            self._logger.info(json.dumps(record))
+        return record
+
+    def records(self, provider=None):
+        with self._lock:
+            records = list(self.buffer)
+        if provider is not None:
+            records = [record for record in records if record["provider"] == provider]
+        return records
+
+    def summary(self):
+        """
+        Return call counts, error counts, token totals and latency percentiles
+        per provider over the buffered records.
+        """
+        by_provider = {}
+        for record in self.records():
+            by_provider.setdefault(record["provider"], []).append(record)
+
+        summary = {}
+        for provider, records in sorted(by_provider.items()):
+            ok = [record for record in records if not record.get("error")]
+            stats = {
+                "calls": len(records),
+                "errors": len(records) - len(ok),
+                "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in ok),
+                "completion_tokens": sum(r.get("completion_tokens") or 0 for r in ok),
+                "cache_read_tokens": sum(r.get("cache_read_tokens") or 0 for r in ok),
+                "cache_write_tokens": sum(r.get("cache_write_tokens") or 0 for r in ok),
+            }
+            for metric in ("latency", "time_to_first_token", "queue_wait"):
+                values = [r[metric] for r in ok if r.get(metric) is not None]
+                for rank in PERCENTILES:
+                    stats[f"{metric}_p{rank}"] = percentile(values, rank)
+            summary[provider] = stats
+        return summary
+
+
+def _cache_tokens(generation, llm_output):
+    # Prompt cache usage is reported differently by each provider package
+    message = getattr(generation, "message", None)
+    details = (getattr(message, "usage_metadata", None) or {}).get(
+        "input_token_details"
+    )
+    if details:
+        return details.get("cache_read") or 0, details.get("cache_creation") or 0
+    for source in (getattr(message, "response_metadata", None) or {}, llm_output):
+        usage = (source or {}).get("usage") or {}
+        if "cache_read_input_tokens" in usage or "cache_creation_input_tokens" in usage:
+            return (
+                usage.get("cache_read_input_tokens") or 0,
+                usage.get("cache_creation_input_tokens") or 0,
+            )
+        usage = (source or {}).get("usage_metadata") or {}
+        if "cached_content_token_count" in usage:
+            return usage["cached_content_token_count"] or 0, 0
+    return None, None
+
+
+def percentile(values, rank):
+    """
+    Return the rank-th percentile (1-99) of the values, or None if there are
+    none.
+    """
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[rank - 1]
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler timing a single LLM call and recording it on completion.
+    """
+
+    def __init__(
+        self, recorder, provider, model, queue_wait=0.0, cached_prefix_tokens=None
+    ):
+        self.recorder = recorder
+        self.provider = provider
+        self.model = model
+        self.queue_wait = queue_wait
+        # Size of a server-side cached prefix sent by reference, for providers
+        # that do not report cache reads themselves
+        self.cached_prefix_tokens = cached_prefix_tokens
+        self.start = None
+        self.time_to_first_token = None
+        self.prompt_text = ""
+        self.usage = {}
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.start = time.perf_counter()
+        self.prompt_text = "".join(prompts)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.start = time.perf_counter()
+        self.prompt_text = "".join(
+            str(message.content) for batch in messages for message in batch
+        )
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self.time_to_first_token is None and token:
+            self.time_to_first_token = time.perf_counter() - self.start
+
+    def on_llm_end(self, response, **kwargs):
+        generation = response.generations[0][0] if response.generations else None
+        text = generation.text if generation else ""
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            prompt_tokens = usage.get("input_tokens")
+            completion_tokens = usage.get("output_tokens")
+        elif token_usage:
+            prompt_tokens = token_usage.get("prompt_tokens")
+            completion_tokens = token_usage.get("completion_tokens")
+        else:
+            prompt_tokens = completion_tokens = None
+        cache_read_tokens, cache_write_tokens = _cache_tokens(
+            generation, response.llm_output
+        )
+        if cache_read_tokens is None and self.cached_prefix_tokens:
+            cache_read_tokens, cache_write_tokens = self.cached_prefix_tokens, 0
+        self._record(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cache_read_tokens=cache_read_tokens,
+            cache_write_tokens=cache_write_tokens,
+            estimated_tokens=prompt_tokens is None,
+            text=text,
+        )
+
+    def on_llm_error(self, error, **kwargs):
+        self._record(error=repr(error))
+
+    def _record(self, text="", error=None, estimated_tokens=False, **tokens):
+        latency = time.perf_counter() - self.start if self.start else None
+        if estimated_tokens:
+            tokens = {
+                **tokens,
+                "prompt_tokens": count_tokens(self.prompt_text),
+                "completion_tokens": count_tokens(text),
+            }
+        self.usage = tokens
+        self.recorder.record(
+            provider=self.provider,
+            model=self.model,
+            queue_wait=self.queue_wait,
+            time_to_first_token=self.time_to_first_token,
+            latency=latency,
+            error=error,
+            estimated_tokens=estimated_tokens,
+            **tokens,
+        )
@@ -0,0 +1,82 @@
+import argparse
+import multiprocessing
+import os
+
+from .api_server import DEFAULT_HOST
+from .api_server import DEFAULT_PORT as API_PORT
+from .llm_chain_manager import LLM_PROVIDERS
+from .session_backend import SESSION_BACKEND_URL, open_session_backend
+
+# Port of the first worker of each interface; the others take the next ones
+BASE_PORTS = {"gradio": 7860, "serve": API_PORT}
+# Used when neither --session-backend nor CHATBOT_SESSION_BACKEND is given
+DEFAULT_SESSION_BACKEND = "sqlite:///chat_sessions.sqlite3"
+
+
+def run_worker(interface, host, port, engine):
+    """
+    Serve one worker process of the interface on port.
+    """
+    if interface == "gradio":
+        from .chatbot_gr import GradioChatbot
+
+        GradioChatbot().launch(server_name=host, server_port=port)
+    else:
+        from .api_server import main
+
+        main(["--engine", engine, "--host", host, "--port", str(port)])
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py workers",
+        description="Run several worker processes sharing their chat sessions, "
+        "one port each, to put behind a load balancer.",
+    )
+    parser.add_argument("interface", choices=sorted(BASE_PORTS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--base-port", type=int, help="port of the first worker")
+    parser.add_argument(
+        "--engine", choices=sorted(LLM_PROVIDERS), help="required for serve"
+    )
+    parser.add_argument(
+        "--session-backend",
+        default=SESSION_BACKEND_URL or DEFAULT_SESSION_BACKEND,
+        help="sqlite:///path or redis://host:port/db",
+    )
+    args = parser.parse_args(argv)
+    if args.interface == "serve" and args.engine is None:
+        parser.error("serve needs --engine")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Create the backend's tables once, and fail here on a bad URL rather than
+    # in every worker
+    open_session_backend(args.session_backend).close()
+    # The workers are spawned fresh and read the backend when they import it
+    os.environ["CHATBOT_SESSION_BACKEND"] = args.session_backend
+
+    base_port = args.base_port or BASE_PORTS[args.interface]
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for port in range(base_port, base_port + args.workers):
+        worker = context.Process(
+            target=run_worker,
+            args=(args.interface, args.host, port, args.engine),
+            name=f"{args.interface}-{port}",
+        )
+        worker.start()
+        workers.append(worker)
+        print(f"Worker {worker.name} serving http://{args.host}:{port}")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+    return 0
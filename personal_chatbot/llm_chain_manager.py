@@ -1,23 +1,30 @@
+import asyncio
+import importlib
+import itertools
 import os
+import time
+import weakref
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional
 
 from dotenv import load_dotenv
-from langchain.chains import LLMChain
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import (
     ChatPromptTemplate,
     HumanMessagePromptTemplate,
     MessagesPlaceholder,
 )
 from langchain.schema import SystemMessage
-from langchain_anthropic import ChatAnthropic
-from langchain_cohere import ChatCohere
-from langchain_community.llms.cloudflare_workersai import CloudflareWorkersAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_ollama import ChatOllama
-from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import StdOutCallbackHandler
+
+from .client_pool import CLIENT_POOL
+from .instrumentation import MetricsCallbackHandler, MetricsRecorder
+from .memory import TokenBudgetMemory, count_tokens, history_token_budget
+from .message_log import MessageLog
+from .prompt_cache import mark_cacheable, mark_history, prompt_cache_params
+from .proxy import attach_proxy, proxy_params
+from .rate_limiter import RateLimitScheduler
+from .response_cache import ResponseCache, digest, history_digest
+from .warmup import WARMUP_PROMPT, preload_ollama
 
 load_dotenv()
 
@@ -37,40 +44,81 @@ class Configuration:
     CF_ACCOUNT_ID = os.environ.get("CF_ACCOUNT_ID")
     CF_API_KEY = os.environ.get("CF_WORKER_AI_TOKEN")
     NVIDIA_API_KEY = os.environ.get("NVIDIA_API_KEY")
+    # Proxy URL for providers with "use_proxy", e.g. "http://127.0.0.1:8080"
+    PROXY = os.environ.get("PROXY")
+    # Opt-in cache for temperature 0 responses, e.g. "response_cache.sqlite3"
+    RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH")
+    RESPONSE_CACHE_SEMANTIC = os.environ.get("RESPONSE_CACHE_SEMANTIC") == "1"
+    # Rotating JSONL log of per-call metrics, e.g. "chatbot_metrics.jsonl"
+    METRICS_PATH = os.environ.get("METRICS_PATH")
+    # Print every full prompt sent to the model
+    VERBOSE = os.environ.get("CHATBOT_VERBOSE") == "1"
+    # Connect and check credentials in the background when an engine is chosen
+    WARMUP = os.environ.get("CHATBOT_WARMUP", "1") == "1"
+    # Providers answering, in order, when the chosen one fails before its first
+    # chunk, e.g. "Groq-llama3-70b-8192,Cohere"; see also "fallbacks" below
+    FALLBACKS = [
+        name for name in os.environ.get("CHATBOT_FALLBACKS", "").split(",") if name
+    ]
+    # Seconds without a first chunk before the next fallback is also asked
+    HEDGE_AFTER = float(os.environ.get("CHATBOT_HEDGE_AFTER", 0)) or None
 
 
-# LLM provider classes and parameters
+# LLM provider classes (as dotted import paths) and parameters. "context_window"
+# is the model's limit in tokens and sizes the history budget; "memory" picks
+# one of MEMORY_STRATEGIES (default "window", "buffer" without a context window).
+# "requests_per_minute" and "tokens_per_minute" are the account's rate limits,
+# enforced for the whole process by SCHEDULER. "use_proxy" routes the provider's
+# own HTTP client through Configuration.PROXY (see PROXY_ADAPTERS). "prompt_cache"
+# ("anthropic" or "gemini", with a versioned "cache_model") caches the system
+# prompt and older history server-side. "warmup": "ollama" preloads the local
+# model when the engine is chosen. "fallbacks" lists the providers that answer,
+# in order, when this one fails or exceeds its "timeout" (seconds) before its
+# first chunk (default Configuration.FALLBACKS).
 LLM_PROVIDERS: Dict[str, Dict[str, object]] = {
     "Cohere": {
-        "class": ChatCohere,
+        "class": "langchain_cohere.ChatCohere",
+        "context_window": 128000,
+        # Trial key limit
+        "requests_per_minute": 20,
         "params": {
             "base_url": Configuration.COHERE_BASE_URL,
             "cohere_api_key": Configuration.COHERE_API_KEY,
         },
     },
     "Anthropic-Haiku-3": {
-        "class": ChatAnthropic,
+        "class": "langchain_anthropic.ChatAnthropic",
+        "context_window": 200000,
+        "prompt_cache": "anthropic",
         "params": {
             "model_name": "claude-3-haiku-20240307",
             "api_key": Configuration.ANTHROPIC_API_KEY,
         },
     },
     "Anthropic-Sonnet-3.5": {
-        "class": ChatAnthropic,
+        "class": "langchain_anthropic.ChatAnthropic",
+        "context_window": 200000,
+        "prompt_cache": "anthropic",
         "params": {
             "model_name": "claude-3-5-sonnet-20240620",
             "api_key": Configuration.ANTHROPIC_API_KEY,
         },
     },
     "Anthropic-Opus-3": {
-        "class": ChatAnthropic,
+        "class": "langchain_anthropic.ChatAnthropic",
+        "context_window": 200000,
+        "prompt_cache": "anthropic",
         "params": {
             "model_name": "claude-3-opus-20240229",
             "api_key": Configuration.ANTHROPIC_API_KEY,
         },
     },
     "Google-Gemini-1.5-pro-latest": {
-        "class": ChatGoogleGenerativeAI,
+        "class": "langchain_google_genai.ChatGoogleGenerativeAI",
+        "context_window": 2097152,
+        # Cached contents need a pinned model version
+        "prompt_cache": "gemini",
+        "cache_model": "models/gemini-1.5-pro-001",
         "params": {
             "model": "gemini-1.5-pro-latest",
             "api_key": Configuration.GOOGLE_API_KEY,
@@ -79,7 +127,11 @@ LLM_PROVIDERS: Dict[str, Dict[str, object]] = {
         "use_proxy": True,
     },
     "Google-Gemini-1.5-flash-latest": {
-        "class": ChatGoogleGenerativeAI,
+        "class": "langchain_google_genai.ChatGoogleGenerativeAI",
+        "context_window": 1048576,
+        # Cached contents need a pinned model version
+        "prompt_cache": "gemini",
+        "cache_model": "models/gemini-1.5-flash-001",
         "params": {
             "model": "gemini-1.5-flash-latest",
             "api_key": Configuration.GOOGLE_API_KEY,
@@ -87,28 +139,41 @@ LLM_PROVIDERS: Dict[str, Dict[str, object]] = {
         "use_proxy": True,
     },
     "Groq-llama3-70b-8192": {
-        "class": ChatGroq,
+        "class": "langchain_groq.ChatGroq",
+        "context_window": 8192,
+        "memory": "hybrid",
+        "requests_per_minute": 30,
+        "tokens_per_minute": 6000,
         "params": {
             "model_name": "llama3-70b-8192",
             "groq_api_key": Configuration.GROQ_API_KEY,
         },
     },
     "Groq-mixtral-8x7b-32768": {
-        "class": ChatGroq,
+        "class": "langchain_groq.ChatGroq",
+        "context_window": 32768,
+        "requests_per_minute": 30,
+        "tokens_per_minute": 5000,
         "params": {
             "model_name": "mixtral-8x7b-32768",
             "groq_api_key": Configuration.GROQ_API_KEY,
         },
     },
     "Ollama-phi3": {
-        "class": ChatOllama,
+        "class": "langchain_ollama.ChatOllama",
+        "context_window": 2048,
+        "memory": "hybrid",
+        "warmup": "ollama",
         "params": {
             "model": "phi3",
         },
         "use_proxy": False,
     },
     "Cloudflare-llama-3": {
-        "class": CloudflareWorkersAI,
+        "class": "langchain_community.llms.cloudflare_workersai.CloudflareWorkersAI",  # noqa: E501
+        "context_window": 8192,
+        "memory": "hybrid",
+        "requests_per_minute": 300,
         "params": {
             "account_id": Configuration.CF_ACCOUNT_ID,
             "api_token": Configuration.CF_API_KEY,
@@ -117,7 +182,8 @@ LLM_PROVIDERS: Dict[str, Dict[str, object]] = {
         "use_proxy": False,
     },
     "NVIDIA-llama-3.1": {
-        "class": ChatOpenAI,
+        "class": "langchain_openai.ChatOpenAI",
+        "context_window": 128000,
         "params": {
             "base_url": "https://integrate.api.nvidia.com/v1",
             "api_key": Configuration.NVIDIA_API_KEY,
@@ -128,65 +194,573 @@ LLM_PROVIDERS: Dict[str, Dict[str, object]] = {
 }
 
 
+# Provider classes are imported on first use, keyed by dotted path
+_PROVIDER_CLASSES: Dict[str, type] = {}
+_PROVIDER_IMPORT_TIMES: Dict[str, float] = {}
+
+
+def resolve_provider_class(provider):
+    """
+    Import (once) and return the LLM class registered for the provider.
+    """
+    provider_config = LLM_PROVIDERS.get(provider)
+    if not provider_config:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    class_path = provider_config["class"]
+    if not isinstance(class_path, str):
+        return class_path
+
+    if class_path not in _PROVIDER_CLASSES:
+        module_name, _, class_name = class_path.rpartition(".")
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        _PROVIDER_CLASSES[class_path] = getattr(module, class_name)
+        _PROVIDER_IMPORT_TIMES[class_path] = time.perf_counter() - start
+    return _PROVIDER_CLASSES[class_path]
+
+
+def provider_import_report() -> Dict[str, Optional[float]]:
+    """
+    Return the import time in seconds of each provider's class, or None for
+    providers whose SDK has not been imported yet.
+    """
+    return {
+        provider: _PROVIDER_IMPORT_TIMES.get(config["class"])
+        for provider, config in LLM_PROVIDERS.items()
+    }
+
+
+# Concurrent requests allowed per provider unless its entry sets "max_concurrency"
+DEFAULT_MAX_CONCURRENCY = 4
+
+# asyncio semaphores are bound to one event loop, so they are kept per loop
+_PROVIDER_SEMAPHORES = weakref.WeakKeyDictionary()
+
+
+def provider_semaphore(provider):
+    """
+    Return the semaphore limiting concurrent requests to the provider on the
+    running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    semaphores = _PROVIDER_SEMAPHORES.setdefault(loop, {})
+    if provider not in semaphores:
+        limit = LLM_PROVIDERS.get(provider, {}).get(
+            "max_concurrency", DEFAULT_MAX_CONCURRENCY
+        )
+        semaphores[provider] = asyncio.Semaphore(limit)
+    return semaphores[provider]
+
+
+def provider_limits(provider):
+    """
+    Return the provider's (requests_per_minute, tokens_per_minute) limits.
+    """
+    provider_config = LLM_PROVIDERS.get(provider, {})
+    return (
+        provider_config.get("requests_per_minute"),
+        provider_config.get("tokens_per_minute"),
+    )
+
+
+# Rate limits shared by every LLMChainManager, interactive or batch
+SCHEDULER = RateLimitScheduler(provider_limits)
+
+# Per-call latency and token records shared by every LLMChainManager
+METRICS = MetricsRecorder(Configuration.METRICS_PATH)
+
+_RESPONSE_CACHE = None
+
+
+def get_response_cache():
+    """
+    Return the process-wide response cache, or None if it is not enabled.
+    """
+    global _RESPONSE_CACHE
+    if _RESPONSE_CACHE is None and Configuration.RESPONSE_CACHE_PATH:
+        _RESPONSE_CACHE = ResponseCache(
+            Configuration.RESPONSE_CACHE_PATH,
+            semantic=Configuration.RESPONSE_CACHE_SEMANTIC,
+        )
+    return _RESPONSE_CACHE
+
+
 # LLMChain Logic Manager
 class LLMChainManager:
     """
-    Manager class for LLMChain logic. Initializes and manages the LLMChain components.
+    Manager class for LLMChain logic. Initializes and manages the LLMChain components
+    and exposes blocking (stream, send) and async (astream, asend, abatch) calls
+    built on the LangChain runnable interface.
     """
 
     def __init__(self, system_prompt, temperature):
         self.system_prompt = system_prompt
         self.temperature = temperature
+        self.provider = None
+        # Requests waiting for a rate-limited provider are served round-robin
+        # across session ids
+        self.session_id = None
         self.llm = None
         self.prompt = None
         self.memory = None
         self.llm_chain = None
+        self.last_timings = {"time_to_first_token": None, "total": None}
+        self.last_usage = {}
+        self.response_cache = get_response_cache()
+        self.metrics = METRICS
+        self.scheduler = SCHEDULER
+        self.last_response_cached = False
+        # Tokens of the system prompt held in a server-side cached content
+        self.cached_prefix_tokens = 0
+        # Providers to fail over to, None for the provider's configured ones
+        self.fallbacks = None
+        self.router = None
 
     def init_llm(self, provider):
         """
         Initialize the LLM component based on the provider.
         """
-        provider_config = LLM_PROVIDERS.get(provider)
-        if not provider_config:
-            raise ValueError(f"Unsupported LLM provider: {provider}")
-
-        llm_class = provider_config["class"]
-        llm_params = provider_config["params"]
-        use_proxy = provider_config.get("use_proxy", False)
-        if use_proxy:
-            proxy = os.getenv("PROXY")
-            os.environ["http_proxy"] = proxy
-            os.environ["HTTP_PROXY"] = proxy
-            os.environ["https_proxy"] = proxy
-            os.environ["HTTPS_PROXY"] = proxy
+        llm_class = resolve_provider_class(provider)
+        provider_config = LLM_PROVIDERS[provider]
+        self.provider = provider
+        # The proxy is set on this provider's own HTTP clients only
+        proxy = Configuration.PROXY if provider_config.get("use_proxy") else None
+        llm_params, self.cached_prefix_tokens = prompt_cache_params(
+            provider_config, provider_config["params"], self.system_prompt, proxy
+        )
+        if proxy:
+            llm_params = proxy_params(llm_class, llm_params, proxy)
 
-        self.llm = llm_class(**llm_params)
+        # Clients are reused across managers so their HTTP connections stay warm
+        self.llm = CLIENT_POOL.get(provider, llm_class, llm_params, self.temperature)
+        if proxy:
+            self.llm = attach_proxy(self.llm, proxy)
 
     def init_prompt(self):
         """
         Initialize the prompt template with the system prompt and placeholders for
         chat history and human input.
         """
-        self.prompt = ChatPromptTemplate.from_messages(
-            [
-                SystemMessage(content=self.system_prompt),
-                MessagesPlaceholder(variable_name="chat_history"),
-                HumanMessagePromptTemplate.from_template("{human_input}"),
-            ]
-        )
+        system_message = SystemMessage(content=self.system_prompt)
+        if self._prompt_cache() == "anthropic":
+            system_message = mark_cacheable(system_message)
+        messages = [
+            system_message,
+            MessagesPlaceholder(variable_name="chat_history"),
+            HumanMessagePromptTemplate.from_template("{human_input}"),
+        ]
+        if self.cached_prefix_tokens:
+            # The system prompt is sent by reference to the cached content
+            messages = messages[1:]
+        self.prompt = ChatPromptTemplate.from_messages(messages)
 
-    def init_memory(self):
+    def init_memory(self, message_log=None):
         """
-        Initialize the memory component to store chat history.
+        Initialize the memory component to store chat history, trimmed to the
+        provider's context window with the provider's memory strategy. The
+        turns are kept in message_log, or in a new MessageLog.
         """
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history", return_messages=True
+        provider_config = LLM_PROVIDERS.get(self.provider, {})
+        if provider_config.get("context_window"):
+            strategy = provider_config.get("memory", "window")
+        else:
+            strategy = "buffer"
+        if message_log is None:
+            message_log = MessageLog()
+        else:
+            message_log.start_context()
+        self.memory = TokenBudgetMemory(
+            chat_memory=message_log,
+            memory_key="chat_history",
+            max_tokens=self._history_token_budget(),
+            strategy=strategy,
+            llm=self.llm,
+            invoke=self._invoke_llm,
+            ainvoke=self._ainvoke_llm,
         )
 
+    def _history_token_budget(self):
+        context_window = LLM_PROVIDERS.get(self.provider, {}).get("context_window")
+        if not context_window:
+            return 0
+        return history_token_budget(context_window, self.system_prompt)
+
     def init_llm_chain(self):
         """
-        Initialize the LLMChain with the LLM, prompt, and memory components.
+        Initialize the chain runnable piping the prompt into the LLM, and the
+        router failing over to the fallback providers if there are any. Memory
+        is loaded and saved around each call by stream/astream.
         """
-        self.llm_chain = LLMChain(
-            llm=self.llm, prompt=self.prompt, memory=self.memory, verbose=True
+        self.llm_chain = self.prompt | self.llm
+        fallbacks = self.fallback_providers()
+        if fallbacks:
+            from .router import ProviderRouter
+
+            self.router = ProviderRouter.for_manager(
+                self, fallbacks, Configuration.HEDGE_AFTER
+            )
+        else:
+            self.router = None
+
+    def fallback_providers(self):
+        """
+        Return the known providers to fail over to, in order.
+        """
+        if self.fallbacks is not None:
+            return self.fallbacks
+        configured = LLM_PROVIDERS.get(self.provider, {}).get(
+            "fallbacks", Configuration.FALLBACKS
         )
+        return [
+            provider
+            for provider in configured
+            if provider != self.provider and provider in LLM_PROVIDERS
+        ]
+
+    def set_session_id(self, session_id):
+        """
+        Queue the requests of this manager and of its fallbacks under session_id.
+        """
+        self.session_id = session_id
+        if self.router is not None:
+            for manager in self.router.managers.values():
+                manager.session_id = session_id
+
+    def set_system_prompt(self, system_prompt):
+        """
+        Swap the system prompt in place, keeping the memory and, unless the
+        system prompt is cached server-side, the LLM client.
+        """
+        self.system_prompt = system_prompt
+        if self._prompt_cache() == "gemini":
+            # The cached content holds the old system prompt
+            self.init_llm(self.provider)
+            self.memory.llm = self.llm
+        self.init_prompt()
+        self.memory.max_tokens = self._history_token_budget()
+        self.init_llm_chain()
+
+    def set_temperature(self, temperature):
+        """
+        Switch to the pooled client for the new temperature, keeping the prompt
+        and memory.
+        """
+        self.temperature = temperature
+        self.init_llm(self.provider)
+        self.memory.llm = self.llm
+        self.init_llm_chain()
+
+    def stream(self, user_input, commit=True):
+        """
+        Stream the response to the user input chunk by chunk. The turn is
+        committed to memory only once the stream has finished, so an abandoned
+        stream leaves the conversation untouched. With commit=False the turn is
+        left for the caller to save with commit(). With fallback providers, the
+        router answers.
+        """
+        if self.router is not None:
+            return self.router.stream(user_input, commit)
+        return self._stream_turn(user_input, commit)
+
+    def _stream_turn(self, user_input, commit):
+        start = self._start_turn()
+        inputs = self._chain_inputs(user_input)
+        cache_scope = self._cache_scope(inputs)
+        response = self._cached_response(cache_scope, user_input, start)
+        if response is not None:
+            yield response
+        else:
+            chunks = []
+            for text in self._stream_llm(inputs, start):
+                chunks.append(text)
+                yield text
+            response = "".join(chunks)
+            self._cache_response(cache_scope, user_input, response)
+        if commit:
+            self.commit(user_input, response)
+        self.last_timings["total"] = time.perf_counter() - start
+
+    def astream(self, user_input, commit=True):
+        """
+        Async counterpart of stream, limited to the provider's max concurrency.
+        With commit=False the turn is left for the caller to save to memory.
+        """
+        if self.router is not None:
+            return self.router.astream(user_input, commit)
+        return self._astream_turn(user_input, commit)
+
+    async def _astream_turn(self, user_input, commit):
+        start = self._start_turn()
+        inputs = self._chain_inputs(user_input)
+        cache_scope = self._cache_scope(inputs)
+        response = self._cached_response(cache_scope, user_input, start)
+        if response is not None:
+            yield response
+        else:
+            chunks = []
+            async for text in self._astream_llm(inputs, start):
+                chunks.append(text)
+                yield text
+            response = "".join(chunks)
+            self._cache_response(cache_scope, user_input, response)
+        if commit:
+            await self.memory.asave_context(
+                {"human_input": user_input}, {"text": response}
+            )
+        self.last_timings["total"] = time.perf_counter() - start
+
+    async def asend(self, user_input, commit=True):
+        """
+        Return the complete response to the user input.
+        """
+        return "".join([chunk async for chunk in self.astream(user_input, commit)])
+
+    def send(self, user_input):
+        """
+        Return the complete response to the user input.
+        """
+        return "".join(self.stream(user_input))
+
+    async def abatch(self, user_inputs, return_exceptions=False):
+        """
+        Answer independent inputs concurrently on the running event loop, each
+        against the current conversation. The turns are not saved to memory.
+        """
+        return await asyncio.gather(
+            *(self.asend(user_input, commit=False) for user_input in user_inputs),
+            return_exceptions=return_exceptions,
+        )
+
+    def warm_up(self):
+        """
+        Open the provider connection, preload local models and check the
+        credentials with a tiny request, so the first message pays no setup
+        cost. Raises the provider's error, e.g. for an invalid key. Returns
+        the seconds taken.
+        """
+        start = time.perf_counter()
+        if LLM_PROVIDERS[self.provider].get("warmup") == "ollama":
+            preload_ollama(self.llm)
+        limiter = self.scheduler.limiter(self.provider)
+        if limiter:
+            limiter.acquire_sync(self._session_key(), count_tokens(WARMUP_PROMPT))
+        self.llm.invoke(WARMUP_PROMPT)
+        return time.perf_counter() - start
+
+    async def awarm_up(self):
+        """
+        Async counterpart of warm_up, warming the async HTTP client used by
+        astream.
+        """
+        start = time.perf_counter()
+        if LLM_PROVIDERS[self.provider].get("warmup") == "ollama":
+            await asyncio.to_thread(preload_ollama, self.llm)
+        limiter = self.scheduler.limiter(self.provider)
+        if limiter:
+            await limiter.acquire(self._session_key(), count_tokens(WARMUP_PROMPT))
+        await self.llm.ainvoke(WARMUP_PROMPT)
+        return time.perf_counter() - start
+
+    def _stream_llm(self, inputs, start):
+        # Waits for the provider's rate limits and retries rate limit errors
+        queued = time.perf_counter()
+        limiter = self.scheduler.limiter(self.provider)
+        reserved = self._prompt_tokens(inputs) if limiter else 0
+        for attempt in itertools.count():
+            if limiter:
+                limiter.acquire_sync(self._session_key(), reserved)
+            config = self._run_config(queue_wait=time.perf_counter() - queued)
+            streamed = False
+            try:
+                for chunk in self.llm_chain.stream(inputs, config=config):
+                    text = self._chunk_text(chunk, start)
+                    if text:
+                        streamed = True
+                        yield text
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, streamed)
+                if delay is None:
+                    raise
+            else:
+                self._settle_usage(limiter, config, reserved)
+                return
+            time.sleep(delay)
+
+    async def _astream_llm(self, inputs, start):
+        # Async counterpart of _stream_llm, also bounded by max_concurrency
+        queued = time.perf_counter()
+        limiter = self.scheduler.limiter(self.provider)
+        reserved = self._prompt_tokens(inputs) if limiter else 0
+        for attempt in itertools.count():
+            if limiter:
+                await limiter.acquire(self._session_key(), reserved)
+            async with provider_semaphore(self.provider):
+                config = self._run_config(queue_wait=time.perf_counter() - queued)
+                streamed = False
+                try:
+                    async for chunk in self.llm_chain.astream(inputs, config=config):
+                        text = self._chunk_text(chunk, start)
+                        if text:
+                            streamed = True
+                            yield text
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, streamed)
+                    if delay is None:
+                        raise
+                else:
+                    self._settle_usage(limiter, config, reserved)
+                    return
+            await asyncio.sleep(delay)
+
+    def _invoke_llm(self, prompt):
+        # A call outside the conversation, e.g. a memory summary, paced by the
+        # rate limits and recorded in the metrics like the conversation's own
+        queued = time.perf_counter()
+        limiter = self.scheduler.limiter(self.provider)
+        reserved = count_tokens(prompt) if limiter else 0
+        for attempt in itertools.count():
+            if limiter:
+                limiter.acquire_sync(self._session_key(), reserved)
+            config = self._run_config(queue_wait=time.perf_counter() - queued)
+            try:
+                response = self.llm.invoke(prompt, config=config)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, streamed=False)
+                if delay is None:
+                    raise
+            else:
+                self._settle(limiter, config, reserved)
+                return response
+            time.sleep(delay)
+
+    async def _ainvoke_llm(self, prompt):
+        # Async counterpart of _invoke_llm, also bounded by max_concurrency
+        queued = time.perf_counter()
+        limiter = self.scheduler.limiter(self.provider)
+        reserved = count_tokens(prompt) if limiter else 0
+        for attempt in itertools.count():
+            if limiter:
+                await limiter.acquire(self._session_key(), reserved)
+            async with provider_semaphore(self.provider):
+                config = self._run_config(queue_wait=time.perf_counter() - queued)
+                try:
+                    response = await self.llm.ainvoke(prompt, config=config)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, streamed=False)
+                    if delay is None:
+                        raise
+                else:
+                    self._settle(limiter, config, reserved)
+                    return response
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, error, attempt, streamed):
+        # A response that has started streaming cannot be taken back
+        if streamed:
+            return None
+        return self.scheduler.retry_delay(self.provider, error, attempt)
+
+    def _session_key(self):
+        return self.session_id or f"manager-{id(self)}"
+
+    def _prompt_tokens(self, inputs):
+        return (
+            count_tokens(self.system_prompt)
+            + sum(count_tokens(str(m.content)) for m in inputs["chat_history"])
+            + count_tokens(inputs["human_input"])
+        )
+
+    def _settle_usage(self, limiter, config, reserved):
+        self.last_usage = self._settle(limiter, config, reserved)
+
+    def _settle(self, limiter, config, reserved):
+        # Returns the call's usage, correcting the limiter's token estimate
+        usage = config["callbacks"][0].usage
+        if limiter:
+            used = (usage.get("prompt_tokens") or 0) + (
+                usage.get("completion_tokens") or 0
+            )
+            limiter.settle(used - reserved)
+        return usage
+
+    def _model_name(self):
+        params = LLM_PROVIDERS[self.provider]["params"]
+        return params.get("model") or params.get("model_name")
+
+    def _run_config(self, queue_wait):
+        handler = MetricsCallbackHandler(
+            self.metrics,
+            self.provider,
+            self._model_name(),
+            queue_wait,
+            cached_prefix_tokens=self.cached_prefix_tokens,
+        )
+        callbacks = [handler]
+        if Configuration.VERBOSE:
+            callbacks.append(StdOutCallbackHandler())
+        return {"callbacks": callbacks}
+
+    def _cache_scope(self, inputs):
+        # Only deterministic calls are cached
+        if self.response_cache is None or self.temperature != 0:
+            return None
+        return digest(
+            self.provider,
+            self._model_name(),
+            self.system_prompt,
+            history_digest(inputs["chat_history"]),
+        )
+
+    def _cached_response(self, cache_scope, user_input, start):
+        self.last_response_cached = False
+        if cache_scope is None:
+            return None
+        response = self.response_cache.get(cache_scope, user_input)
+        if response is not None:
+            self.last_response_cached = True
+            self.last_usage = {"prompt_tokens": 0, "completion_tokens": 0}
+            self._chunk_text(response, start)
+            self.metrics.record(
+                provider=self.provider,
+                model=self._model_name(),
+                queue_wait=0.0,
+                time_to_first_token=self.last_timings["time_to_first_token"],
+                latency=time.perf_counter() - start,
+                prompt_tokens=0,
+                completion_tokens=0,
+                error=None,
+                cached=True,
+            )
+        return response
+
+    def _cache_response(self, cache_scope, user_input, response):
+        if cache_scope is not None:
+            self.response_cache.put(cache_scope, user_input, response)
+
+    def _start_turn(self):
+        self.last_timings = {"time_to_first_token": None, "total": None}
+        self.last_usage = {}
+        return time.perf_counter()
+
+    def _chain_inputs(self, user_input):
+        chat_history = self.memory.load_memory_variables({})["chat_history"]
+        if self._prompt_cache() == "anthropic":
+            chat_history = mark_history(chat_history)
+        return {"chat_history": chat_history, "human_input": user_input}
+
+    def _prompt_cache(self):
+        return LLM_PROVIDERS.get(self.provider, {}).get("prompt_cache")
+
+    def _chunk_text(self, chunk, start):
+        # Chat models yield message chunks, plain LLMs yield strings
+        text = getattr(chunk, "content", chunk)
+        if text and self.last_timings["time_to_first_token"] is None:
+            self.last_timings["time_to_first_token"] = time.perf_counter() - start
+        return text
+
+    def commit(self, user_input, response):
+        """
+        Save a turn streamed with commit=False to memory.
+        """
+        self.memory.save_context({"human_input": user_input}, {"text": response})
@@ -0,0 +1,189 @@
+import math
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain.schema import BaseMessage, SystemMessage, get_buffer_string
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.pydantic_v1 import Field, validator
+
+from .message_log import MessageLog
+
+# "buffer" keeps everything, "window" drops the oldest turns beyond the budget,
+# "summary" folds everything but the latest exchange into a rolling summary and
+# "hybrid" keeps recent turns up to the budget and summarizes the rest.
+MEMORY_STRATEGIES = ("buffer", "window", "summary", "hybrid")
+
+# Share of the provider's context window given to the conversation history; the
+# rest is left for the system prompt, the new input and the response
+HISTORY_SHARE = 0.5
+
+# Messages that are always kept verbatim: the latest user input and response
+MIN_KEPT_MESSAGES = 2
+
+
+def count_tokens(text):
+    """
+    Approximate the number of tokens in the text (about four characters each).
+    """
+    return math.ceil(len(text) / 4)
+
+
+def history_token_budget(context_window, system_prompt):
+    """
+    Return the number of tokens available to the conversation history.
+    """
+    return max(int(context_window * HISTORY_SHARE) - count_tokens(system_prompt), 0)
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """
+    Chat memory that keeps the conversation within a token budget.
+
+    Each message is counted once when it is saved and the counts are kept
+    alongside the messages, so trimming costs O(new messages) per turn. Trimmed
+    messages leave the LLM context but stay in the session's MessageLog for
+    display.
+
+    Summaries are written with invoke/ainvoke when set, so the manager can pace
+    and record them like its other calls; asave_context summarizes without
+    blocking the event loop, and add_turn replays stored turns without any
+    LLM call.
+    """
+
+    chat_memory: BaseChatMessageHistory = Field(default_factory=MessageLog)
+    memory_key: str = "chat_history"
+    return_messages: bool = True
+    max_tokens: int
+    strategy: str = "window"
+    llm: Optional[BaseLanguageModel] = None
+    """Model used to write the rolling summary."""
+    invoke: Optional[Callable] = None
+    """Blocking call of the summary model, llm.invoke by default."""
+    ainvoke: Optional[Callable] = None
+    """Async call of the summary model, llm.ainvoke by default."""
+    summary: str = ""
+    summary_tokens: int = 0
+    token_counts: List[int] = Field(default_factory=list)
+    total_tokens: int = 0
+
+    @validator("strategy")
+    def check_strategy(cls, strategy):
+        if strategy not in MEMORY_STRATEGIES:
+            raise ValueError(f"Unsupported memory strategy: {strategy}")
+        return strategy
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        messages: List[BaseMessage] = list(self.chat_memory.messages)
+        if self.summary:
+            messages.insert(
+                0,
+                SystemMessage(
+                    content=f"Summary of the earlier conversation:\n{self.summary}"
+                ),
+            )
+        return {self.memory_key: messages}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        self._add(inputs, outputs)
+        evicted = self._evicted()
+        if evicted and self._summarizes():
+            self._set_summary(self._summarize(self._summary_prompt(evicted)))
+        self._forget(evicted)
+
+    async def asave_context(
+        self, inputs: Dict[str, Any], outputs: Dict[str, str]
+    ) -> None:
+        self._add(inputs, outputs)
+        evicted = self._evicted()
+        if evicted and self._summarizes():
+            prompt = self._summary_prompt(evicted)
+            self._set_summary(await self._asummarize(prompt))
+        self._forget(evicted)
+
+    def add_turn(self, user_input, response):
+        """
+        Save a stored turn, e.g. when resuming a conversation, without calling
+        the LLM: the oldest turns beyond the budget are dropped, not summarized.
+        """
+        self._add({"human_input": user_input}, {"text": response})
+        self._forget(self._evicted(summarize=False))
+
+    def clear(self) -> None:
+        super().clear()
+        self.summary = ""
+        self.summary_tokens = 0
+        self.token_counts = []
+        self.total_tokens = 0
+
+    def restore(self, rows, summary=""):
+        """
+        Replace the conversation with the MessageLog context_records() rows and
+        summary saved by another memory, e.g. in another worker process.
+        """
+        self.chat_memory.load_context(rows)
+        self.token_counts = [count_tokens(content) for _, content, _ in rows]
+        self.total_tokens = sum(self.token_counts)
+        self.summary = summary
+        self.summary_tokens = count_tokens(summary) if summary else 0
+
+    def _add(self, inputs, outputs):
+        super().save_context(inputs, outputs)
+        for message in self.chat_memory.context_messages(len(self.token_counts)):
+            tokens = count_tokens(message.content)
+            self.token_counts.append(tokens)
+            self.total_tokens += tokens
+
+    def _summarizes(self):
+        return self.strategy in ("summary", "hybrid")
+
+    def _evicted(self, summarize=True):
+        # Number of the oldest messages to take out of the context; without a
+        # summary, "summary" memory falls back to the budget like "window"
+        if self.strategy == "buffer":
+            return 0
+        removable = len(self.token_counts) - MIN_KEPT_MESSAGES
+        if self.strategy == "summary" and summarize:
+            return max(removable, 0)
+        budget = self.max_tokens - self.summary_tokens
+        evicted, tokens = 0, self.total_tokens
+        while evicted < removable and tokens > budget:
+            tokens -= self.token_counts[evicted]
+            evicted += 1
+        return evicted
+
+    def _forget(self, evicted):
+        if evicted <= 0:
+            return
+        self.total_tokens -= sum(self.token_counts[:evicted])
+        del self.token_counts[:evicted]
+        self.chat_memory.forget(evicted)
+
+    def _summary_prompt(self, evicted):
+        messages = self.chat_memory.context_messages(0, evicted)
+        return SUMMARY_PROMPT.format(
+            summary=self.summary, new_lines=get_buffer_string(messages)
+        )
+
+    def _set_summary(self, response):
+        self.summary = getattr(response, "content", response)
+        self.summary_tokens = count_tokens(self.summary)
+
+    def _summarize(self, prompt):
+        if self.invoke is not None:
+            return self.invoke(prompt)
+        if self.llm is None:
+            raise ValueError(f"The {self.strategy} memory strategy needs an LLM")
+        return self.llm.invoke(prompt)
+
+    async def _asummarize(self, prompt):
+        if self.ainvoke is not None:
+            return await self.ainvoke(prompt)
+        if self.llm is None:
+            raise ValueError(f"The {self.strategy} memory strategy needs an LLM")
+        return await self.llm.ainvoke(prompt)
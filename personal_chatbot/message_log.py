@@ -0,0 +1,196 @@
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from collections.abc import Sequence
+
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+from langchain_core.chat_history import BaseChatMessageHistory
+
+# Messages kept in memory per session; older ones outside the LLM context are
+# appended to the session's spill file when CHATBOT_SPILL_DIR is set, or dropped
+# (every turn is also saved to the chat history store)
+RETAINED_MESSAGES = int(os.environ.get("CHATBOT_RETAINED_MESSAGES", 2000))
+SPILL_DIR = os.environ.get("CHATBOT_SPILL_DIR")
+# Share of the retained messages evicted at once, so spills are batched
+SPILL_BATCH = 0.1
+
+# Role tags are shared by every record instead of stored per message
+USER = sys.intern("user")
+AI = sys.intern("ai")
+SYSTEM = sys.intern("system")
+_ROLES = {"human": USER, "ai": AI, "system": SYSTEM}
+_MESSAGE_CLASSES = {USER: HumanMessage, AI: AIMessage, SYSTEM: SystemMessage}
+
+
+class LogRecord:
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role, content, timestamp):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+
+
+class TextView(Sequence):
+    """
+    The log's in-memory messages as display lines, rendered when accessed.
+    """
+
+    def __init__(self, log, prefixes):
+        self._log = log
+        self._prefixes = prefixes
+
+    def __len__(self):
+        return len(self._log.records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._render(self._log.records[index])
+
+    def __iter__(self):
+        return (self._render(record) for record in self._log.records)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def _render(self, record):
+        return f"{self._prefixes[record.role]}{record.content}"
+
+
+class MessageLog(BaseChatMessageHistory):
+    """
+    A session's single message log, read by the UIs through TextView and by
+    the LLM memory through the messages property.
+
+    The memory drops old turns from the LLM context with forget(); they stay
+    in the log for display until more than max_messages are held, then the
+    oldest ones outside the context are spilled to spill_path or dropped.
+    """
+
+    def __init__(self, max_messages=RETAINED_MESSAGES, spill_path=None):
+        self.max_messages = max_messages
+        self.spill_path = spill_path
+        self.records = deque()
+        # Absolute positions of records[0] and of the first message in context
+        self.first_index = 0
+        self.context_start = 0
+
+    @classmethod
+    def for_session(cls, session_id):
+        spill_path = (
+            os.path.join(SPILL_DIR, f"{session_id}.jsonl") if SPILL_DIR else None
+        )
+        return cls(spill_path=spill_path)
+
+    @property
+    def messages(self):
+        """
+        The messages in the LLM context, as LangChain messages.
+        """
+        return self.context_messages()
+
+    def context_messages(self, start=0, stop=None):
+        """
+        Return the LLM context's messages start to stop as LangChain messages,
+        built from the records without copying the rest of the log.
+        """
+        offset = self.context_start - self.first_index
+        stop = None if stop is None else offset + stop
+        return [
+            _MESSAGE_CLASSES[record.role](content=record.content)
+            for record in itertools.islice(self.records, offset + start, stop)
+        ]
+
+    def context_records(self):
+        """
+        Return the LLM context's messages as [role, content, timestamp] lists.
+        """
+        offset = self.context_start - self.first_index
+        return [
+            [record.role, record.content, record.timestamp]
+            for record in itertools.islice(self.records, offset, None)
+        ]
+
+    def load_context(self, rows):
+        """
+        Replace the in-memory messages with rows from context_records(), all
+        of them in the LLM context. The spill file is left as it is.
+        """
+        self.records = deque(
+            LogRecord(sys.intern(role), content, timestamp)
+            for role, content, timestamp in rows
+        )
+        self.first_index = 0
+        self.context_start = 0
+
+    def add_message(self, message):
+        content = message.content
+        if not isinstance(content, str):
+            content = str(content)
+        self.records.append(LogRecord(_ROLES[message.type], content, time.time()))
+        if self.max_messages and len(self.records) > self.max_messages:
+            self._evict()
+
+    def forget(self, count):
+        """
+        Drop the oldest count messages from the LLM context, keeping them in
+        the log.
+        """
+        self.context_start += count
+
+    def start_context(self):
+        """
+        Start a new LLM context after the messages logged so far.
+        """
+        self.context_start = len(self)
+
+    def clear(self):
+        self.records.clear()
+        self.first_index = 0
+        self.context_start = 0
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+    def lines(self, prefixes):
+        """
+        Return a TextView rendering each message as its role's prefix followed by
+        its content.
+        """
+        return TextView(self, prefixes)
+
+    def spilled(self):
+        """
+        Yield the spilled messages as (role, content, timestamp), oldest first.
+        """
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path) as file:
+            for line in file:
+                yield tuple(json.loads(line))
+
+    def __len__(self):
+        return self.first_index + len(self.records)
+
+    def _evict(self):
+        # Only messages the LLM context no longer needs are evicted
+        count = min(
+            len(self.records)
+            - self.max_messages
+            + int(self.max_messages * SPILL_BATCH),
+            self.context_start - self.first_index,
+        )
+        if count <= 0:
+            return
+        evicted = [self.records.popleft() for _ in range(count)]
+        self.first_index += count
+        if self.spill_path:
+            with open(self.spill_path, "a") as file:
+                for record in evicted:
+                    file.write(
+                        json.dumps([record.role, record.content, record.timestamp])
+                        + "\n"
+                    )
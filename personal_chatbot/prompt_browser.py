@@ -0,0 +1,151 @@
+from tkinter import (
+    END,
+    Button,
+    Entry,
+    Frame,
+    Label,
+    LabelFrame,
+    Listbox,
+    StringVar,
+    Text,
+    Toplevel,
+    messagebox,
+)
+from tkinter.ttk import Combobox
+
+PAD = 2
+# Names listed at once by the browser and the dropdowns; typing narrows the rest
+MAX_LISTED = 200
+
+
+def parse_temperature(value):
+    """
+    Return the temperature as a float, or None unless it is between 0 and 1.
+    """
+    try:
+        temperature = float(value)
+    except ValueError:
+        return None
+    return temperature if 0 <= temperature <= 1 else None
+
+
+def filtering_combobox(parent, variable, manager):
+    """
+    Create a Combobox choosing a prompt of the manager's library. Its list is
+    filled when opened and narrowed as the user types, so adding prompts needs
+    no rebuild.
+    """
+    combobox = Combobox(parent, textvariable=variable, width=30)
+
+    def refresh(event=None):
+        text = variable.get()
+        query = "" if text in manager.get_prompts() else text
+        combobox["values"] = manager.names(query, MAX_LISTED)
+
+    combobox["postcommand"] = refresh
+    combobox.bind("<KeyRelease>", refresh)
+    return combobox
+
+
+class PromptBrowser:
+    """
+    Window listing a prompt library by name with a search box and a single
+    editor showing the selected entry. Only the first MAX_LISTED matches are
+    listed, so opening costs the same for any library size, and saving writes
+    back the edited entry alone, refusing if it was changed elsewhere meanwhile.
+    """
+
+    def __init__(self, root, title, manager, with_temperature=False, on_save=None):
+        self.manager = manager
+        self.with_temperature = with_temperature
+        self.on_save = on_save
+        self.selected = None
+        self.selected_version = None
+
+        self.window = Toplevel(root)
+        self.window.title(title)
+
+        self.query = StringVar()
+        self.query.trace_add("write", lambda *_: self.refresh())
+        Entry(self.window, textvariable=self.query, width=60).pack(pady=PAD)
+        self.status = StringVar()
+        Label(self.window, textvariable=self.status).pack()
+
+        body = Frame(self.window)
+        body.pack(pady=PAD)
+        self.name_list = Listbox(body, width=40, height=20, exportselection=False)
+        self.name_list.pack(side="left", pady=PAD)
+        self.name_list.bind("<<ListboxSelect>>", lambda _: self.select())
+
+        self.editor = LabelFrame(body, text="")
+        self.editor.pack(side="left", pady=PAD)
+        self.temperature_entry = None
+        if with_temperature:
+            Label(self.editor, text="Temperature (0-1):").pack()
+            self.temperature_entry = Entry(self.editor)
+            self.temperature_entry.pack()
+        Label(self.editor, text="Prompt Text:").pack()
+        self.prompt_text = Text(self.editor, height=18, width=80)
+        self.prompt_text.pack()
+        Button(self.editor, text="Save", command=self.save).pack(pady=PAD)
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        List the names matching the search box.
+        """
+        names = self.manager.names(self.query.get(), MAX_LISTED + 1)
+        self.name_list.delete(0, END)
+        self.name_list.insert(END, *names[:MAX_LISTED])
+        if len(names) > MAX_LISTED:
+            self.status.set(f"Showing the first {MAX_LISTED} matches, type to narrow")
+        else:
+            self.status.set(f"{len(names)} matches")
+
+    def select(self):
+        """
+        Load the selected entry into the editor.
+        """
+        selection = self.name_list.curselection()
+        if not selection:
+            return
+        self.selected = self.name_list.get(selection[0])
+        self.selected_version = self.manager.version(self.selected)
+        prompt = self.manager.get_prompts()[self.selected]
+        self.editor.configure(text=self.selected)
+        if self.with_temperature:
+            temperature, prompt = prompt
+            self.temperature_entry.delete(0, END)
+            self.temperature_entry.insert(0, temperature)
+        self.prompt_text.delete("1.0", END)
+        self.prompt_text.insert(END, prompt)
+
+    def save(self):
+        """
+        Write the edited entry back to the library.
+        """
+        if self.selected is None:
+            messagebox.showerror("Error", "Please select a prompt.")
+            return
+        prompt = self.prompt_text.get("1.0", "end-1c")
+        if self.with_temperature:
+            temperature = parse_temperature(self.temperature_entry.get())
+            if temperature is None:
+                messagebox.showerror(
+                    "Error",
+                    f"Invalid temperature for '{self.selected}': "
+                    "Must be between 0 and 1.",
+                )
+                return
+            prompt = (temperature, prompt)
+        try:
+            self.selected_version = self.manager.set_prompt(
+                self.selected, prompt, self.selected_version
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", f"{e}. Select it again to reload it.")
+            return
+        if self.on_save:
+            self.on_save(self.selected)
+        self.status.set(f"Saved '{self.selected}'")
@@ -0,0 +1,140 @@
+import datetime
+import logging
+import threading
+import time
+
+from .memory import count_tokens
+from .proxy import route_rest_client
+from .response_cache import digest
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a prefix Anthropic may cache for about five minutes
+CACHE_CONTROL = {"type": "ephemeral"}
+# Beta header enabling Anthropic prompt caching
+ANTHROPIC_CACHE_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+# Gemini caches contexts of at least this many tokens only
+GEMINI_MIN_CACHE_TOKENS = 32768
+GEMINI_CACHE_TTL = datetime.timedelta(hours=1)
+# Cached contents this close to expiry are recreated rather than reused
+GEMINI_CACHE_MARGIN = 60
+
+
+def mark_cacheable(message):
+    """
+    Return a copy of the message ending a cacheable prefix, with its content
+    as blocks and the last block carrying cache_control.
+    """
+    content = message.content
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [
+            dict(block) if isinstance(block, dict) else {"type": "text", "text": block}
+            for block in content
+        ]
+    if not blocks:
+        return message
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return message.copy(update={"content": blocks})
+
+
+def mark_history(chat_history):
+    """
+    Mark the end of the history so every earlier turn is read from the cache on
+    the next call.
+    """
+    if not chat_history:
+        return chat_history
+    return chat_history[:-1] + [mark_cacheable(chat_history[-1])]
+
+
+class GeminiContextCache:
+    """
+    Gemini cached contents holding long system prompts, created once per
+    (model, system prompt) and reused until shortly before they expire.
+    """
+
+    def __init__(self, ttl=GEMINI_CACHE_TTL):
+        self.ttl = ttl
+        self.write_tokens = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, model, system_prompt, api_key=None, proxy=None):
+        """
+        Return (cached content name, cached tokens) for the system prompt, or
+        (None, 0) when it is too short to cache or caching fails. The cached
+        content is created through proxy, if given.
+        """
+        if not model or count_tokens(system_prompt) < GEMINI_MIN_CACHE_TOKENS:
+            return None, 0
+        key = digest(model, system_prompt)
+        with self._lock:
+            entry = self._fresh_entry(key)
+        if entry:
+            return entry[0], entry[1]
+        # Created outside the lock, so other prompts are not held up meanwhile
+        try:
+            name, tokens = self._create(model, system_prompt, api_key, proxy)
+        except Exception as e:
+            logger.warning("Gemini context caching unavailable: %s", e)
+            return None, 0
+        with self._lock:
+            # Another thread may have cached the same prompt in the meantime
+            entry = self._fresh_entry(key)
+            if entry:
+                return entry[0], entry[1]
+            self._entries[key] = (name, tokens, time.time() + self.ttl.total_seconds())
+            self.write_tokens += tokens
+        return name, tokens
+
+    def _fresh_entry(self, key):
+        entry = self._entries.get(key)
+        if entry and entry[2] > time.time() + GEMINI_CACHE_MARGIN:
+            return entry
+        return None
+
+    def _create(self, model, system_prompt, api_key, proxy):
+        # A client of its own per call, leaving the SDK's global configuration
+        # alone
+        from google.ai import generativelanguage_v1beta as glm
+
+        client_options = {"api_key": api_key} if api_key else None
+        client = glm.CacheServiceClient(client_options=client_options, transport="rest")
+        if proxy:
+            route_rest_client(client, proxy)
+        cached = client.create_cached_content(
+            cached_content=glm.CachedContent(
+                model=model,
+                system_instruction=glm.Content(parts=[glm.Part(text=system_prompt)]),
+                ttl=self.ttl,
+            )
+        )
+        return cached.name, cached.usage_metadata.total_token_count
+
+
+# Gemini cached contents shared by every LLMChainManager in the process
+GEMINI_CONTEXT_CACHE = GeminiContextCache()
+
+
+def prompt_cache_params(provider_config, params, system_prompt, proxy=None):
+    """
+    Return the client params and the size of the server-side cached prefix for
+    the provider's "prompt_cache" strategy; other providers are unchanged.
+    Server-side caches are created through proxy, if given.
+    """
+    strategy = provider_config.get("prompt_cache")
+    if strategy == "anthropic":
+        headers = {**(params.get("default_headers") or {}), **ANTHROPIC_CACHE_HEADERS}
+        return {**params, "default_headers": headers}, 0
+    if strategy == "gemini":
+        name, tokens = GEMINI_CONTEXT_CACHE.get(
+            provider_config.get("cache_model"),
+            system_prompt,
+            params.get("api_key"),
+            proxy,
+        )
+        if name:
+            return {**params, "cached_content": name}, tokens
+    return params, 0
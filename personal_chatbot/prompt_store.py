@@ -0,0 +1,251 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .history_store import fts_query
+
+# SQLite file holding every prompt library, shared by all processes of the app
+PROMPT_STORE_PATH = os.environ.get("CHATBOT_PROMPT_STORE", "prompt_library.sqlite3")
+# Milliseconds a writer waits for another process's transaction to finish
+BUSY_TIMEOUT = 5000
+
+
+class PromptStore:
+    """
+    Prompt libraries in SQLite (WAL mode), one row per entry.
+
+    Every upsert is its own transaction that bumps the entry's version and keeps
+    the previous text in prompt_versions, so a crash loses at most the edit in
+    flight and concurrent writers never drop each other's entries. Names are
+    listed without reading prompt bodies, and data_version tells when another
+    connection has committed a change.
+    """
+
+    def __init__(self, path=PROMPT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        # Autocommit mode, so upserts can take the write lock up front
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT}")
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS prompts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                library TEXT NOT NULL,
+                name TEXT NOT NULL,
+                temperature REAL,
+                body TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                updated REAL NOT NULL,
+                UNIQUE (library, name)
+            );
+            CREATE TABLE IF NOT EXISTS prompt_versions (
+                library TEXT NOT NULL,
+                name TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                temperature REAL,
+                body TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (library, name, version)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS prompts_fts
+                USING fts5(name, body, content='prompts', content_rowid='id');
+            CREATE TRIGGER IF NOT EXISTS prompts_fts_insert AFTER INSERT ON prompts
+            BEGIN
+                INSERT INTO prompts_fts (rowid, name, body)
+                    VALUES (new.id, new.name, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS prompts_fts_update AFTER UPDATE ON prompts
+            BEGIN
+                INSERT INTO prompts_fts (prompts_fts, rowid, name, body)
+                    VALUES ('delete', old.id, old.name, old.body);
+                INSERT INTO prompts_fts (rowid, name, body)
+                    VALUES (new.id, new.name, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS prompts_fts_delete AFTER DELETE ON prompts
+            BEGIN
+                INSERT INTO prompts_fts (prompts_fts, rowid, name, body)
+                    VALUES ('delete', old.id, old.name, old.body);
+            END;
+            """
+        )
+
+    def _read(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    @property
+    def data_version(self):
+        """
+        A number that changes whenever another connection commits to the store.
+        """
+        return self._read("PRAGMA data_version")[0][0]
+
+    @property
+    def generation(self):
+        """
+        A value that changes whenever the store is written, by this connection
+        or another one.
+        """
+        return self.data_version, self._writes
+
+    def upsert(self, library, name, body, temperature=None, expected_version=None):
+        """
+        Add or replace one entry atomically and return its new version. With
+        expected_version, raise ValueError instead if the entry has changed
+        since that version was read.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT version, temperature, body, updated FROM prompts "
+                    "WHERE library = ? AND name = ?",
+                    (library, name),
+                ).fetchone()
+                version = row[0] if row else 0
+                if expected_version is not None and expected_version != version:
+                    raise ValueError(
+                        f"'{name}' was changed elsewhere (version {version}, "
+                        f"expected {expected_version})"
+                    )
+                if row:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO prompt_versions "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (library, name, *row),
+                    )
+                    self._connection.execute(
+                        "UPDATE prompts SET temperature = ?, body = ?, version = ?, "
+                        "updated = ? WHERE library = ? AND name = ?",
+                        (temperature, body, version + 1, now, library, name),
+                    )
+                else:
+                    self._connection.execute(
+                        "INSERT INTO prompts "
+                        "(library, name, temperature, body, version, updated) "
+                        "VALUES (?, ?, ?, ?, 1, ?)",
+                        (library, name, temperature, body, now),
+                    )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._writes += 1
+        return version + 1
+
+    def delete(self, library, name):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM prompts WHERE library = ? AND name = ?", (library, name)
+            )
+            self._writes += 1
+
+    def get(self, library, name):
+        """
+        Return (temperature, body, version) of an entry, or None.
+        """
+        rows = self._read(
+            "SELECT temperature, body, version FROM prompts "
+            "WHERE library = ? AND name = ?",
+            (library, name),
+        )
+        return rows[0] if rows else None
+
+    def names(self, library, query="", limit=None):
+        """
+        Return the library's sorted names containing query, ignoring case.
+        """
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%") + "%"
+        pattern = pattern.replace("_", "\\_")
+        return [
+            name
+            for (name,) in self._read(
+                "SELECT name FROM prompts WHERE library = ? "
+                "AND name LIKE ? ESCAPE '\\' ORDER BY name LIMIT ?",
+                (library, pattern, -1 if limit is None else limit),
+            )
+        ]
+
+    def count(self, library):
+        return self._read("SELECT COUNT(*) FROM prompts WHERE library = ?", (library,))[
+            0
+        ][0]
+
+    def versions(self, library, name):
+        """
+        Return the entry's (version, temperature, body, updated) history, newest
+        first, including the current version.
+        """
+        return self._read(
+            "SELECT version, temperature, body, updated FROM prompts "
+            "WHERE library = ? AND name = ? "
+            "UNION ALL SELECT version, temperature, body, updated "
+            "FROM prompt_versions WHERE library = ? AND name = ? "
+            "ORDER BY version DESC",
+            (library, name, library, name),
+        )
+
+    def search(self, query, limit=20):
+        """
+        Return up to limit (library, name, snippet) entries matching every word
+        of the query, best matches first.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        return self._read(
+            "SELECT prompts.library, prompts.name, "
+            "snippet(prompts_fts, 1, '[', ']', '...', 16) "
+            "FROM prompts_fts JOIN prompts ON prompts.id = prompts_fts.rowid "
+            "WHERE prompts_fts MATCH ? ORDER BY bm25(prompts_fts) LIMIT ?",
+            (match, limit),
+        )
+
+    def import_json(self, library, filename):
+        """
+        Upsert every entry of a prompt library JSON file, where system prompts
+        are [temperature, text] pairs and user prompts plain text. Entries whose
+        text is unchanged are skipped. Returns the number of entries written.
+        """
+        with open(filename) as file:
+            prompts = json.load(file)
+        written = 0
+        for name, value in prompts.items():
+            temperature, body = value if isinstance(value, list) else (None, value)
+            current = self.get(library, name)
+            if current and current[:2] == (temperature, body):
+                continue
+            self.upsert(library, name, body, temperature)
+            written += 1
+        return written
+
+    def export_json(self, library, filename):
+        """
+        Write the library to a JSON file in the import format, replacing the
+        file atomically.
+        """
+        rows = self._read(
+            "SELECT name, temperature, body FROM prompts WHERE library = ? "
+            "ORDER BY id",
+            (library,),
+        )
+        prompts = {
+            name: body if temperature is None else [temperature, body]
+            for name, temperature, body in rows
+        }
+        temporary = f"{filename}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(prompts, file)
+        os.replace(temporary, filename)
+
+    def close(self):
+        self._connection.close()
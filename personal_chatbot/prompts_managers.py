@@ -1,49 +1,148 @@
-import json
-import subprocess
+import argparse
+import os
+import threading
+from collections.abc import Mapping
+
+from .prompt_store import PROMPT_STORE_PATH, PromptStore
+from .templates import compile_template
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def shared_store(path=None):
+    """
+    Return the process's PromptStore for path (PROMPT_STORE_PATH by default),
+    opening it on first use.
+    """
+    path = path or PROMPT_STORE_PATH
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = PromptStore(path)
+        return _stores[path]
+
+
+class PromptLibrary(Mapping):
+    """
+    Read-only dict view of one library in the store. Bodies are read per lookup
+    and names per iteration, so nothing is loaded up front.
+    """
+
+    def __init__(self, store, library, with_temperature):
+        self.store = store
+        self.library = library
+        self.with_temperature = with_temperature
+
+    def __getitem__(self, name):
+        row = self.store.get(self.library, name)
+        if row is None:
+            raise KeyError(name)
+        temperature, body, _ = row
+        return (temperature, body) if self.with_temperature else body
+
+    def __contains__(self, name):
+        return self.store.get(self.library, name) is not None
+
+    def __iter__(self):
+        return iter(self.store.names(self.library))
+
+    def __len__(self):
+        return self.store.count(self.library)
 
 
 class PromptDumpManager:
-    def __init__(self, filename, is_dict=False):
+    """
+    One prompt library kept in the shared PromptStore. The JSON file seeds an
+    empty library and receives an export of it on dump_content.
+    """
+
+    def __init__(self, filename, library, with_temperature=False, store=None):
         self.filename = filename
-        self.content = self._load_lines(is_dict)
+        self.library = library
+        self.store = store or shared_store()
+        self.content = PromptLibrary(self.store, library, with_temperature)
         self._content_modified = False
-
-    def _load_lines(self, is_dict):
-        try:
-            with open(self.filename, "r") as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return {} if is_dict else []
+        self._names = None
+        self._names_generation = None
+        if not self.store.count(library) and os.path.exists(filename):
+            self.store.import_json(library, filename)
 
     def modify_content(self):
         self._content_modified = True
 
     def dump_content(self):
         if self._content_modified:
-            with open(self.filename, "w") as file:
-                json.dump(self.content, file)
-
-    def dump_as_plain_text(self):
-        if self._content_modified:
-            with open(self.filename.replace(".json", ".txt"), "w") as file:
-                for element in self.content:
-                    file.write(element)
-            subprocess.Popen(["open", self.filename.replace(".json", ".txt")])
+            self.store.export_json(self.library, self.filename)
 
     def get_prompts(self):
         return self.content
 
+    def names(self, query="", limit=None):
+        """
+        Return the sorted prompt names containing query, ignoring case, at most
+        limit of them. The full list is cached until the store changes, in this
+        process or another one.
+        """
+        if query or limit is not None:
+            return self.store.names(self.library, query, limit)
+        generation = self.store.generation
+        if generation != self._names_generation:
+            self._names = self.store.names(self.library)
+            self._names_generation = generation
+        return list(self._names)
+
+    def template(self, name):
+        """
+        Return the compiled PromptTemplate of an entry's text.
+        """
+        prompt = self.content[name]
+        return compile_template(prompt[1] if self.content.with_temperature else prompt)
+
+    def version(self, name):
+        row = self.store.get(self.library, name)
+        return row[2] if row else 0
+
+    def set_prompt(self, name, prompt, expected_version=None):
+        """
+        Add or replace a single entry, leaving the others untouched, and return
+        its new version. See PromptStore.upsert for expected_version.
+        """
+        temperature, body = prompt if self.content.with_temperature else (None, prompt)
+        version = self.store.upsert(
+            self.library, name, body, temperature, expected_version
+        )
+        self.modify_content()
+        return version
+
 
 class SystemPromptSelector(PromptDumpManager):
-    def __init__(self):
-        super().__init__("system_prompts.json", True)
+    def __init__(self, store=None):
+        super().__init__("system_prompts.json", "system prompt", True, store)
 
 
 class UserPromptSelector(PromptDumpManager):
-    def __init__(self):
-        super().__init__("user_prompts.json")
+    def __init__(self, store=None):
+        super().__init__("user_prompts.json", "user prompt", store=store)
+
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="main.py prompts",
+        description="Import a prompt library from JSON or export it to JSON.",
+    )
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("library", choices=("system", "user"))
+    parser.add_argument("filename", nargs="?", help="defaults to the library's file")
+    args = parser.parse_args(argv)
 
-class ChatHistoryPrompts(PromptDumpManager):
-    def __init__(self, filename="chat_history.json"):
-        super().__init__(filename)
+    manager = (
+        SystemPromptSelector() if args.library == "system" else UserPromptSelector()
+    )
+    filename = args.filename or manager.filename
+    if args.action == "import":
+        written = manager.store.import_json(manager.library, filename)
+        print(f"Imported {written} changed prompts from {filename}")
+    else:
+        manager.store.export_json(manager.library, filename)
+        print(f"Exported {len(manager.get_prompts())} prompts to {filename}")
+    return 0
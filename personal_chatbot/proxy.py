@@ -0,0 +1,127 @@
+import threading
+from typing import Any, Dict
+
+import httpx
+import requests
+from langchain_core.language_models.chat_models import BaseChatModel
+
+# How each provider class takes a proxy on its own HTTP client:
+# "httpx" classes accept http_client/http_async_client instances, "google_rest"
+# uses the REST transport whose requests session is pointed at the proxy.
+PROXY_ADAPTERS = {
+    "langchain_openai.ChatOpenAI": "httpx",
+    "langchain_groq.ChatGroq": "httpx",
+    "langchain_google_genai.ChatGoogleGenerativeAI": "google_rest",
+}
+
+
+class ProxyRoutes:
+    """
+    HTTP clients with a connection pool per proxy URL, shared by every provider
+    client routed through that proxy. Nothing is read from or written to the
+    process environment, so direct providers stay direct.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def httpx_client(self, proxy):
+        return self._get(("httpx", proxy), lambda: httpx.Client(proxy=proxy))
+
+    def httpx_async_client(self, proxy):
+        return self._get(("httpx-async", proxy), lambda: httpx.AsyncClient(proxy=proxy))
+
+    def _get(self, key, factory):
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = factory()
+            return self._clients[key]
+
+
+# Proxied HTTP clients shared by every LLMChainManager in the process
+PROXY_ROUTES = ProxyRoutes()
+
+
+def _adapter(llm_class):
+    adapter = PROXY_ADAPTERS.get(f"{llm_class.__module__}.{llm_class.__name__}")
+    if adapter is None:
+        # Provider packages often re-export their classes from a private module
+        top_level = llm_class.__module__.split(".")[0]
+        adapter = PROXY_ADAPTERS.get(f"{top_level}.{llm_class.__name__}")
+    if adapter is None:
+        raise ValueError(f"Proxy routing is not supported for {llm_class.__name__}")
+    return adapter
+
+
+def proxy_params(llm_class, params, proxy):
+    """
+    Return the constructor params routing a client of llm_class through proxy.
+    """
+    adapter = _adapter(llm_class)
+    if adapter == "httpx":
+        return {
+            **params,
+            "http_client": PROXY_ROUTES.httpx_client(proxy),
+            "http_async_client": PROXY_ROUTES.httpx_async_client(proxy),
+        }
+    return {**params, "transport": "rest"}
+
+
+class BlockingTransportChat(BaseChatModel):
+    """
+    Chat model answering through chat_model's blocking calls only. Its async
+    calls fall back to LangChain's default of running the blocking ones on an
+    executor thread, so they use the same proxied session.
+    """
+
+    chat_model: BaseChatModel
+
+    @property
+    def _llm_type(self) -> str:
+        return self.chat_model._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.chat_model._identifying_params
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self.chat_model._generate(messages, stop, run_manager, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        return self.chat_model._stream(messages, stop, run_manager, **kwargs)
+
+
+def attach_proxy(llm, proxy):
+    """
+    Finish routing a constructed client through proxy, for classes whose HTTP
+    session can only be reached after construction, and return the client to
+    use.
+
+    The Google REST transport's requests session is private (client._transport
+    ._session); if a client version no longer has it, this raises rather than
+    letting the provider bypass the proxy. Its async client does not use that
+    session, so the client is wrapped in a BlockingTransportChat.
+    """
+    if _adapter(type(llm)) != "google_rest":
+        return llm
+    try:
+        route_rest_client(getattr(llm, "client", None), proxy)
+    except ValueError as e:
+        raise ValueError(
+            f"Cannot route {type(llm).__name__} through a proxy: its client has no "
+            "requests session at client._transport._session"
+        ) from e
+    return BlockingTransportChat(chat_model=llm)
+
+
+def route_rest_client(client, proxy):
+    """
+    Point a Google API client built with transport="rest" at proxy, through its
+    private requests session (client._transport._session).
+    """
+    session = getattr(getattr(client, "_transport", None), "_session", None)
+    if not isinstance(session, requests.Session):
+        raise ValueError(f"{type(client).__name__} has no REST session to proxy")
+    session.trust_env = False
+    session.proxies.update({"http": proxy, "https": proxy})
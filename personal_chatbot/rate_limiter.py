@@ -0,0 +1,311 @@
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .instrumentation import percentile
+
+# HTTP statuses worth retrying: rate limited, overloaded or briefly unavailable
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504, 529}
+MAX_RETRIES = 4
+# Exponential backoff in seconds: random in [0, min(cap, base * 2**attempt)]
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+# Most recent queue wait times kept per provider for the stats
+WAIT_SAMPLES = 1000
+
+
+def _status_code(error):
+    for candidate in (error, getattr(error, "response", None)):
+        for name in ("status_code", "status", "code", "http_status"):
+            value = getattr(candidate, name, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def retry_after(error):
+    """
+    Return the Retry-After delay in seconds carried by a provider error, if any.
+    """
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None  # an HTTP date; fall back to backoff
+
+
+def is_retryable(error):
+    """
+    Tell whether the error is a rate limit or transient overload worth retrying.
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    return (
+        "ratelimit" in name
+        or "rate limit" in message
+        or "too many requests" in message
+        or "429" in message
+    )
+
+
+class TokenBucket:
+    """
+    Continuously refilled bucket of per_minute units, holding at most one
+    minute's worth. Takes may overdraw it and the debt delays later takers.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """
+        Return the seconds until amount can be taken.
+        """
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= amount
+
+
+class _Waiter:
+    def __init__(self, tokens, wake):
+        self.tokens = tokens
+        self.wake = wake
+        self.enqueued = time.monotonic()
+
+
+class ProviderLimiter:
+    """
+    Requests/min and tokens/min budgets of one provider, shared by every session
+    in the process. Waiting requests are granted round-robin across sessions, so
+    a long batch cannot starve an interactive chat. Works for both event loop
+    and thread callers.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.blocked_until = 0.0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.granted = 0
+        self.retries = 0
+        self.throttled = 0
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    @property
+    def queue_depth(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def acquire(self, session, tokens=0):
+        """
+        Wait on the running event loop until the request may be sent.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enqueue(session, tokens, wake)
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._cancel(session, waiter)
+            raise
+
+    def acquire_sync(self, session, tokens=0):
+        """
+        Block the calling thread until the request may be sent.
+        """
+        granted = threading.Event()
+        self._enqueue(session, tokens, granted.set)
+        granted.wait()
+
+    def settle(self, tokens):
+        """
+        Charge tokens used beyond what acquire reserved; negative refunds.
+        """
+        if self.tokens and tokens:
+            with self._lock:
+                self.tokens.take(tokens, time.monotonic())
+
+    def note_retry(self):
+        """
+        Count a retried call to the provider.
+        """
+        with self._lock:
+            self.retries += 1
+
+    def back_off(self, delay):
+        """
+        Hold every request to the provider for delay seconds.
+        """
+        with self._lock:
+            self.throttled += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self._dispatch()
+
+    def stats(self):
+        waits = list(self.waits)
+        return {
+            "queue_depth": self.queue_depth,
+            "granted": self.granted,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "wait_p50": percentile(waits, 50),
+            "wait_p95": percentile(waits, 95),
+            "wait_max": max(waits) if waits else None,
+        }
+
+    def _enqueue(self, session, tokens, wake):
+        waiter = _Waiter(tokens, wake)
+        with self._lock:
+            self._queues.setdefault(session, deque()).append(waiter)
+            self._dispatch()
+        return waiter
+
+    def _cancel(self, session, waiter):
+        with self._lock:
+            queue = self._queues.get(session)
+            if queue and waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[session]
+                self._dispatch()
+
+    def _dispatch(self):
+        # Grant head-of-line waiters while the budgets allow; the lock is held
+        while self._queues:
+            now = time.monotonic()
+            session, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            delay = self.blocked_until - now
+            if self.requests:
+                delay = max(delay, self.requests.delay(1, now))
+            if self.tokens:
+                delay = max(delay, self.tokens.delay(waiter.tokens, now))
+            if delay > 0:
+                self._arm(delay)
+                return
+            queue.popleft()
+            # The session moves to the back of the round-robin order
+            del self._queues[session]
+            if queue:
+                self._queues[session] = queue
+            if self.requests:
+                self.requests.take(1, now)
+            if self.tokens:
+                self.tokens.take(waiter.tokens, now)
+            self.granted += 1
+            self.waits.append(now - waiter.enqueued)
+            waiter.wake()
+
+    def _arm(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+
+class RateLimitScheduler:
+    """
+    Process-wide registry of provider limiters. limits(provider) returns the
+    provider's (requests_per_minute, tokens_per_minute); providers without
+    either limit are never queued.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, provider):
+        """
+        Return the provider's limiter, or None if it has no limits.
+        """
+        with self._lock:
+            if provider not in self._limiters:
+                requests_per_minute, tokens_per_minute = self.limits(provider)
+                self._limiters[provider] = (
+                    ProviderLimiter(requests_per_minute, tokens_per_minute)
+                    if requests_per_minute or tokens_per_minute
+                    else None
+                )
+            return self._limiters[provider]
+
+    def configure(self, provider, requests_per_minute=None, tokens_per_minute=None):
+        """
+        Override the provider's limits, e.g. for a batch run on a smaller quota.
+        """
+        with self._lock:
+            self._limiters[provider] = ProviderLimiter(
+                requests_per_minute, tokens_per_minute
+            )
+
+    def reset(self, provider=None):
+        """
+        Drop the limiter state of one or every provider, so limits are read
+        again from their configuration.
+        """
+        with self._lock:
+            if provider is None:
+                self._limiters.clear()
+            else:
+                self._limiters.pop(provider, None)
+
+    def retry_delay(self, provider, error, attempt):
+        """
+        Return how long to wait before retrying a failed call, or None if the
+        error is not retryable or the retries are used up. A Retry-After from
+        the provider also holds back every other caller of that provider.
+        """
+        if attempt >= MAX_RETRIES or not is_retryable(error):
+            return None
+        delay = retry_after(error)
+        limiter = self.limiter(provider)
+        if limiter is not None:
+            limiter.note_retry()
+            if delay is not None:
+                limiter.back_off(delay)
+        if delay is None:
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+        return delay
+
+    def stats(self):
+        """
+        Return queue depth, grants, retries and wait percentiles per provider.
+        """
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            provider: limiter.stats()
+            for provider, limiter in limiters.items()
+            if limiter is not None
+        }
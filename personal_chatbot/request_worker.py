@@ -0,0 +1,180 @@
+import queue
+import threading
+from collections import deque
+
+POLL_INTERVAL_MS = 50
+
+
+class Request:
+    """
+    A queued LLM request together with the callbacks that receive its output on
+    the Tk main loop.
+    """
+
+    def __init__(
+        self, stream_factory, on_start, on_chunk, on_done, on_error, commit=None
+    ):
+        self.stream_factory = stream_factory
+        self.on_start = on_start
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.on_error = on_error
+        self.commit = commit
+        self.cancelled = threading.Event()
+        # Held while committing, so a cancel lands either before or after it
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled.set()
+
+
+class RequestWorker:
+    """
+    Runs LLM requests one at a time on background threads and marshals their
+    output back to the Tk main loop through root.after.
+
+    Further requests submitted while one is in flight are queued. Cancelling
+    abandons the in-flight request: its output is discarded at once and its
+    turn is never committed, but the next queued request only starts once its
+    thread has wound down, so two requests never share an LLMChain manager.
+    """
+
+    def __init__(self, root, poll_interval_ms=POLL_INTERVAL_MS):
+        self.root = root
+        self.poll_interval_ms = poll_interval_ms
+        # The request whose output is shown, and the one whose thread still runs
+        self.current = None
+        self._running = None
+        self._pending = deque()
+        self._idle_callbacks = []
+        self._events = queue.Queue()
+        self._polling = False
+
+    @property
+    def busy(self):
+        return self.current is not None
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def submit(
+        self,
+        stream_factory,
+        on_start=None,
+        on_chunk=None,
+        on_done=None,
+        on_error=None,
+        commit=None,
+    ):
+        """
+        Queue a request. stream_factory is called on the worker thread and must
+        return an iterable of text chunks. commit, if given, is called on the
+        worker thread with the full response unless the request was cancelled,
+        e.g. to save the turn to memory.
+        """
+        request = Request(stream_factory, on_start, on_chunk, on_done, on_error, commit)
+        self._pending.append(request)
+        if self._running is None:
+            self._start_next()
+        return request
+
+    def cancel(self):
+        """
+        Abandon the in-flight request; the next queued one starts once its
+        thread has wound down.
+        """
+        if self.current is None:
+            return
+        self.current.cancel()
+        self.current = None
+        self._schedule_poll()
+
+    def when_idle(self, callback):
+        """
+        Call callback on the Tk main loop as soon as no request thread is running,
+        before the next queued request starts, e.g. to reconfigure the manager.
+        """
+        if self._running is None:
+            callback()
+        else:
+            self._idle_callbacks.append(callback)
+
+    def cancel_all(self):
+        """
+        Drop every queued request and abandon the in-flight one.
+        """
+        self._pending.clear()
+        self.cancel()
+
+    def _start_next(self):
+        while self._pending:
+            request = self._pending.popleft()
+            if request.cancelled.is_set():
+                continue
+            self.current = self._running = request
+            self._dispatch(request.on_start)
+            threading.Thread(target=self._run, args=(request,), daemon=True).start()
+            break
+        self._schedule_poll()
+
+    def _run(self, request):
+        chunks = []
+        try:
+            stream = iter(request.stream_factory())
+            for chunk in stream:
+                if request.cancelled.is_set():
+                    close = getattr(stream, "close", None)
+                    if close:
+                        close()
+                    return
+                chunks.append(chunk)
+                self._events.put((request, "chunk", chunk))
+            response = "".join(chunks)
+            with request.lock:
+                # A cancel that lands after the last chunk still drops the turn
+                if request.cancelled.is_set():
+                    return
+                if request.commit:
+                    request.commit(response)
+            self._events.put((request, "done", response))
+        except Exception as e:
+            self._events.put((request, "error", e))
+        finally:
+            self._events.put((request, "finished", None))
+
+    def _schedule_poll(self):
+        if not self._polling and (self._running or not self._events.empty()):
+            self._polling = True
+            self.root.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                request, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "finished":
+                if request is self._running:
+                    self._running = None
+                    callbacks, self._idle_callbacks = self._idle_callbacks, []
+                    for callback in callbacks:
+                        callback()
+                    self._start_next()
+                continue
+            if request.cancelled.is_set() or request is not self.current:
+                continue
+            if kind == "chunk":
+                self._dispatch(request.on_chunk, payload)
+                continue
+            self.current = None
+            callback = request.on_done if kind == "done" else request.on_error
+            self._dispatch(callback, payload)
+        self._schedule_poll()
+
+    @staticmethod
+    def _dispatch(callback, *args):
+        if callback:
+            callback(*args)
@@ -0,0 +1,200 @@
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+
+# Dimensions of the hashed bag-of-words vectors used for near-duplicate lookup
+EMBEDDING_SIZE = 512
+
+
+def digest(*parts):
+    """
+    Return a stable SHA-256 hex digest of the given string parts.
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(str(part).encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def history_digest(messages):
+    """
+    Return a digest of the chat history messages sent along with a request.
+    """
+    return digest(*(f"{message.type}:{message.content}" for message in messages))
+
+
+def hashed_embedding(text, size=EMBEDDING_SIZE):
+    """
+    Embed text locally as a normalized hashed bag of words and word bigrams.
+    """
+    words = re.findall(r"\w+", text.lower())
+    vector = [0.0] * size
+    for feature in words + [" ".join(pair) for pair in zip(words, words[1:])]:
+        vector[zlib.crc32(feature.encode("utf-8")) % size] += 1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of LLM responses with LRU and TTL eviction.
+
+    Entries are looked up by an exact key. With semantic=True, a miss falls back
+    to the most similar earlier input within the same scope (provider, model,
+    system prompt and history), using local embeddings and an in-memory vector
+    index per scope. embed may be swapped for any callable returning normalized
+    vectors, such as a local LangChain embeddings model's embed_query.
+    """
+
+    def __init__(
+        self,
+        path="response_cache.sqlite3",
+        max_entries=10000,
+        ttl=7 * 24 * 3600,
+        semantic=False,
+        similarity_threshold=0.9,
+        embed=hashed_embedding,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._vectors = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope);
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+            """
+        )
+
+    def get(self, scope, user_input):
+        """
+        Return the cached response for the input within the scope, or None.
+        """
+        key = digest(scope, user_input)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT key, response FROM responses WHERE key = ? AND created > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None and self.semantic:
+                row = self._nearest(scope, user_input, now)
+                if row is not None:
+                    self.semantic_hits += 1
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?", (now, row[0])
+                )
+            return row[1]
+
+    def put(self, scope, user_input, response):
+        """
+        Store the response for the input within the scope.
+        """
+        key = digest(scope, user_input)
+        now = time.time()
+        embedding = None
+        if self.semantic:
+            vector = self.embed(user_input)
+            embedding = array("f", vector).tobytes()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scope, response, embedding, now, now),
+            )
+            if embedding is not None:
+                self._scope_vectors(scope)[key] = vector
+            self._evict(now)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            (entries,) = self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+            self._vectors.clear()
+
+    def close(self):
+        self._connection.close()
+
+    def _evict(self, now):
+        expired = self._connection.execute(
+            "DELETE FROM responses WHERE created <= ? RETURNING key, scope",
+            (now - self.ttl,),
+        ).fetchall()
+        overflow = self._connection.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            ) RETURNING key, scope
+            """,
+            (self.max_entries,),
+        ).fetchall()
+        for key, scope in expired + overflow:
+            self._vectors.get(scope, {}).pop(key, None)
+
+    def _scope_vectors(self, scope):
+        if scope not in self._vectors:
+            rows = self._connection.execute(
+                "SELECT key, embedding FROM responses "
+                "WHERE scope = ? AND embedding IS NOT NULL",
+                (scope,),
+            )
+            self._vectors[scope] = {
+                key: array("f", blob).tolist() for key, blob in rows
+            }
+        return self._vectors[scope]
+
+    def _nearest(self, scope, user_input, now):
+        vectors = self._scope_vectors(scope)
+        if not vectors:
+            return None
+        query = self.embed(user_input)
+        best_key, best_score = None, self.similarity_threshold
+        for key, vector in vectors.items():
+            score = sum(a * b for a, b in zip(query, vector))
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        return self._connection.execute(
+            "SELECT key, response FROM responses WHERE key = ? AND created > ?",
+            (best_key, now - self.ttl),
+        ).fetchone()
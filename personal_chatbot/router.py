@@ -0,0 +1,298 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from .llm_chain_manager import LLM_PROVIDERS, LLMChainManager
+
+# Seconds a provider may take to start answering before the router moves on
+DEFAULT_TIMEOUT = 60
+
+
+class ProviderChainError(RuntimeError):
+    """
+    Raised when every provider in the chain failed or timed out.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        details = "; ".join(f"{provider}: {error!r}" for provider, error in errors)
+        super().__init__(f"All providers failed: {details}")
+
+
+def first_chunk(stream):
+    """
+    Pull the stream's first chunk (None if it is empty) on a daemon thread and
+    return a Future of it, so the caller can stop waiting for a stalled
+    provider.
+    """
+    future = Future()
+
+    def pull():
+        try:
+            future.set_result(next(stream, None))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=pull, daemon=True).start()
+    return future
+
+
+def abandon(future, stream):
+    # A generator cannot be closed while its thread is still running it
+    future.add_done_callback(lambda _: stream.close())
+
+
+class ProviderRouter:
+    """
+    Routes each turn through an ordered chain of providers sharing one
+    conversation memory.
+
+    A provider that errors or sends no chunk within its timeout is failed over
+    to the next one; once a provider has started answering, its answer is kept
+    and an error in it is raised. With hedge_after set, the next provider is
+    also started when the current one has sent no chunk for that many seconds
+    since it started; whichever answers first wins and the other request is
+    cancelled. Only the winning turn is saved to memory.
+
+    Given a primary manager, the router answers for it, sharing its memory and
+    reporting the winner's usage and timings on it (see LLMChainManager's
+    "fallbacks").
+    """
+
+    def __init__(
+        self,
+        providers,
+        system_prompt,
+        temperature,
+        timeouts=None,
+        hedge_after=None,
+        primary=None,
+    ):
+        self.providers = list(providers)
+        self.timeouts = timeouts or {}
+        self.hedge_after = hedge_after
+        self.primary = primary
+        self.last_provider = None
+        self.last_latency = None
+        self.managers = {}
+        for provider in self.providers:
+            if primary is not None and provider == primary.provider:
+                self.managers[provider] = primary
+                continue
+            manager = LLMChainManager(
+                system_prompt=system_prompt, temperature=temperature
+            )
+            # Fallback managers answer directly, never through a router
+            manager.fallbacks = []
+            manager.init_llm(provider)
+            manager.init_prompt()
+            manager.init_memory()
+            if primary is not None:
+                manager.session_id = primary.session_id
+            self.managers[provider] = manager
+
+        # The chain shares the memory with the smallest history budget
+        budgets = [
+            manager.memory.max_tokens
+            for manager in self.managers.values()
+            if manager.memory.max_tokens
+        ]
+        if primary is not None:
+            self.memory = primary.memory
+            if budgets:
+                self.memory.max_tokens = min(budgets)
+        else:
+            self.memory = min(
+                (manager.memory for manager in self.managers.values()),
+                key=lambda memory: memory.max_tokens or float("inf"),
+            )
+        for manager in self.managers.values():
+            manager.memory = self.memory
+            if manager is not primary:
+                manager.init_llm_chain()
+
+    @classmethod
+    def for_manager(cls, primary, fallbacks, hedge_after=None):
+        """
+        Return a router answering for primary with the fallback providers after
+        it, each within its LLM_PROVIDERS "timeout".
+        """
+        providers = [primary.provider, *fallbacks]
+        timeouts = {
+            provider: LLM_PROVIDERS[provider]["timeout"]
+            for provider in providers
+            if LLM_PROVIDERS[provider].get("timeout")
+        }
+        return cls(
+            providers,
+            primary.system_prompt,
+            primary.temperature,
+            timeouts,
+            hedge_after,
+            primary,
+        )
+
+    async def astream(self, user_input, commit=True):
+        """
+        Stream the first provider's answer to start arriving.
+        """
+        start = time.perf_counter()
+        remaining = iter(self.providers)
+        attempts = {}
+        errors = []
+        winner = None
+
+        def start_next():
+            provider = next(remaining, None)
+            if provider is not None:
+                stream = self.managers[provider]._astream_turn(user_input, False)
+                task = asyncio.ensure_future(
+                    asyncio.wait_for(anext(stream, None), self._timeout(provider))
+                )
+                attempts[task] = (provider, stream)
+            return provider is not None
+
+        more = start_next()
+        try:
+            while attempts and winner is None:
+                hedge = self.hedge_after if more and len(attempts) == 1 else None
+                done, _ = await asyncio.wait(
+                    attempts, timeout=hedge, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    more = start_next()
+                    continue
+                for task in done:
+                    provider, stream = attempts.pop(task)
+                    error = task.exception()
+                    if winner is None and error is None:
+                        winner = provider, stream, task.result()
+                        continue
+                    if error is not None:
+                        errors.append((provider, error))
+                    await stream.aclose()
+                if not attempts and winner is None:
+                    more = start_next()
+        finally:
+            for task, (_, stream) in attempts.items():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await stream.aclose()
+        if winner is None:
+            raise ProviderChainError(errors)
+
+        provider, stream, first = winner
+        chunks = []
+        if first is not None:
+            chunks.append(first)
+            yield first
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+        if commit:
+            await self.memory.asave_context(
+                {"human_input": user_input}, {"text": response}
+            )
+        self._report(provider, start)
+
+    def stream(self, user_input, commit=True):
+        """
+        Blocking counterpart of astream. Each provider's first chunk is pulled
+        on its own thread, so a stalled provider is failed over or hedged just
+        as in astream; the rest of the answer streams on the calling thread.
+        """
+        start = time.perf_counter()
+        remaining = iter(self.providers)
+        attempts = {}
+        errors = []
+        winner = None
+
+        def start_next():
+            provider = next(remaining, None)
+            if provider is not None:
+                stream = self.managers[provider]._stream_turn(user_input, False)
+                attempts[first_chunk(stream)] = (provider, stream, time.perf_counter())
+            return provider is not None
+
+        more = start_next()
+        try:
+            while attempts and winner is None:
+                # Wake up at the earliest timeout, or hedge a lone attempt
+                hedge_at = None
+                if self.hedge_after and more and len(attempts) == 1:
+                    ((_, _, started),) = attempts.values()
+                    hedge_at = started + self.hedge_after
+                wakeups = [
+                    started + self._timeout(provider)
+                    for provider, _, started in attempts.values()
+                ]
+                if hedge_at is not None:
+                    wakeups.append(hedge_at)
+                done, _ = wait(
+                    attempts,
+                    timeout=max(min(wakeups) - time.perf_counter(), 0),
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    provider, stream, _ = attempts.pop(future)
+                    error = future.exception()
+                    if winner is None and error is None:
+                        winner = provider, stream, future.result()
+                        continue
+                    if error is not None:
+                        errors.append((provider, error))
+                    stream.close()
+                now = time.perf_counter()
+                for future, (provider, stream, started) in list(attempts.items()):
+                    if now >= started + self._timeout(provider):
+                        del attempts[future]
+                        errors.append((provider, TimeoutError()))
+                        abandon(future, stream)
+                hedge = hedge_at is not None and now >= hedge_at
+                if winner is None and (not attempts or hedge):
+                    more = start_next()
+        finally:
+            for future, (_, stream, _) in attempts.items():
+                abandon(future, stream)
+        if winner is None:
+            raise ProviderChainError(errors)
+
+        provider, stream, first = winner
+        chunks = []
+        if first is not None:
+            chunks.append(first)
+            yield first
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        if commit:
+            self.memory.save_context(
+                {"human_input": user_input}, {"text": "".join(chunks)}
+            )
+        self._report(provider, start)
+
+    async def asend(self, user_input):
+        """
+        Return the first successful response to the user input.
+        """
+        return "".join([chunk async for chunk in self.astream(user_input)])
+
+    def send(self, user_input):
+        """
+        Blocking counterpart of asend.
+        """
+        return asyncio.run(self.asend(user_input))
+
+    def _timeout(self, provider):
+        return self.timeouts.get(provider, DEFAULT_TIMEOUT)
+
+    def _report(self, provider, start):
+        self.last_provider = provider
+        self.last_latency = time.perf_counter() - start
+        winner = self.managers[provider]
+        if self.primary is not None and winner is not self.primary:
+            self.primary.last_usage = winner.last_usage
+            self.primary.last_timings = winner.last_timings
+            self.primary.last_response_cached = winner.last_response_cached
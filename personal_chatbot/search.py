@@ -0,0 +1,22 @@
+def search_all(query, history_store, prompt_store, limit=20):
+    """
+    Search saved chat turns and the PromptStore's libraries, returning dicts
+    with the source, a title (session id or prompt name) and a highlighted
+    snippet.
+    """
+    results = [
+        {
+            "source": f"chat ({role})",
+            "title": session_id,
+            "timestamp": timestamp,
+            "snippet": snippet,
+        }
+        for _, session_id, timestamp, role, snippet in history_store.search(
+            query, limit
+        )
+    ]
+    results += [
+        {"source": library, "title": name, "timestamp": None, "snippet": snippet}
+        for library, name, snippet in prompt_store.search(query, limit)
+    ]
+    return results
@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .prompt_store import BUSY_TIMEOUT
+
+# Where worker processes keep the sessions they share: "sqlite:///path",
+# "redis://host:port/db", or unset to keep sessions in each process only
+SESSION_BACKEND_URL = os.environ.get("CHATBOT_SESSION_BACKEND")
+# Key prefix of the sessions kept in Redis
+REDIS_KEY_PREFIX = "chatbot:session:"
+
+
+class SQLiteSessionBackend:
+    """
+    Session states in a SQLite file (WAL mode) that every worker process on the
+    machine opens. Each save replaces the session's row in one transaction and
+    bumps its version, so a worker reloads a session only when another one has
+    changed it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT}")
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                updated REAL NOT NULL
+            )
+            """
+        )
+
+    def version(self, session_id):
+        """
+        Return the stored version of the session, or 0 if it is not stored.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT version FROM chat_sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def load(self, session_id):
+        """
+        Return (state, version) of the session, or None if it is not stored.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state, version FROM chat_sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def save(self, session_id, state):
+        """
+        Store the session's state and return its new version.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                """
+                INSERT INTO chat_sessions (session_id, state, version, updated)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    state = excluded.state,
+                    version = version + 1,
+                    updated = excluded.updated
+                RETURNING version
+                """,
+                (session_id, json.dumps(state), time.time()),
+            ).fetchone()
+        return row[0]
+
+    def delete(self, session_id):
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)
+            )
+
+    def close(self):
+        self._connection.close()
+
+
+class RedisSessionBackend:
+    """
+    Session states in Redis or a Redis-compatible server (Valkey, KeyDB, ...),
+    one hash per session holding its state and version, for workers spread over
+    several machines. client is a redis-py client or anything with the same
+    hget, hmget, pipeline and delete methods.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "The Redis session backend needs the redis package: "
+                "pip install redis"
+            ) from e
+        return cls(redis.Redis.from_url(url))
+
+    def version(self, session_id):
+        version = self.client.hget(REDIS_KEY_PREFIX + session_id, "version")
+        return int(version) if version else 0
+
+    def load(self, session_id):
+        state, version = self.client.hmget(
+            REDIS_KEY_PREFIX + session_id, ["state", "version"]
+        )
+        return (json.loads(state), int(version)) if state else None
+
+    def save(self, session_id, state):
+        key = REDIS_KEY_PREFIX + session_id
+        # Both commands run as one MULTI/EXEC transaction
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, "state", json.dumps(state))
+        pipeline.hincrby(key, "version", 1)
+        return int(pipeline.execute()[1])
+
+    def delete(self, session_id):
+        self.client.delete(REDIS_KEY_PREFIX + session_id)
+
+    def close(self):
+        self.client.close()
+
+
+def open_session_backend(url=SESSION_BACKEND_URL):
+    """
+    Return the session backend for url, or None if url is empty.
+    """
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionBackend.from_url(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionBackend(url[len("sqlite:///") :])
+    raise ValueError(
+        f"Unsupported session backend: {url} "
+        "(expected sqlite:///path or redis://host:port/db)"
+    )
@@ -0,0 +1,180 @@
+import threading
+
+from .compare import ProviderComparison
+from .llm_chain_manager import LLMChainManager
+from .message_log import MessageLog
+
+# Display prefixes of the session's chat history lines
+CHAT_HISTORY_PREFIXES = {"user": "USER: ", "ai": "AI: "}
+
+
+class ChatSession:
+    """
+    Conversation state of a single user: engine, prompt settings, history and the
+    LLMChain manager serving them.
+    """
+
+    def __init__(self, session_id, system_prompt, temperature, engine=None):
+        self.session_id = session_id
+        self.engine = engine
+        self.system_prompt = system_prompt
+        self.temperature = temperature
+        self.message_log = MessageLog.for_session(session_id)
+        self.llm_chain_manager = None
+        self.comparison = None
+
+    @property
+    def chat_history(self):
+        """
+        The conversation as display lines, rendered from the message log.
+        """
+        return self.message_log.lines(CHAT_HISTORY_PREFIXES)
+
+    def resume(self, history_store, session_id):
+        """
+        Continue a stored conversation: replay its recent turns into memory and
+        append further turns to it.
+        """
+        memory = self.llm_chain_manager.memory
+        memory.clear()
+        self.session_id = session_id
+        self.message_log = MessageLog.for_session(session_id)
+        memory.chat_memory = self.message_log
+        self.llm_chain_manager.set_session_id(session_id)
+        history_store.resume(session_id, memory)
+
+    def state(self):
+        """
+        Return the session's settings and LLM context as a JSON-compatible dict
+        for a session backend.
+        """
+        memory = self.llm_chain_manager.memory if self.llm_chain_manager else None
+        return {
+            "session_id": self.session_id,
+            "engine": self.engine,
+            "system_prompt": self.system_prompt,
+            "temperature": self.temperature,
+            "messages": self.message_log.context_records(),
+            "summary": memory.summary if memory else "",
+        }
+
+    def restore(self, state):
+        """
+        Continue from a state() saved by another process, rebuilding the manager
+        only if the engine has changed.
+        """
+        self.session_id = state["session_id"]
+        self.system_prompt = state["system_prompt"]
+        self.temperature = state["temperature"]
+        if state["engine"] != self.engine:
+            self.engine = state["engine"]
+            self.llm_chain_manager = None
+        self.reconfigure()
+        if self.llm_chain_manager is None:
+            self.message_log.load_context(state["messages"])
+        else:
+            self.llm_chain_manager.set_session_id(self.session_id)
+            self.llm_chain_manager.memory.restore(state["messages"], state["summary"])
+
+    def init_llm_chain_manager(self):
+        """
+        Initialize the LLMChain manager with the session's engine and settings.
+        """
+        self.llm_chain_manager = LLMChainManager(
+            system_prompt=self.system_prompt,
+            temperature=self.temperature,
+        )
+        self.llm_chain_manager.session_id = self.session_id
+        self.llm_chain_manager.init_llm(self.engine)
+        self.llm_chain_manager.init_prompt()
+        self.llm_chain_manager.init_memory(self.message_log)
+        self.llm_chain_manager.init_llm_chain()
+
+    def get_comparison(self, providers):
+        """
+        Return the session's provider comparison, starting a new one when the
+        providers or the prompt settings have changed.
+        """
+        comparison = self.comparison
+        if (
+            comparison is None
+            or comparison.providers != list(providers)
+            or any(
+                manager.system_prompt != self.system_prompt
+                or manager.temperature != self.temperature
+                for manager in comparison.managers.values()
+            )
+        ):
+            self.comparison = ProviderComparison(
+                providers, self.system_prompt, self.temperature
+            )
+        return self.comparison
+
+    def reconfigure(self):
+        """
+        Apply the session's system prompt and temperature to its manager in place,
+        or build the manager if the session has none yet.
+        """
+        if self.llm_chain_manager is None:
+            if self.engine is not None:
+                self.init_llm_chain_manager()
+            return
+        if self.llm_chain_manager.temperature != self.temperature:
+            self.llm_chain_manager.set_temperature(self.temperature)
+        if self.llm_chain_manager.system_prompt != self.system_prompt:
+            self.llm_chain_manager.set_system_prompt(self.system_prompt)
+
+
+class SessionStore:
+    """
+    Session-keyed store of ChatSession objects, created on first access by
+    calling session_factory with the session id.
+
+    With a backend (see session_backend.py) the sessions are shared by every
+    process using it: get() first catches up with changes saved by another
+    process, comparing versions so an unchanged session is not reloaded, and
+    save() stores the session after each change. Concurrent turns of one
+    session in two processes are not merged; the last one saved wins.
+    """
+
+    def __init__(self, session_factory, backend=None):
+        self.session_factory = session_factory
+        self.backend = backend
+        self._sessions = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            if session_id not in self._sessions:
+                self._sessions[session_id] = self.session_factory(session_id)
+            session = self._sessions[session_id]
+        if self.backend is not None:
+            version = self.backend.version(session_id)
+            if version != self._versions.get(session_id, 0):
+                stored = self.backend.load(session_id)
+                if stored is not None:
+                    state, version = stored
+                    session.restore(state)
+                self._versions[session_id] = version
+        return session
+
+    def save(self, session_id):
+        """
+        Store the session in the backend, if there is one.
+        """
+        session = self._sessions.get(session_id)
+        if self.backend is None or session is None:
+            return
+        self._versions[session_id] = self.backend.save(session_id, session.state())
+
+    def drop(self, session_id):
+        """
+        Forget the session in this process; a backend keeps it for the others.
+        """
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._versions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
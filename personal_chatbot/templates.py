@@ -0,0 +1,51 @@
+import functools
+import re
+
+# Placeholders are upper-case names in square brackets, e.g. [JOB_POSITION]
+PLACEHOLDER = re.compile(r"\[([A-Z][A-Z0-9_]*)\]")
+# Compiled templates kept for reuse, keyed by their text
+TEMPLATE_CACHE_SIZE = 1024
+
+
+class PromptTemplate:
+    """
+    Prompt text split once into literal parts and placeholder names, so every
+    render is a single join without searching the text again.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        # Literal text at even indexes, placeholder names at odd ones
+        self.parts = PLACEHOLDER.split(text)
+        self.variables = list(dict.fromkeys(self.parts[1::2]))
+
+    def render(self, values, strict=False):
+        """
+        Substitute the values for the placeholders. Placeholders without a
+        non-empty value are left as they are, or raise ValueError if strict.
+        """
+        missing = [name for name in self.variables if not values.get(name)]
+        if strict and missing:
+            raise ValueError(f"Missing template variables: {', '.join(missing)}")
+        parts = self.parts[:]
+        for index in range(1, len(parts), 2):
+            name = parts[index]
+            parts[index] = values.get(name) or f"[{name}]"
+        return "".join(parts)
+
+
+def keyed_rows(rows, id_field="id"):
+    """
+    Lazily yield (id, row) for each dict of values, using the row's id_field or
+    its 1-based number as the id.
+    """
+    for number, row in enumerate(rows, 1):
+        yield str(row.get(id_field) or number), row
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(text):
+    """
+    Return the PromptTemplate for text, parsing each distinct text only once.
+    """
+    return PromptTemplate(text)
@@ -0,0 +1,24 @@
+import httpx
+
+# Short prompt whose answer proves the credentials work
+WARMUP_PROMPT = "Reply with OK."
+# Default address of a local Ollama server
+OLLAMA_BASE_URL = "http://localhost:11434"
+# How long Ollama keeps a preloaded model in memory
+OLLAMA_KEEP_ALIVE = "30m"
+# Loading a model from disk can take a while on small machines
+OLLAMA_PRELOAD_TIMEOUT = 300
+
+
+def preload_ollama(llm):
+    """
+    Ask the Ollama server to load the model into memory and keep it there, by
+    sending a generate request without a prompt.
+    """
+    base_url = (getattr(llm, "base_url", None) or OLLAMA_BASE_URL).rstrip("/")
+    response = httpx.post(
+        f"{base_url}/api/generate",
+        json={"model": llm.model, "keep_alive": OLLAMA_KEEP_ALIVE},
+        timeout=OLLAMA_PRELOAD_TIMEOUT,
+    )
+    response.raise_for_status()
@@ -0,0 +1,52 @@
+import pytest
+
+from personal_chatbot import prompts_managers
+from personal_chatbot.fake_llm import FAKE_PROVIDER, register_fake_provider
+from personal_chatbot.llm_chain_manager import LLM_PROVIDERS
+from personal_chatbot.prompt_store import PromptStore
+
+# Prompts the tests rely on, so they never read or write the app's own library
+SYSTEM_PROMPTS = {
+    "default": (0.7, "You are a helpful assistant."),
+    "code_clarifier": (0.2, "Explain the code you are given."),
+}
+USER_PROMPTS = {
+    "cover_letter_writing": "Write a cover letter for [JOB_POSITION] at [COMPANY].",
+}
+
+
+@pytest.fixture(autouse=True)
+def prompt_store(tmp_path, monkeypatch):
+    """
+    Point the shared prompt store, also of spawned worker processes, at a
+    seeded file under tmp_path.
+    """
+    path = str(tmp_path / "prompt_library.sqlite3")
+    monkeypatch.setenv("CHATBOT_PROMPT_STORE", path)
+    monkeypatch.setattr(prompts_managers, "PROMPT_STORE_PATH", path)
+    monkeypatch.setattr(prompts_managers, "_stores", {})
+    store = PromptStore(path)
+    for name, (temperature, body) in SYSTEM_PROMPTS.items():
+        store.upsert("system prompt", name, body, temperature)
+    for name, body in USER_PROMPTS.items():
+        store.upsert("user prompt", name, body)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """
+    Return a function registering a FakeChatModel provider for the test only:
+    fake_provider(name, config=None, **params) passes params to the model,
+    adds the LLM_PROVIDERS entry keys in config and returns name.
+    """
+
+    def register(name=FAKE_PROVIDER, config=None, **params):
+        # Recorded first, so the entry is removed again after the test
+        monkeypatch.setitem(LLM_PROVIDERS, name, {})
+        register_fake_provider(name, **params)
+        LLM_PROVIDERS[name].update(config or {})
+        return name
+
+    return register
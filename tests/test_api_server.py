@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from personal_chatbot.api_server import ChatCompletionsServer
+from personal_chatbot.history_store import ChatHistoryStore
+
+
+@pytest.fixture
+def server(fake_provider):
+    name = fake_provider("Fake-api", response="Hello from the fake model.")
+    return ChatCompletionsServer(name, history_store=ChatHistoryStore(":memory:"))
+
+
+def post(server, body, headers=None):
+    async def send():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as c:
+            return await c.post("/v1/chat/completions", json=body, headers=headers)
+
+    return asyncio.run(send())
+
+
+def test_system_prompts_are_listed_as_models(server):
+    async def get():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as c:
+            return await c.get("/v1/models")
+
+    models = [model["id"] for model in asyncio.run(get()).json()["data"]]
+    assert "default" in models and "code_clarifier" in models
+
+
+def test_completion(server):
+    response = post(
+        server,
+        {"model": "code_clarifier", "messages": [{"role": "user", "content": "hi"}]},
+    )
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["model"] == "code_clarifier"
+    assert body["choices"][0]["message"]["content"] == "Hello from the fake model."
+    assert body["usage"]["completion_tokens"] > 0
+
+
+def test_streaming_sends_server_sent_events(server):
+    response = post(
+        server,
+        {"messages": [{"role": "user", "content": "hi"}], "stream": True},
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line[6:] for line in response.text.split("\n\n") if line]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    text = "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks)
+    assert text == "Hello from the fake model."
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+
+def test_memory_is_kept_per_conversation(server):
+    for _ in range(2):
+        post(
+            server,
+            {"messages": [{"role": "user", "content": "hi"}]},
+            headers={"X-Conversation-ID": "c1"},
+        )
+    post(server, {"messages": [{"role": "user", "content": "hi"}]})
+
+    assert len(server.sessions.get("c1").message_log.records) == 4
+    assert len(server.history_store.page("c1")) == 4
+    assert len(server.sessions) == 1
+
+
+def test_stateless_requests_replay_their_messages(server):
+    history = [
+        {"role": "user", "content": "first"},
+        {"role": "assistant", "content": "answer"},
+        {"role": "user", "content": "second"},
+    ]
+    session = server.stateless_session(server.engine, 0.5, "Be brief.", history[:-1])
+    assert [
+        m.content for m in session.llm_chain_manager.memory.chat_memory.messages
+    ] == [
+        "first",
+        "answer",
+    ]
+    assert post(server, {"messages": history}).status_code == 200
+
+
+def test_invalid_requests_get_openai_style_errors(server):
+    unknown = post(server, {"model": "nope", "messages": [{"role": "user"}]})
+    no_user = post(server, {"messages": [{"role": "assistant", "content": "x"}]})
+
+    assert unknown.status_code == 404
+    assert unknown.json()["error"]["type"] == "model_not_found"
+    assert no_user.status_code == 400
+
+
+def test_malformed_bodies_get_400s(server):
+    for body in (
+        [1],
+        {"model": 5, "messages": [{"role": "user", "content": "hi"}]},
+        {"messages": [1]},
+        {"messages": {"role": "user", "content": "hi"}},
+        {"messages": [{"role": "user", "content": "hi"}], "conversation_id": 7},
+    ):
+        response = post(server, body)
+        assert response.status_code == 400, body
+        assert response.json()["error"]["type"] == "invalid_request_error"
+
+
+def test_conversation_locks_are_dropped_after_the_turn(server):
+    async def send(conversation_id):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as c:
+            return await c.post(
+                "/v1/chat/completions",
+                json={"messages": [{"role": "user", "content": "hi"}]},
+                headers={"x-conversation-id": conversation_id},
+            )
+
+    async def send_all():
+        return await asyncio.gather(*(send(f"c{i % 2}") for i in range(4)))
+
+    responses = asyncio.run(send_all())
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert server._locks == {}
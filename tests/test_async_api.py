@@ -0,0 +1,87 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from personal_chatbot.llm_chain_manager import LLMChainManager
+
+LATENCIES = [0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4]
+
+
+class NoThreadsExecutor(ThreadPoolExecutor):
+    def submit(self, *args, **kwargs):
+        raise AssertionError("async path must not hand work to a thread")
+
+
+@pytest.fixture
+def providers(fake_provider):
+    return [
+        fake_provider(f"Fake-async-{i}", response=f"answer {i}", latency=latency)
+        for i, latency in enumerate(LATENCIES)
+    ]
+
+
+def build(provider):
+    manager = LLMChainManager(system_prompt="Be brief.", temperature=0.5)
+    manager.init_llm(provider)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+def run_without_threads(coroutine):
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(NoThreadsExecutor())
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_concurrent_conversations_take_max_not_sum_of_latencies(providers):
+    managers = [build(provider) for provider in providers]
+
+    async def converse(manager):
+        await manager.asend("first")
+        return await manager.asend("second")
+
+    async def run_all():
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(converse(m) for m in managers))
+        return responses, time.perf_counter() - start
+
+    responses, elapsed = run_without_threads(run_all())
+
+    assert responses == [f"answer {i}" for i in range(len(managers))]
+    assert elapsed < 2 * max(LATENCIES) + 0.3
+    assert elapsed < 2 * sum(LATENCIES) / 2
+    for manager in managers:
+        history = manager.memory.load_memory_variables({})["chat_history"]
+        assert [m.content for m in history][::2] == ["first", "second"]
+
+
+def test_astream_yields_chunks_on_the_event_loop(providers):
+    manager = build(providers[0])
+
+    async def collect():
+        return [chunk async for chunk in manager.astream("hi")]
+
+    assert run_without_threads(collect()) == ["answer", " 0"]
+
+
+def test_abatch_answers_independent_inputs_without_touching_memory(providers):
+    manager = build(providers[-1])
+
+    start = time.perf_counter()
+    responses = run_without_threads(manager.abatch(["a", "b", "c", "d"]))
+
+    assert responses == ["answer 7"] * 4
+    assert time.perf_counter() - start < 2 * LATENCIES[-1]
+    assert manager.memory.load_memory_variables({})["chat_history"] == []
+
+
+def test_send_returns_the_whole_response(providers):
+    manager = build(providers[0])
+    assert manager.send("hi") == "answer 0"
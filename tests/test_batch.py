@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import json
+import time
+
+import pytest
+
+from personal_chatbot.batch import completed_ids, iter_inputs, iter_rows, run_batch
+from personal_chatbot.llm_chain_manager import SCHEDULER, LLMChainManager
+from personal_chatbot.templates import PromptTemplate, keyed_rows
+
+
+def build(provider):
+    manager = LLMChainManager(system_prompt="Be brief.", temperature=0.5)
+    manager.init_llm(provider)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+@pytest.fixture
+def provider(fake_provider):
+    name = fake_provider("Fake-batch", response="done", latency=0.1)
+    yield name
+    SCHEDULER.reset(name)
+
+
+def read_output(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+
+def test_inputs_are_read_from_jsonl_csv_text_and_directories(tmp_path):
+    (tmp_path / "in.jsonl").write_text('{"id": "a", "input": "x"}\n\n{"input": "y"}\n')
+    (tmp_path / "in.csv").write_text("id,input\nc,z\n,w\n")
+    (tmp_path / "in.txt").write_text("first\n\nsecond\n")
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "one.md").write_text("body")
+
+    assert list(iter_inputs(str(tmp_path / "in.jsonl"))) == [("a", "x"), ("3", "y")]
+    assert list(iter_inputs(str(tmp_path / "in.csv"))) == [("c", "z"), ("2", "w")]
+    assert list(iter_inputs(str(tmp_path / "in.txt"))) == [
+        ("1", "first"),
+        ("3", "second"),
+    ]
+    assert list(iter_inputs(str(tmp_path / "docs"))) == [
+        (str(tmp_path / "docs" / "one.md"), "body")
+    ]
+
+
+def test_batch_runs_concurrently_and_writes_every_result(provider, tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    inputs = [(str(i), f"question {i}") for i in range(8)]
+
+    start = time.perf_counter()
+    counts = asyncio.run(run_batch(build(provider), inputs, output, concurrency=8))
+    elapsed = time.perf_counter() - start
+
+    assert counts == (8, 0, 0)
+    assert elapsed < 0.5
+    records = read_output(output)
+    assert sorted(record["id"] for record in records) == [str(i) for i in range(8)]
+    assert all(record["output"] == "done" for record in records)
+
+
+def test_interrupted_batch_resumes_and_retries_failures(provider, tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text(
+        '{"id": "0", "output": "done"}\n'
+        '{"id": "1", "error": "RateLimitError()"}\n'
+        '{"id": "2", "outp'
+    )
+    assert completed_ids(str(output)) == {"0"}
+
+    inputs = [(str(i), f"question {i}") for i in range(3)]
+    counts = asyncio.run(run_batch(build(provider), inputs, str(output)))
+
+    assert counts == (2, 0, 1)
+    assert completed_ids(str(output)) == {"0", "1", "2"}
+
+
+def test_batch_is_paced_by_the_provider_rate_limit(provider, tmp_path):
+    SCHEDULER.configure(provider, requests_per_minute=600)
+    SCHEDULER.limiter(provider).requests.level = 1
+    inputs = [(str(i), "q") for i in range(3)]
+
+    start = time.perf_counter()
+    asyncio.run(
+        run_batch(build(provider), inputs, str(tmp_path / "out.jsonl"), concurrency=3)
+    )
+
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_template_row_missing_a_value_fails_alone(provider, tmp_path):
+    source = tmp_path / "jobs.csv"
+    source.write_text("id,JOB_POSITION\na,Engineer\nb,\nc,Analyst\n")
+    output = str(tmp_path / "out.jsonl")
+    template = PromptTemplate("Cover letter for [JOB_POSITION]")
+
+    def run():
+        inputs = keyed_rows(iter_rows(str(source)))
+        render = functools.partial(template.render, strict=True)
+        return asyncio.run(run_batch(build(provider), inputs, output, render=render))
+
+    assert run() == (2, 1, 0)
+    records = {record["id"]: record for record in read_output(output)}
+    assert records["a"]["input"] == "Cover letter for Engineer"
+    assert records["c"]["output"] == "done"
+    assert "JOB_POSITION" in records["b"]["error"]
+    # A rerun retries only the bad row
+    assert run() == (0, 1, 2)
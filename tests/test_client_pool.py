@@ -0,0 +1,51 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.language_models.llms import LLM
+
+from personal_chatbot.client_pool import ClientPool
+
+
+class TemperatureLLM(LLM):
+    temperature: float = 0.7
+    client: object = None
+
+    @property
+    def _llm_type(self):
+        return "temperature-llm"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        return str(self.temperature)
+
+
+def test_same_key_returns_the_warm_client():
+    pool = ClientPool()
+    params = {"responses": ["a"]}
+
+    first = pool.get("Fake", FakeListChatModel, params, 0.5)
+    second = pool.get("Fake", FakeListChatModel, dict(params), 0.5)
+
+    assert first is second
+    assert (pool.hits, pool.misses) == (1, 1)
+
+
+def test_temperature_variants_share_the_base_client():
+    pool = ClientPool()
+    shared_http_client = object()
+    params = {"client": shared_http_client}
+
+    cold = pool.get("Temp", TemperatureLLM, params, 0.0)
+    warm = pool.get("Temp", TemperatureLLM, params, 1.0)
+
+    assert cold is not warm
+    assert (cold.temperature, warm.temperature) == (0.0, 1.0)
+    assert cold.client is warm.client is shared_http_client
+    assert warm.invoke("hi") == "1.0"
+
+
+def test_least_recently_used_clients_are_evicted():
+    pool = ClientPool(max_size=2)
+    for name in ("a", "b", "c"):
+        pool.get(name, FakeListChatModel, {"responses": [name]})
+
+    assert len(pool) == 2
+    pool.get("a", FakeListChatModel, {"responses": ["a"]})
+    assert pool.misses == 4
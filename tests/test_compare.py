@@ -0,0 +1,94 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from personal_chatbot.chatbot_gr import GradioChatbot
+from personal_chatbot.compare import ProviderComparison, format_stats
+from personal_chatbot.history_store import ChatHistoryStore
+from personal_chatbot.llm_chain_manager import LLM_PROVIDERS
+
+LATENCIES = [0.1, 0.2, 0.3]
+
+
+@pytest.fixture
+def providers(fake_provider):
+    return [
+        fake_provider(f"Fake-compare-{i}", response=f"answer from {i}", latency=latency)
+        for i, latency in enumerate(LATENCIES)
+    ]
+
+
+async def collect(comparison, user_input):
+    texts, stats = {}, {}
+    async for provider, chunk, provider_stats in comparison.astream(user_input):
+        texts[provider] = texts.get(provider, "") + chunk
+        if provider_stats is not None:
+            stats[provider] = provider_stats
+    return texts, stats
+
+
+def test_compare_takes_the_slowest_provider_not_the_sum(providers):
+    comparison = ProviderComparison(providers, "Be brief.", 0.5)
+
+    start = time.perf_counter()
+    texts, stats = asyncio.run(collect(comparison, "hello"))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < sum(LATENCIES)
+    assert texts == {name: f"answer from {i}" for i, name in enumerate(providers)}
+    for name, latency in zip(providers, LATENCIES):
+        assert stats[name]["error"] is None
+        assert stats[name]["latency"] >= latency
+        assert stats[name]["completion_tokens"] > 0
+        assert "tokens" in format_stats(stats[name])
+
+
+def test_a_failing_provider_does_not_stop_the_others(providers, fake_provider):
+    failing = fake_provider("Fake-compare-failing", error_rate=1.0)
+    comparison = ProviderComparison(providers[:1] + [failing], "Be brief.", 0.5)
+
+    texts, stats = asyncio.run(collect(comparison, "hello"))
+
+    assert texts[providers[0]] == "answer from 0"
+    assert stats[failing]["error"]
+    assert format_stats(stats[failing]).startswith("Error:")
+
+
+def test_each_provider_keeps_its_own_conversation(providers):
+    comparison = ProviderComparison(providers[:2], "Be brief.", 0.5)
+
+    asyncio.run(collect(comparison, "first"))
+    asyncio.run(collect(comparison, "second"))
+
+    for manager in comparison.managers.values():
+        assert len(manager.memory.chat_memory.messages) == 4
+
+
+def test_gradio_compare_streams_into_selected_columns(providers):
+    chatbot = GradioChatbot(history_store=ChatHistoryStore(":memory:"))
+    request = SimpleNamespace(session_hash="compare")
+
+    async def run():
+        return [
+            updates
+            async for updates in chatbot.compare_providers(
+                providers[:2], "hello", request
+            )
+        ]
+
+    all_updates = asyncio.run(run())
+
+    columns = sorted(LLM_PROVIDERS)
+    visible = {
+        column for column, update in zip(columns, all_updates[0]) if update["visible"]
+    }
+    assert visible == set(providers[:2])
+    final = {}
+    for updates in all_updates[1:]:
+        for column, update in zip(columns, updates):
+            if "value" in update:
+                final[column] = update["value"]
+    assert final[providers[0]].startswith("answer from 0\n\n[")
+    assert final[providers[1]].startswith("answer from 1\n\n[")
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.run import compare
+from personal_chatbot.fake_llm import FakeChatModel, FakeLLMError
+
+
+def test_streams_response_token_by_token_with_usage():
+    model = FakeChatModel(response="one two three")
+
+    chunks = list(model.stream("hello"))
+
+    assert [chunk.content for chunk in chunks] == ["one", " two", " three"]
+    assert chunks[-1].usage_metadata["output_tokens"] == 3
+
+
+def test_latency_and_token_rate_are_simulated():
+    model = FakeChatModel(response="a b c d e", latency=0.05, tokens_per_second=100)
+
+    start = time.perf_counter()
+    asyncio.run(model.ainvoke("hello"))
+
+    assert time.perf_counter() - start >= 0.05 + 5 / 100
+
+
+def test_error_rate_is_reproducible_with_seed():
+    def outcomes():
+        model = FakeChatModel(error_rate=0.5, seed=7)
+        results = []
+        for _ in range(20):
+            try:
+                model.invoke("hello")
+                results.append(True)
+            except FakeLLMError:
+                results.append(False)
+        return results
+
+    first = outcomes()
+    assert first == outcomes()
+    assert 0 < first.count(False) < 20
+
+
+def test_connect_latency_is_paid_once_per_instance():
+    model = FakeChatModel(connect_latency=0.05)
+    start = time.perf_counter()
+    model.invoke("hello")
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.invoke("hello")
+
+    assert time.perf_counter() - start < cold
+
+
+@pytest.mark.parametrize(
+    "previous, current, regressed",
+    [
+        ({"seconds": 1.0}, {"seconds": 1.1}, False),
+        ({"seconds": 1.0}, {"seconds": 1.5}, True),
+        ({"requests_per_second": 10.0}, {"requests_per_second": 7.0}, True),
+        ({"requests_per_second": 10.0}, {"requests_per_second": 20.0}, False),
+    ],
+)
+def test_benchmark_comparison_flags_regressions(previous, current, regressed):
+    regressions = compare({"results": {"m": current}}, {"results": {"m": previous}})
+    assert bool(regressions) is regressed
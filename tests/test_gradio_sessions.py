@@ -0,0 +1,104 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from personal_chatbot.chatbot_gr import GradioChatbot
+from personal_chatbot.history_store import ChatHistoryStore
+
+# The fake model takes this long to answer "pong"
+RESPONSE_LATENCY = 0.2
+
+
+@pytest.fixture
+def pong_provider(fake_provider):
+    def register(max_concurrency=64):
+        return fake_provider(
+            "Fake",
+            {"max_concurrency": max_concurrency},
+            response="pong",
+            latency=RESPONSE_LATENCY,
+        )
+
+    return register
+
+
+def request(session_id):
+    return SimpleNamespace(session_hash=session_id)
+
+
+async def run_sessions(chatbot, engine, n_sessions):
+    async def converse(session_id):
+        chatbot.choose_engine(engine, request(session_id))
+        outputs = [
+            output async for output in chatbot.send_message("ping", request(session_id))
+        ]
+        return outputs[-1]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(converse(f"s{i}") for i in range(n_sessions)))
+    return results, time.perf_counter() - start
+
+
+def test_sessions_keep_separate_conversations(pong_provider):
+    chatbot = GradioChatbot(history_store=ChatHistoryStore(":memory:"))
+    engine = pong_provider()
+
+    asyncio.run(run_sessions(chatbot, engine, 2))
+    chatbot.clear_memory(request("s0"))
+
+    assert chatbot.get_session(request("s0")).chat_history == []
+    assert chatbot.get_session(request("s1")).chat_history == ["USER: ping", "AI: pong"]
+
+
+def test_throughput_scales_with_concurrent_sessions(pong_provider):
+    chatbot = GradioChatbot(history_store=ChatHistoryStore(":memory:"))
+    engine = pong_provider()
+
+    _, single = asyncio.run(run_sessions(chatbot, engine, 1))
+    results, concurrent = asyncio.run(run_sessions(chatbot, engine, 16))
+
+    assert results == ["USER: ping\nAI: pong"] * 16
+    # 16 sessions finish in far less than 16 times the single-session latency
+    assert concurrent < 4 * single
+
+
+def test_provider_concurrency_limit_queues_excess_requests(pong_provider):
+    chatbot = GradioChatbot(history_store=ChatHistoryStore(":memory:"))
+    engine = pong_provider(max_concurrency=1)
+
+    _, elapsed = asyncio.run(run_sessions(chatbot, engine, 4))
+
+    assert elapsed >= 4 * RESPONSE_LATENCY
+
+
+def test_session_can_resume_a_stored_conversation(pong_provider):
+    chatbot = GradioChatbot(history_store=ChatHistoryStore(":memory:"))
+    engine = pong_provider()
+    asyncio.run(run_sessions(chatbot, engine, 1))
+    stored_id = chatbot.get_session(request("s0")).session_id
+
+    chatbot.choose_engine(engine, request("tab"))
+    status, output = chatbot.resume_session(stored_id, request("tab"))
+
+    session = chatbot.get_session(request("tab"))
+    assert status == "Resumed session: s0"
+    assert output == "USER: ping\nAI: pong"
+    assert session.session_id == session.llm_chain_manager.session_id == "s0"
+    assert session.llm_chain_manager.memory.chat_memory is session.message_log
+    history = session.llm_chain_manager.memory.load_memory_variables({})
+    assert [m.content for m in history["chat_history"]] == ["ping", "pong"]
+
+
+def test_user_prompt_template_form_fills_the_input():
+    chatbot = GradioChatbot(history_store=ChatHistoryStore(":memory:"))
+    text, *fields = chatbot.set_user_prompt("cover_letter_writing")
+
+    assert "[COMPANY]" in text
+    assert [field["label"] for field in fields if field["visible"]] == [
+        "JOB_POSITION",
+        "COMPANY",
+    ]
+    filled = chatbot.fill_template("cover_letter_writing", "Engineer", "Acme")
+    assert "Engineer at Acme" in filled and "[" not in filled
@@ -0,0 +1,77 @@
+import pytest
+
+from personal_chatbot.history_store import ChatHistoryStore
+from personal_chatbot.memory import TokenBudgetMemory
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite3"))
+    yield store
+    store.close()
+
+
+def fill(store, session_id, exchanges):
+    for i in range(exchanges):
+        store.append_exchange(session_id, f"question {i}", f"answer {i}")
+
+
+def test_turns_survive_reopening_the_store(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    store = ChatHistoryStore(path)
+    fill(store, "a", 2)
+    store.close()
+
+    reopened = ChatHistoryStore(path)
+    assert [row[3] for row in reopened.page("a")] == [
+        "question 0",
+        "answer 0",
+        "question 1",
+        "answer 1",
+    ]
+    reopened.close()
+
+
+def test_sessions_are_listed_most_recent_first(store):
+    fill(store, "old", 1)
+    fill(store, "new", 3)
+
+    assert [(row[0], row[3]) for row in store.sessions()] == [("new", 6), ("old", 2)]
+
+
+def test_turns_are_paged_lazily_newest_first(store):
+    fill(store, "a", 5)
+    fill(store, "b", 1)
+
+    turns = store.iter_turns("a", page_size=3)
+
+    assert next(turns)[3] == "answer 4"
+    assert [row[3] for row in turns][-1] == "question 0"
+
+
+def test_resume_replays_latest_exchanges_into_memory(store):
+    fill(store, "a", 5)
+    memory = TokenBudgetMemory(max_tokens=0, strategy="buffer")
+
+    messages = store.resume("a", memory, turns=2)
+
+    assert messages == [
+        ("user", "question 3"),
+        ("ai", "answer 3"),
+        ("user", "question 4"),
+        ("ai", "answer 4"),
+    ]
+    history = memory.load_memory_variables({})["chat_history"]
+    assert [message.content for message in history] == [m[1] for m in messages]
+
+
+def test_plain_text_export_writes_whole_session(store, tmp_path):
+    fill(store, "a", 600)
+    filename = str(tmp_path / "chat.txt")
+
+    assert store.dump_as_plain_text("a", filename) == filename
+
+    lines = open(filename).read().splitlines()
+    assert len(lines) == 1200
+    assert lines[0] == "USER: question 0"
+    assert lines[-1] == "AI: answer 599"
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from personal_chatbot.instrumentation import MetricsRecorder
+from personal_chatbot.llm_chain_manager import LLMChainManager
+
+
+@pytest.fixture
+def manager(fake_provider, tmp_path):
+    def build(config=None, **params):
+        provider = fake_provider("Fake-metrics", config, response="pong", **params)
+        manager = LLMChainManager(system_prompt="Be brief.", temperature=0.5)
+        manager.metrics = MetricsRecorder(str(tmp_path / "metrics.jsonl"))
+        manager.init_llm(provider)
+        manager.init_prompt()
+        manager.init_memory()
+        manager.init_llm_chain()
+        return manager
+
+    return build
+
+
+def test_each_call_is_recorded_in_buffer_and_jsonl(manager, tmp_path):
+    manager = manager()
+    list(manager.stream("ping"))
+    asyncio.run(manager.asend("ping again"))
+
+    records = manager.metrics.records("Fake-metrics")
+    assert len(records) == 2
+    for record in records:
+        assert record["error"] is None
+        assert 0 <= record["time_to_first_token"] <= record["latency"]
+        assert record["completion_tokens"] == 1
+        assert record["prompt_tokens"] > 0
+    assert records[1]["queue_wait"] >= 0
+
+    lines = (tmp_path / "metrics.jsonl").read_text().splitlines()
+    assert [json.loads(line)["latency"] for line in lines] == [
+        record["latency"] for record in records
+    ]
+
+
+def test_errors_are_recorded(manager):
+    manager = manager(error_rate=1.0)
+    with pytest.raises(Exception):
+        list(manager.stream("ping"))
+
+    (record,) = manager.metrics.records()
+    assert "FakeLLMError" in record["error"]
+
+
+def test_summary_reports_percentiles_per_provider():
+    recorder = MetricsRecorder(buffer_size=51)
+    for latency in range(1, 101):
+        recorder.record(provider="A", latency=float(latency), error=None)
+    recorder.record(provider="B", latency=1.0, error="boom")
+
+    summary = recorder.summary()
+
+    assert summary["A"]["calls"] == 50
+    assert summary["A"]["latency_p50"] == pytest.approx(75.5)
+    assert summary["A"]["latency_p99"] == pytest.approx(99.51)
+    assert summary["B"]["errors"] == 1
+    assert summary["B"]["latency_p95"] is None
+
+
+def test_memory_summaries_are_recorded(manager):
+    manager = manager({"memory": "hybrid"}, context_window=60)
+
+    for _ in range(2):
+        asyncio.run(manager.asend("x" * 80))
+
+    assert manager.memory.summary == "pong"
+    # Two turns and the summary of the first one
+    assert len(manager.metrics.records("Fake-metrics")) == 3
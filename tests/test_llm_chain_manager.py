@@ -0,0 +1,91 @@
+import sys
+
+import pytest
+
+from personal_chatbot import llm_chain_manager
+from personal_chatbot.llm_chain_manager import (
+    LLMChainManager,
+    provider_import_report,
+    resolve_provider_class,
+)
+
+# Streamed by the fake model in two chunks
+RESPONSE = "pong, pong"
+
+
+@pytest.fixture
+def provider(fake_provider, monkeypatch):
+    monkeypatch.setattr(llm_chain_manager, "_PROVIDER_CLASSES", {})
+    monkeypatch.setattr(llm_chain_manager, "_PROVIDER_IMPORT_TIMES", {})
+    return fake_provider("Fake", response=RESPONSE)
+
+
+def test_provider_sdks_are_not_imported_at_module_load():
+    for module in ("langchain_anthropic", "langchain_cohere", "langchain_groq"):
+        assert module not in sys.modules
+
+
+def test_provider_class_is_resolved_on_first_use(provider):
+    assert provider_import_report()[provider] is None
+
+    llm_class = resolve_provider_class(provider)
+
+    assert llm_class.__name__ == "FakeChatModel"
+    assert provider_import_report()[provider] >= 0
+
+
+def test_init_llm_uses_lazy_registry(provider):
+    manager = LLMChainManager(system_prompt="Be brief.", temperature=0.0)
+    manager.init_llm(provider)
+    assert manager.llm.invoke("ping").content == RESPONSE
+
+
+def make_manager(provider):
+    manager = LLMChainManager(system_prompt="Be brief.", temperature=0.0)
+    manager.init_llm(provider)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+def test_stream_yields_chunks_and_commits_memory(provider):
+    manager = make_manager(provider)
+
+    chunks = list(manager.stream("ping"))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == RESPONSE
+    messages = manager.memory.load_memory_variables({})["chat_history"]
+    assert [m.content for m in messages] == ["ping", RESPONSE]
+    assert 0 <= manager.last_timings["time_to_first_token"]
+    assert manager.last_timings["time_to_first_token"] <= manager.last_timings["total"]
+
+
+def test_abandoned_stream_leaves_memory_untouched(provider):
+    manager = make_manager(provider)
+
+    stream = manager.stream("ping")
+    next(stream)
+    stream.close()
+
+    assert manager.memory.load_memory_variables({})["chat_history"] == []
+
+
+def test_reconfiguring_keeps_client_and_memory(provider):
+    manager = make_manager(provider)
+    llm, memory = manager.llm, manager.memory
+
+    manager.set_system_prompt("Be verbose.")
+    assert manager.llm is llm
+
+    manager.set_temperature(1.0)
+    # The pooled variant for the new temperature
+    assert manager.llm.temperature == 1.0
+    assert manager.memory is memory
+    assert manager.prompt.messages[0].content == "Be verbose."
+
+
+def test_unknown_provider_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_provider_class("Nope")
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from personal_chatbot import memory as memory_module
+from personal_chatbot.memory import TokenBudgetMemory, count_tokens
+
+# Each message below is exactly 10 tokens long
+MESSAGE = "x" * 40
+
+
+def chat(memory, turns):
+    for i in range(turns):
+        memory.save_context({"human_input": f"{i}{MESSAGE[1:]}"}, {"text": MESSAGE})
+
+
+def history(memory):
+    return memory.load_memory_variables({})["chat_history"]
+
+
+def test_buffer_keeps_everything():
+    memory = TokenBudgetMemory(max_tokens=0, strategy="buffer")
+    chat(memory, 5)
+    assert len(history(memory)) == 10
+
+
+def test_window_drops_oldest_messages_beyond_budget():
+    memory = TokenBudgetMemory(max_tokens=45, strategy="window")
+    chat(memory, 5)
+
+    messages = history(memory)
+    assert len(messages) == 4
+    assert messages[0].content.startswith("3")
+    assert memory.total_tokens == 40
+
+
+def test_window_always_keeps_latest_exchange():
+    memory = TokenBudgetMemory(max_tokens=1, strategy="window")
+    chat(memory, 3)
+    assert [m.content[0] for m in history(memory)] == ["2", "x"]
+
+
+def test_each_message_is_counted_once(monkeypatch):
+    calls = []
+
+    def counting(text):
+        calls.append(text)
+        return count_tokens(text)
+
+    monkeypatch.setattr(memory_module, "count_tokens", counting)
+    memory = TokenBudgetMemory(max_tokens=25, strategy="window")
+    chat(memory, 20)
+
+    assert len(calls) == 40
+
+
+def test_summary_folds_old_turns_into_rolling_summary():
+    llm = FakeListChatModel(responses=["first summary", "second summary"])
+    memory = TokenBudgetMemory(max_tokens=1000, strategy="summary", llm=llm)
+    chat(memory, 3)
+
+    messages = history(memory)
+    assert memory.summary == "second summary"
+    assert messages[0].content.endswith("second summary")
+    assert [m.content[0] for m in messages[1:]] == ["2", "x"]
+
+
+def test_hybrid_summarizes_only_what_does_not_fit():
+    llm = FakeListChatModel(responses=["old"])
+    memory = TokenBudgetMemory(max_tokens=45, strategy="hybrid", llm=llm)
+    chat(memory, 2)
+    assert memory.summary == ""
+
+    chat(memory, 1)
+
+    assert memory.summary == "old"
+    assert len(history(memory)) == 1 + 4
+
+
+def test_clear_resets_summary_and_counts():
+    llm = FakeListChatModel(responses=["old"])
+    memory = TokenBudgetMemory(max_tokens=1, strategy="hybrid", llm=llm)
+    chat(memory, 3)
+    memory.clear()
+
+    assert history(memory) == []
+    assert memory.total_tokens == 0
+    assert memory.token_counts == []
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        TokenBudgetMemory(max_tokens=1, strategy="forever")
+
+
+def test_async_save_summarizes_through_ainvoke():
+    calls = []
+
+    async def ainvoke(prompt):
+        calls.append(prompt)
+        return "async summary"
+
+    def invoke(prompt):
+        raise AssertionError("blocking summary call")
+
+    memory = TokenBudgetMemory(
+        max_tokens=1000, strategy="summary", invoke=invoke, ainvoke=ainvoke
+    )
+    for i in range(2):
+        asyncio.run(
+            memory.asave_context({"human_input": f"{i}{MESSAGE[1:]}"}, {"text": "ok"})
+        )
+
+    assert memory.summary == "async summary"
+    assert len(calls) == 1
+    assert [m.content[0] for m in history(memory)[1:]] == ["1", "o"]
+
+
+def test_replayed_turns_are_trimmed_without_summarizing():
+    memory = TokenBudgetMemory(max_tokens=45, strategy="hybrid")
+    for i in range(5):
+        memory.add_turn(f"{i}{MESSAGE[1:]}", MESSAGE)
+
+    assert memory.summary == ""
+    assert [m.content[0] for m in history(memory)] == ["3", "x", "4", "x"]
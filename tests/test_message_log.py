@@ -0,0 +1,80 @@
+from langchain.schema import AIMessage, HumanMessage
+
+from benchmarks import bench_message_log
+from personal_chatbot.memory import TokenBudgetMemory
+from personal_chatbot.message_log import USER, MessageLog
+
+# Each message below is exactly 10 tokens long
+MESSAGE = "x" * 40
+PREFIXES = {"user": "USER: ", "ai": "AI: "}
+
+
+def chat(memory, turns):
+    for i in range(turns):
+        memory.save_context({"human_input": f"{i}{MESSAGE[1:]}"}, {"text": MESSAGE})
+
+
+def test_views_render_the_same_records():
+    log = MessageLog()
+    log.add_messages([HumanMessage(content="ping"), AIMessage(content="pong")])
+
+    lines = log.lines(PREFIXES)
+    assert lines == ["USER: ping", "AI: pong"]
+    assert lines[-1:] == ["AI: pong"]
+    assert [type(m) for m in log.messages] == [HumanMessage, AIMessage]
+    assert log.records[0].role is USER
+
+
+def test_trimmed_turns_stay_visible_but_leave_the_context():
+    log = MessageLog()
+    memory = TokenBudgetMemory(chat_memory=log, max_tokens=45, strategy="window")
+    chat(memory, 5)
+
+    assert len(log.lines(PREFIXES)) == 10
+    assert len(memory.load_memory_variables({})["chat_history"]) == 4
+    assert log.messages[0].content.startswith("3")
+
+
+def test_old_turns_outside_the_context_are_spilled(tmp_path):
+    spill_path = tmp_path / "session.jsonl"
+    log = MessageLog(max_messages=6, spill_path=str(spill_path))
+    memory = TokenBudgetMemory(chat_memory=log, max_tokens=25, strategy="window")
+    chat(memory, 10)
+
+    assert len(log.records) <= 6
+    assert len(log) == 20
+    spilled = list(log.spilled())
+    assert len(spilled) + len(log.records) == 20
+    assert spilled[0][:2] == ("user", f"0{MESSAGE[1:]}")
+    assert len(log.messages) == 2
+
+    memory.clear()
+    assert len(log) == 0
+    assert not spill_path.exists()
+
+
+def test_messages_in_context_are_never_evicted():
+    log = MessageLog(max_messages=4)
+    memory = TokenBudgetMemory(chat_memory=log, max_tokens=0, strategy="buffer")
+    chat(memory, 5)
+
+    assert len(log.records) == 10
+    assert len(log.messages) == 10
+
+
+def test_new_memory_starts_a_new_context_on_the_same_log():
+    log = MessageLog()
+    chat(TokenBudgetMemory(chat_memory=log, max_tokens=1000), 2)
+    log.start_context()
+    memory = TokenBudgetMemory(chat_memory=log, max_tokens=1000)
+    chat(memory, 1)
+
+    assert len(log.lines(PREFIXES)) == 6
+    assert len(memory.load_memory_variables({})["chat_history"]) == 2
+
+
+def test_benchmark_reports_both_representations(tmp_path):
+    results = bench_message_log.run(50, str(tmp_path))
+    assert results["turns"] == 50
+    assert results["legacy_bytes"] > 0
+    assert results["message_log_bytes"] > 0
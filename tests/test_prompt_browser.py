@@ -0,0 +1,38 @@
+import json
+
+from personal_chatbot.prompt_browser import MAX_LISTED, parse_temperature
+from personal_chatbot.prompt_store import PromptStore
+from personal_chatbot.prompts_managers import PromptDumpManager
+
+
+def library(tmp_path, count):
+    filename = tmp_path / "prompts.json"
+    filename.write_text(
+        json.dumps({f"prompt {i:05}": f"text {i}" for i in range(count)})
+    )
+    store = PromptStore(str(tmp_path / "prompts.sqlite3"))
+    return PromptDumpManager(str(filename), "user prompt", store=store)
+
+
+def test_names_are_sorted_filtered_and_limited(tmp_path):
+    manager = library(tmp_path, 10000)
+
+    assert len(manager.names(limit=MAX_LISTED)) == MAX_LISTED
+    assert manager.names("PROMPT 0999") == [f"prompt 0999{i}" for i in range(10)]
+    assert manager.names("missing") == []
+
+
+def test_set_prompt_updates_one_entry(tmp_path):
+    manager = library(tmp_path, 3)
+    manager.set_prompt("prompt 00001", "edited")
+    manager.dump_content()
+
+    saved = json.loads((tmp_path / "prompts.json").read_text())
+    assert saved["prompt 00001"] == "edited"
+    assert saved["prompt 00002"] == "text 2"
+
+
+def test_parse_temperature():
+    assert parse_temperature("0.5") == 0.5
+    assert parse_temperature("1.5") is None
+    assert parse_temperature("warm") is None
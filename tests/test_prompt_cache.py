@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+import pytest
+from langchain.schema import HumanMessage, SystemMessage
+
+from personal_chatbot import prompt_cache
+from personal_chatbot.fake_llm import FakeChatModel
+from personal_chatbot.instrumentation import MetricsRecorder
+from personal_chatbot.llm_chain_manager import Configuration, LLMChainManager
+from personal_chatbot.prompt_cache import (
+    ANTHROPIC_CACHE_HEADERS,
+    CACHE_CONTROL,
+    GEMINI_MIN_CACHE_TOKENS,
+    GeminiContextCache,
+    mark_cacheable,
+)
+
+LONG_PROMPT = "You are a meticulous reviewer. " * 400
+
+
+class CachingModel(FakeChatModel):
+    default_headers: Optional[dict] = None
+    cached_content: Optional[str] = None
+
+
+@pytest.fixture
+def provider(fake_provider):
+    def register(name, prompt_caching=True, **config):
+        return fake_provider(
+            name,
+            {**config, "class": CachingModel},
+            response="ok",
+            prompt_caching=prompt_caching,
+        )
+
+    return register
+
+
+def build(provider, system_prompt=LONG_PROMPT):
+    manager = LLMChainManager(system_prompt=system_prompt, temperature=0.5)
+    manager.metrics = MetricsRecorder()
+    manager.init_llm(provider)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+def test_mark_cacheable_puts_cache_control_on_the_last_block():
+    message = SystemMessage(content="Be brief.")
+
+    marked = mark_cacheable(message)
+
+    assert marked.content == [
+        {"type": "text", "text": "Be brief.", "cache_control": CACHE_CONTROL}
+    ]
+    assert message.content == "Be brief."
+
+
+def test_anthropic_prefix_is_written_once_then_read(provider):
+    manager = build(provider("Fake-anthropic-cache", prompt_cache="anthropic"))
+
+    for question in ("first", "second", "third"):
+        manager.send(question)
+
+    records = manager.metrics.records()
+    assert records[0]["cache_write_tokens"] > 0
+    assert records[0]["cache_read_tokens"] == 0
+    # Later turns read the system prompt and all but the newest history
+    assert records[1]["cache_read_tokens"] >= records[0]["cache_write_tokens"]
+    assert records[2]["cache_read_tokens"] > records[1]["cache_read_tokens"]
+    summary = manager.metrics.summary()["Fake-anthropic-cache"]
+    assert summary["cache_read_tokens"] > summary["cache_write_tokens"]
+    assert manager.llm.default_headers == ANTHROPIC_CACHE_HEADERS
+
+
+def test_history_marker_does_not_touch_stored_memory(provider):
+    manager = build(provider("Fake-anthropic-cache", prompt_cache="anthropic"))
+    manager.send("first")
+
+    inputs = manager._chain_inputs("second")
+
+    assert "cache_control" in inputs["chat_history"][-1].content[-1]
+    assert isinstance(manager.memory.chat_memory.messages[-1].content, str)
+
+
+def test_providers_without_prompt_caching_are_unchanged(provider):
+    manager = build(provider("Fake-no-cache"))
+    asyncio.run(manager.asend("first"))
+
+    messages = manager.prompt.format_messages(
+        chat_history=[HumanMessage(content="q")], human_input="x"
+    )
+    assert messages[0].content == LONG_PROMPT
+    record = manager.metrics.records()[0]
+    assert record["cache_read_tokens"] == record["cache_write_tokens"] == 0
+
+
+def test_gemini_sends_long_system_prompts_by_cached_content(provider, monkeypatch):
+    created = []
+
+    def create(self, model, system_prompt, api_key, proxy):
+        created.append(model)
+        return f"cachedContents/{len(created)}", 5000
+
+    monkeypatch.setattr(GeminiContextCache, "_create", create)
+    monkeypatch.setattr(prompt_cache, "GEMINI_CONTEXT_CACHE", GeminiContextCache())
+    monkeypatch.setattr(prompt_cache, "GEMINI_MIN_CACHE_TOKENS", 100)
+    name = provider(
+        "Fake-gemini-cache",
+        prompt_caching=False,
+        prompt_cache="gemini",
+        cache_model="models/fake-001",
+    )
+
+    manager = build(name)
+    build(name).send("again")
+    manager.send("hello")
+
+    assert created == ["models/fake-001"]
+    assert manager.llm.cached_content == "cachedContents/1"
+    messages = manager.prompt.format_messages(chat_history=[], human_input="x")
+    assert [message.type for message in messages] == ["human"]
+    assert manager.metrics.records()[0]["cache_read_tokens"] == 5000
+
+    manager.set_system_prompt(LONG_PROMPT + "Also be kind.")
+    assert manager.llm.cached_content == "cachedContents/2"
+
+
+def test_short_gemini_prompts_are_not_cached(provider):
+    name = provider(
+        "Fake-gemini-short", prompt_cache="gemini", cache_model="models/fake-001"
+    )
+    assert len("Be brief.") < GEMINI_MIN_CACHE_TOKENS
+
+    manager = build(name, system_prompt="Be brief.")
+
+    assert manager.cached_prefix_tokens == 0
+    assert manager.prompt.format_messages(chat_history=[], human_input="x")[0].type == (
+        "system"
+    )
+
+
+def test_gemini_cache_is_not_locked_while_creating(monkeypatch):
+    release = threading.Event()
+
+    def create(self, model, system_prompt, api_key, proxy):
+        if system_prompt.startswith("slow"):
+            release.wait(5)
+        return f"cachedContents/{system_prompt[:4]}", 5000
+
+    monkeypatch.setattr(GeminiContextCache, "_create", create)
+    monkeypatch.setattr(prompt_cache, "GEMINI_MIN_CACHE_TOKENS", 1)
+    cache = GeminiContextCache()
+    cache.get("models/fake-001", "fast prompt")
+    slow = threading.Thread(target=cache.get, args=("models/fake-001", "slow prompt"))
+    slow.start()
+
+    try:
+        start = time.perf_counter()
+        assert cache.get("models/fake-001", "fast prompt")[0] == "cachedContents/fast"
+        assert time.perf_counter() - start < 1
+    finally:
+        release.set()
+        slow.join()
+    assert cache.get("models/fake-001", "slow prompt")[0] == "cachedContents/slow"
+    assert cache.write_tokens == 10000
+
+
+def test_gemini_cache_is_created_through_the_proxy_only_if_given(provider, monkeypatch):
+    proxies = []
+
+    def create(self, model, system_prompt, api_key, proxy):
+        proxies.append(proxy)
+        return "cachedContents/1", 5000
+
+    monkeypatch.setattr(GeminiContextCache, "_create", create)
+    monkeypatch.setattr(prompt_cache, "GEMINI_CONTEXT_CACHE", GeminiContextCache())
+    monkeypatch.setattr(prompt_cache, "GEMINI_MIN_CACHE_TOKENS", 100)
+    monkeypatch.setattr(Configuration, "PROXY", "http://127.0.0.1:3128")
+    name = provider(
+        "Fake-gemini-direct", prompt_cache="gemini", cache_model="models/fake-001"
+    )
+
+    build(name)
+    prompt_cache.prompt_cache_params(
+        {"prompt_cache": "gemini", "cache_model": "models/fake-002"},
+        {"api_key": "key"},
+        LONG_PROMPT,
+        "http://127.0.0.1:3128",
+    )
+
+    # Only providers marked "use_proxy" go through it
+    assert proxies == [None, "http://127.0.0.1:3128"]
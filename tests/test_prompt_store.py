@@ -0,0 +1,113 @@
+import json
+import threading
+
+import pytest
+
+from personal_chatbot.prompt_store import PromptStore
+from personal_chatbot.prompts_managers import SystemPromptSelector
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "prompts.sqlite3")
+
+
+def test_upserts_are_versioned(path):
+    store = PromptStore(path)
+    assert store.upsert("system prompt", "default", "Be brief.", 0.5) == 1
+    assert store.upsert("system prompt", "default", "Be precise.", 0.2) == 2
+
+    assert store.get("system prompt", "default") == (0.2, "Be precise.", 2)
+    assert [row[:3] for row in store.versions("system prompt", "default")] == [
+        (2, 0.2, "Be precise."),
+        (1, 0.5, "Be brief."),
+    ]
+
+
+def test_stale_edits_are_refused(path):
+    store = PromptStore(path)
+    store.upsert("user prompt", "explain", "Explain this.")
+    store.upsert("user prompt", "explain", "Explain this code.", expected_version=1)
+
+    with pytest.raises(ValueError):
+        store.upsert("user prompt", "explain", "Stale edit", expected_version=1)
+    assert store.get("user prompt", "explain")[1] == "Explain this code."
+
+
+def test_writes_from_other_connections_are_seen(path):
+    first, second = PromptStore(path), PromptStore(path)
+    generation = first.generation
+    second.upsert("user prompt", "new", "Added elsewhere")
+
+    assert first.generation != generation
+    assert first.names("user prompt") == ["new"]
+
+
+def test_concurrent_writers_keep_every_entry(path):
+    stores = [PromptStore(path) for _ in range(4)]
+
+    def write(index, store):
+        for i in range(25):
+            store.upsert("user prompt", f"w{index}-{i}", "text")
+            store.upsert("user prompt", "shared", f"w{index}-{i}")
+
+    threads = [
+        threading.Thread(target=write, args=(index, store))
+        for index, store in enumerate(stores)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert PromptStore(path).count("user prompt") == 101
+    assert PromptStore(path).get("user prompt", "shared")[2] == 100
+
+
+def test_names_filter_without_reading_bodies(path):
+    store = PromptStore(path)
+    for name in ("Code review", "code_golf", "Summary"):
+        store.upsert("user prompt", name, "x" * 100000)
+
+    assert store.names("user prompt", "CODE") == ["Code review", "code_golf"]
+    assert store.names("user prompt", "_") == ["code_golf"]
+    assert store.names("user prompt", limit=1) == ["Code review"]
+
+
+def test_search_follows_updates(path):
+    store = PromptStore(path)
+    store.upsert("user prompt", "query", "Write a SQL query")
+    store.upsert("user prompt", "query", "Write a pandas expression")
+
+    assert store.search("SQL") == []
+    assert store.search("pandas")[0][:2] == ("user prompt", "query")
+
+
+def test_json_round_trip(path, tmp_path):
+    source = tmp_path / "system_prompts.json"
+    source.write_text(json.dumps({"default": [0.5, "Be brief."], "poet": [1, "Rhyme"]}))
+    store = PromptStore(path)
+
+    assert store.import_json("system prompt", str(source)) == 2
+    assert store.import_json("system prompt", str(source)) == 0
+    exported = tmp_path / "export.json"
+    store.export_json("system prompt", str(exported))
+    assert json.loads(exported.read_text()) == json.loads(source.read_text())
+
+
+def test_selector_seeds_an_empty_library_from_json(path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "system_prompts.json").write_text(
+        json.dumps({"default": [0.5, "Be brief."]})
+    )
+    selector = SystemPromptSelector(PromptStore(path))
+
+    assert selector.get_prompts()["default"] == (0.5, "Be brief.")
+    assert "missing" not in selector.get_prompts()
+    selector.set_prompt("terse", (0.1, "One line."))
+    assert selector.names() == ["default", "terse"]
+    selector.dump_content()
+    assert json.loads((tmp_path / "system_prompts.json").read_text())["terse"] == [
+        0.1,
+        "One line.",
+    ]
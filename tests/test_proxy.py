@@ -1,50 +1,144 @@
+import asyncio
 import os
+from typing import Any
 
-import google.generativeai as genai
-from dotenv import load_dotenv
-from google.api_core import retry
+import pytest
+import requests
 
-load_dotenv()
+from personal_chatbot.fake_llm import FakeChatModel
+from personal_chatbot.llm_chain_manager import Configuration, LLMChainManager
+from personal_chatbot.proxy import PROXY_ADAPTERS, PROXY_ROUTES
 
-proxy = os.getenv("PROXY")
-os.environ["http_proxy"] = proxy
-os.environ["HTTP_PROXY"] = proxy
-os.environ["https_proxy"] = proxy
-os.environ["HTTPS_PROXY"] = proxy
+PROXY = "http://127.0.0.1:3128"
+PROXY_ENV = ("http_proxy", "HTTP_PROXY", "https_proxy", "HTTPS_PROXY")
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
 
-try:
-    name = ""
-    print("Available models:")
-    for m in genai.list_models():
-        if "generateContent" in m.supported_generation_methods:
-            print(m.name)
-        if "1.5" in m.name:
-            name = m.name
+class HttpxModel(FakeChatModel):
+    http_client: Any = None
+    http_async_client: Any = None
 
-    if name:
-        model = genai.GenerativeModel(name)
 
-        response = model.generate_content(
-            "Test", request_options={"retry": retry.Retry()}
-        ).text.strip()
+class GoogleRestModel(FakeChatModel):
+    transport: str = "grpc"
+    client: Any = None
 
-        print(f"{'-'*80}")
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        session = requests.Session()
+        self.client = type("Client", (), {})()
+        self.client._transport = type("Transport", (), {"_session": session})()
 
-        print(
-            "The expected answer is something like:\n"
-            "'Test received. I am online and responding. How can I assist you today?'"
+
+@pytest.fixture
+def providers(fake_provider, monkeypatch):
+    monkeypatch.setattr(Configuration, "PROXY", PROXY)
+    for model in (HttpxModel, GoogleRestModel):
+        monkeypatch.setitem(
+            PROXY_ADAPTERS,
+            f"{model.__module__}.{model.__name__}",
+            "httpx" if model is HttpxModel else "google_rest",
         )
+    entries = {
+        "Fake-proxied-httpx": {"class": HttpxModel, "use_proxy": True},
+        "Fake-proxied-google": {"class": GoogleRestModel, "use_proxy": True},
+        "Fake-direct": {"class": HttpxModel, "use_proxy": False},
+    }
+    for name, entry in entries.items():
+        fake_provider(name, entry)
+    return entries
+
+
+def init_llm(provider):
+    manager = LLMChainManager(system_prompt="Be brief.", temperature=0.5)
+    manager.init_llm(provider)
+    return manager.llm
+
+
+def test_proxy_is_set_on_the_provider_client_not_the_environment(providers):
+    before = {name: os.environ.get(name) for name in PROXY_ENV}
+
+    llm = init_llm("Fake-proxied-httpx")
+
+    assert llm.http_client is PROXY_ROUTES.httpx_client(PROXY)
+    assert llm.http_async_client is PROXY_ROUTES.httpx_async_client(PROXY)
+    assert {name: os.environ.get(name) for name in PROXY_ENV} == before
+
+
+def test_direct_providers_stay_direct_next_to_proxied_ones(providers):
+    init_llm("Fake-proxied-httpx")
+    init_llm("Fake-proxied-google")
+
+    assert init_llm("Fake-direct").http_client is None
+
+
+def test_google_client_uses_the_rest_transport_through_the_proxy(providers):
+    llm = init_llm("Fake-proxied-google")
+
+    session = llm.chat_model.client._transport._session
+    assert llm.chat_model.transport == "rest"
+    assert session.proxies == {"http": PROXY, "https": PROXY}
+    assert not session.trust_env
+
+
+def test_proxied_clients_share_one_connection_pool_per_route(providers, fake_provider):
+    fake_provider(
+        "Fake-proxied-httpx-2", {"class": HttpxModel, "use_proxy": True}, response="x"
+    )
+
+    first = init_llm("Fake-proxied-httpx")
+    second = init_llm("Fake-proxied-httpx-2")
+
+    assert first is not second
+    assert first.http_client is second.http_client
+    assert PROXY_ROUTES.httpx_client("http://127.0.0.1:3129") is not first.http_client
+
+
+def test_unsupported_clients_fail_instead_of_bypassing_the_proxy(
+    providers, fake_provider
+):
+    fake_provider("Fake-unsupported", {"use_proxy": True})
+
+    with pytest.raises(ValueError, match="not supported"):
+        init_llm("Fake-unsupported")
+
+
+def test_google_client_without_a_requests_session_is_rejected(
+    providers, fake_provider, monkeypatch
+):
+    monkeypatch.setattr(
+        GoogleRestModel,
+        "__init__",
+        lambda self, **kwargs: FakeChatModel.__init__(self, **kwargs),
+    )
+    # Own params, so the pooled client built by other tests is not reused
+    fake_provider(
+        "Fake-proxied-google-sessionless",
+        {"class": GoogleRestModel, "use_proxy": True},
+        response="x",
+    )
+
+    with pytest.raises(ValueError, match="client._transport._session"):
+        init_llm("Fake-proxied-google-sessionless")
+
+
+def test_google_client_async_calls_use_the_proxied_blocking_transport(
+    providers, monkeypatch
+):
+    async def direct(self, *args, **kwargs):
+        raise AssertionError("the async transport bypasses the proxy")
+
+    async def direct_stream(self, *args, **kwargs):
+        await direct(self)
+        yield
 
-        print(f"{'-'*80}")
+    monkeypatch.setattr(GoogleRestModel, "_agenerate", direct)
+    monkeypatch.setattr(GoogleRestModel, "_astream", direct_stream)
+    llm = init_llm("Fake-proxied-google")
 
-        print(f"The actual answer is:\n" f"'{response}'")
+    async def call():
+        chunks = [chunk.content async for chunk in llm.astream("hi")]
+        return "".join(chunks), (await llm.ainvoke("hi")).content
 
-        print(f"{'-'*80}")
-    else:
-        print("No suitable models?")
+    streamed, invoked = asyncio.run(call())
 
-except Exception as e:
-    print(e)
+    assert streamed == invoked == llm.chat_model.response
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from personal_chatbot.fake_llm import FakeLLMError
+from personal_chatbot.llm_chain_manager import SCHEDULER, LLMChainManager
+from personal_chatbot.rate_limiter import (
+    ProviderLimiter,
+    is_retryable,
+    retry_after,
+)
+
+
+@pytest.fixture
+def provider(fake_provider):
+    def register(name="Fake-limited", params=None, **limits):
+        fake_provider(name, limits, response="ok", **(params or {}))
+        SCHEDULER.reset(name)
+        return name
+
+    yield register
+    SCHEDULER.reset()
+
+
+def build(provider, session_id=None):
+    manager = LLMChainManager(system_prompt="Be brief.", temperature=0.5)
+    manager.session_id = session_id
+    manager.init_llm(provider)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+def test_requests_per_minute_spaces_out_requests():
+    limiter = ProviderLimiter(requests_per_minute=600)
+    limiter.requests.level = 0
+
+    async def run():
+        await asyncio.gather(*(limiter.acquire("s") for _ in range(3)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+
+    assert time.perf_counter() - start >= 0.25
+    assert limiter.stats()["granted"] == 3
+    assert limiter.stats()["wait_max"] >= 0.25
+
+
+def test_token_debt_delays_the_next_request():
+    limiter = ProviderLimiter(tokens_per_minute=6000)
+    limiter.acquire_sync("s", tokens=100)
+    # The call used far more than it reserved
+    limiter.settle(limiter.tokens.level + 10)
+
+    start = time.perf_counter()
+    limiter.acquire_sync("s", tokens=10)
+
+    assert time.perf_counter() - start >= 0.15
+
+
+def test_waiting_sessions_are_served_round_robin():
+    limiter = ProviderLimiter(requests_per_minute=1200)
+    limiter.requests.level = 0
+    order = []
+
+    async def request(session):
+        await limiter.acquire(session)
+        order.append(session)
+
+    async def run():
+        batch = [asyncio.create_task(request("batch")) for _ in range(5)]
+        await asyncio.sleep(0)
+        await asyncio.gather(request("chat"), *batch)
+
+    asyncio.run(run())
+
+    assert order.index("chat") <= 1
+
+
+def test_sync_and_async_callers_share_the_budget():
+    limiter = ProviderLimiter(requests_per_minute=600)
+    limiter.requests.level = 0
+    thread = threading.Thread(target=limiter.acquire_sync, args=("tk",))
+
+    start = time.perf_counter()
+    thread.start()
+    asyncio.run(limiter.acquire("gradio"))
+    thread.join()
+
+    assert time.perf_counter() - start >= 0.15
+
+
+def test_rate_limited_calls_are_retried_after_retry_after(provider):
+    name = provider(
+        requests_per_minute=6000,
+        params={"rate_limited_calls": 2, "retry_after": 0.05},
+    )
+    manager = build(name)
+
+    start = time.perf_counter()
+    response = asyncio.run(manager.asend("hello"))
+
+    assert response == "ok"
+    assert time.perf_counter() - start >= 0.1
+    stats = SCHEDULER.stats()[name]
+    assert stats["retries"] == 2
+    assert stats["throttled"] == 2
+    assert stats["granted"] == 3
+
+
+def test_blocking_stream_retries_too(provider, monkeypatch):
+    name = provider(params={"rate_limited_calls": 1})
+    monkeypatch.setattr("personal_chatbot.rate_limiter.BACKOFF_BASE", 0.01)
+
+    assert build(name).send("hello") == "ok"
+
+
+def test_other_errors_are_not_retried(provider):
+    name = provider(params={"error_rate": 1.0})
+
+    with pytest.raises(FakeLLMError):
+        asyncio.run(build(name).asend("hello"))
+
+
+def test_retry_after_and_status_are_read_from_provider_errors():
+    response = SimpleNamespace(status_code=429, headers={"retry-after": "7"})
+    error = Exception("Too Many Requests")
+    error.response = response
+
+    assert is_retryable(error)
+    assert retry_after(error) == 7.0
+    assert not is_retryable(SimpleNamespace(status_code=401))
+    assert is_retryable(RuntimeError("rate limit exceeded"))
+
+
+def test_retries_are_counted_under_the_lock():
+    limiter = ProviderLimiter(requests_per_minute=60)
+
+    threads = [
+        threading.Thread(target=lambda: [limiter.note_retry() for _ in range(1000)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert limiter.stats()["retries"] == 8000
@@ -0,0 +1,135 @@
+import threading
+import time
+
+from personal_chatbot.request_worker import RequestWorker
+
+
+class FakeRoot:
+    """Stand-in for Tk that runs root.after callbacks from an explicit loop."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay_ms, callback):
+        self.scheduled.append(callback)
+
+    def run_until(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "timed out"
+            callbacks, self.scheduled = self.scheduled, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.005)
+
+    def run_for(self, seconds):
+        deadline = time.monotonic() + seconds
+        self.run_until(lambda: time.monotonic() >= deadline)
+
+
+def test_callbacks_run_on_the_polling_thread():
+    root = FakeRoot()
+    worker = RequestWorker(root)
+    main_thread = threading.current_thread()
+    seen = {}
+
+    def on_chunk(chunk):
+        seen.setdefault("chunk_threads", set()).add(threading.current_thread())
+
+    worker.submit(
+        lambda: iter(["a", "b"]),
+        on_chunk=on_chunk,
+        on_done=lambda response: seen.update(response=response),
+    )
+    root.run_until(lambda: "response" in seen)
+
+    assert seen["response"] == "ab"
+    assert seen["chunk_threads"] == {main_thread}
+    assert not worker.busy
+
+
+def test_requests_are_queued_while_one_is_in_flight():
+    root = FakeRoot()
+    worker = RequestWorker(root)
+    release = threading.Event()
+    responses = []
+
+    def slow():
+        release.wait()
+        yield "first"
+
+    worker.submit(slow, on_done=responses.append)
+    worker.submit(lambda: iter(["second"]), on_done=responses.append)
+    assert worker.pending_count == 1
+
+    release.set()
+    root.run_until(lambda: len(responses) == 2)
+
+    assert responses == ["first", "second"]
+
+
+def test_cancel_starts_next_request_once_abandoned_one_winds_down():
+    root = FakeRoot()
+    worker = RequestWorker(root)
+    release = threading.Event()
+    closed = threading.Event()
+    responses = []
+
+    def blocked():
+        try:
+            yield "partial"
+            release.wait()
+            yield "never shown"
+        finally:
+            closed.set()
+
+    worker.submit(blocked, on_done=responses.append)
+    worker.submit(lambda: iter(["next"]), on_done=responses.append)
+
+    worker.cancel()
+    assert not worker.busy
+    root.run_for(0.1)
+    # The next request waits for the abandoned thread
+    assert responses == [] and worker.pending_count == 1
+
+    release.set()
+    root.run_until(lambda: responses == ["next"])
+    assert closed.wait(timeout=5)
+
+
+def test_cancel_after_last_chunk_skips_commit():
+    root = FakeRoot()
+    worker = RequestWorker(root)
+    last_chunk_sent, release = threading.Event(), threading.Event()
+    committed, responses, idle = [], [], []
+
+    def stream():
+        yield "whole answer"
+        last_chunk_sent.set()
+        release.wait()
+
+    worker.submit(stream, on_done=responses.append, commit=committed.append)
+    assert last_chunk_sent.wait(timeout=5)
+    worker.cancel()
+    worker.when_idle(lambda: idle.append(True))
+    assert idle == []
+
+    release.set()
+    root.run_until(lambda: idle)
+
+    assert committed == [] and responses == []
+
+
+def test_finished_request_is_committed_before_done():
+    root = FakeRoot()
+    worker = RequestWorker(root)
+    committed, responses = [], []
+
+    worker.submit(
+        lambda: iter(["a", "b"]),
+        on_done=lambda response: responses.append((response, list(committed))),
+        commit=committed.append,
+    )
+    root.run_until(lambda: responses)
+
+    assert responses == [("ab", ["ab"])]
@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from personal_chatbot import llm_chain_manager
+from personal_chatbot.llm_chain_manager import LLMChainManager
+from personal_chatbot.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_exact_hit_and_miss_are_counted(cache):
+    assert cache.get("scope", "hello") is None
+    cache.put("scope", "hello", "world")
+
+    assert cache.get("scope", "hello") == "world"
+    assert cache.get("other scope", "hello") is None
+    assert cache.stats() == {
+        "hits": 1,
+        "semantic_hits": 0,
+        "misses": 2,
+        "hit_rate": 1 / 3,
+        "entries": 1,
+    }
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put("s", "a", "1")
+    cache.put("s", "b", "2")
+    cache.get("s", "a")
+    cache.put("s", "c", "3")
+
+    assert cache.get("s", "b") is None
+    assert cache.get("s", "a") == "1"
+    assert cache.stats()["entries"] == 2
+
+
+def test_expired_entries_are_not_returned(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl=0.05)
+    cache.put("s", "a", "1")
+    time.sleep(0.1)
+    assert cache.get("s", "a") is None
+
+
+def test_semantic_mode_matches_near_duplicates(tmp_path):
+    cache = ResponseCache(
+        str(tmp_path / "cache.sqlite3"), semantic=True, similarity_threshold=0.8
+    )
+    cache.put("s", "Tailor my CV for the data engineer role at Acme", "done")
+
+    assert cache.get("s", "Tailor my CV for the data engineer role at Acme!") == "done"
+    assert cache.get("s", "Write a poem about the sea") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_manager_serves_repeated_deterministic_turns_from_cache(
+    fake_provider, monkeypatch, cache
+):
+    provider = fake_provider("Fake-cached", response="pong")
+    monkeypatch.setattr(llm_chain_manager, "_RESPONSE_CACHE", cache)
+
+    def ask(temperature):
+        manager = LLMChainManager(system_prompt="Be brief.", temperature=temperature)
+        manager.init_llm(provider)
+        manager.init_prompt()
+        manager.init_memory()
+        manager.init_llm_chain()
+        response = "".join(manager.stream("ping"))
+        # The pooled client of each temperature counts its provider calls
+        return response, manager.last_response_cached, manager.llm.calls
+
+    assert ask(0) == ("pong", False, 1)
+    assert ask(0) == ("pong", True, 1)
+    assert ask(0.5) == ("pong", False, 1)
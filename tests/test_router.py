@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+
+from personal_chatbot.llm_chain_manager import LLM_PROVIDERS, LLMChainManager
+from personal_chatbot.router import ProviderChainError, ProviderRouter
+
+
+@pytest.fixture
+def providers(fake_provider):
+    def register(name, response="ok", latency=0.0, fail=False, **params):
+        error_rate = 1.0 if fail else 0.0
+        return fake_provider(
+            name, response=response, latency=latency, error_rate=error_rate, **params
+        )
+
+    return register
+
+
+def history(router):
+    messages = router.memory.load_memory_variables({})["chat_history"]
+    return [message.content for message in messages]
+
+
+def test_fails_over_to_next_provider_on_error(providers):
+    chain = [providers("Broken", fail=True), providers("Backup", "from backup")]
+    router = ProviderRouter(chain, "Be brief.", 0.5)
+
+    assert router.send("hi") == "from backup"
+    assert router.last_provider == "Backup"
+    assert history(router) == ["hi", "from backup"]
+
+
+def test_fails_over_when_provider_times_out(providers):
+    chain = [providers("Slow", "late", latency=0.5), providers("Fast", "quick")]
+    router = ProviderRouter(chain, "Be brief.", 0.5, timeouts={"Slow": 0.1})
+
+    assert router.send("hi") == "quick"
+
+
+def test_blocking_stream_fails_over_when_provider_stalls(providers):
+    chain = [providers("Stalled", "late", latency=1), providers("Fast-2", "quick")]
+    router = ProviderRouter(chain, "Be brief.", 0.5, timeouts={"Stalled": 0.1})
+
+    start = time.perf_counter()
+    assert "".join(router.stream("hi")) == "quick"
+
+    assert time.perf_counter() - start < 0.5
+    assert router.last_provider == "Fast-2"
+    assert history(router) == ["hi", "quick"]
+
+
+def test_raises_when_every_provider_fails(providers):
+    chain = [providers("Broken-1", fail=True), providers("Broken-2", fail=True)]
+    router = ProviderRouter(chain, "Be brief.", 0.5)
+
+    with pytest.raises(ProviderChainError) as error:
+        router.send("hi")
+    assert [provider for provider, _ in error.value.errors] == chain
+    assert history(router) == []
+
+
+def test_hedged_request_keeps_the_faster_answer(providers):
+    chain = [providers("Slow-1", "slow", latency=0.3), providers("Fast-1", "fast")]
+    router = ProviderRouter(chain, "Be brief.", 0.5, hedge_after=0.05)
+
+    start = time.perf_counter()
+    assert router.send("hi") == "fast"
+
+    assert time.perf_counter() - start < 0.3
+    assert history(router) == ["hi", "fast"]
+
+
+def test_blocking_stream_hedges_a_silent_provider(providers):
+    chain = [providers("Slow-2", "slow", latency=0.3), providers("Fast-3", "fast")]
+    router = ProviderRouter(chain, "Be brief.", 0.5, hedge_after=0.05)
+
+    start = time.perf_counter()
+    assert "".join(router.stream("hi")) == "fast"
+
+    assert time.perf_counter() - start < 0.3
+    assert history(router) == ["hi", "fast"]
+
+
+def test_hedge_is_not_sent_when_primary_is_fast(providers):
+    chain = [providers("Quick", "quick"), providers("Unused", fail=True)]
+    router = ProviderRouter(chain, "Be brief.", 0.5, hedge_after=0.5)
+
+    assert asyncio.run(router.asend("hi")) == "quick"
+    assert router.last_provider == "Quick"
+
+
+def test_manager_falls_back_to_configured_provider(providers, monkeypatch):
+    backup = providers("Backup-2", "from backup")
+    broken = providers("Broken-3", fail=True)
+    monkeypatch.setitem(LLM_PROVIDERS[broken], "fallbacks", [backup])
+    manager = LLMChainManager(system_prompt="Be brief.", temperature=0.5)
+    manager.init_llm(broken)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+
+    async def collect():
+        return [chunk async for chunk in manager.astream("hi")]
+
+    assert "".join(asyncio.run(collect())) == "from backup"
+    assert manager.router.last_provider == backup
+    assert "".join(manager.stream("again")) == "from backup"
+    messages = manager.memory.load_memory_variables({})["chat_history"]
+    assert [m.content for m in messages] == [
+        "hi",
+        "from backup",
+        "again",
+        "from backup",
+    ]
+
+
+def test_hedge_waits_for_silence_not_for_the_whole_answer(providers):
+    # The primary starts at once but streams slowly; no hedge is sent
+    chain = [
+        providers("Steady", "one two three", tokens_per_second=5),
+        providers("Never", fail=True),
+    ]
+    router = ProviderRouter(chain, "Be brief.", 0.5, hedge_after=0.1)
+
+    assert router.send("hi") == "one two three"
+    assert router.last_provider == "Steady"
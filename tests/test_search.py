@@ -0,0 +1,67 @@
+import time
+
+from personal_chatbot.history_store import ChatHistoryStore, fts_query
+from personal_chatbot.prompt_store import PromptStore
+from personal_chatbot.search import search_all
+
+
+def test_free_text_becomes_a_safe_fts_query():
+    assert fts_query('pandas "groupby" -') == '"pandas" "groupby"*'
+    assert fts_query("?!") == ""
+
+
+def test_history_search_finds_turns_as_they_are_written(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite3"))
+    store.append_exchange("a", "How do I use pandas groupby?", "Call df.groupby(...)")
+    store.append_exchange("b", "Tell me a joke", "Why did the chicken...")
+
+    results = store.search("pandas groupby")
+
+    assert [(row[1], row[3]) for row in results] == [("a", "user")]
+    assert "[pandas]" in results[0][4]
+    assert store.search("chick") and not store.search("chick", session_id="a")
+
+
+def test_existing_history_is_indexed_on_open(tmp_path):
+    path = tmp_path / "history.sqlite3"
+    store = ChatHistoryStore(str(path))
+    store.append_exchange("a", "old question about regex", "answer")
+    store._connection.executescript(
+        "DROP TRIGGER turns_fts_insert; DROP TABLE turns_fts;"
+    )
+    store.close()
+
+    assert ChatHistoryStore(str(path)).search("regex")
+
+
+def test_search_over_tens_of_thousands_of_turns_is_fast():
+    store = ChatHistoryStore(":memory:")
+    for i in range(10000):
+        store.append_exchange(
+            f"s{i % 50}", f"question {i} about topic{i % 100}", f"answer {i}"
+        )
+    store.append_exchange("needle", "pandas groupby with multiple keys", "Use a list")
+
+    start = time.perf_counter()
+    results = store.search("pandas groupby")
+    elapsed = time.perf_counter() - start
+
+    assert results[0][1] == "needle"
+    assert elapsed < 0.1
+
+
+def test_search_all_merges_chats_and_prompt_libraries(tmp_path):
+    prompts = PromptStore(str(tmp_path / "prompts.sqlite3"))
+    prompts.upsert("system prompt", "to_json", "Convert text to JSON", 0.0)
+    prompts.upsert("user prompt", "cv", "Tailor my CV for [COMPANY]")
+    prompts.upsert("user prompt", "cv", "Rewrite my resume")
+    store = ChatHistoryStore(":memory:")
+    store.append_exchange("a", "Convert this to JSON please", "{}")
+
+    assert prompts.search("tailor") == []
+    assert [row[:2] for row in prompts.search("resume")] == [("user prompt", "cv")]
+    results = search_all("json", store, prompts)
+    assert {(r["source"], r["title"]) for r in results} == {
+        ("chat (user)", "a"),
+        ("system prompt", "to_json"),
+    }
@@ -0,0 +1,158 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from personal_chatbot.chatbot_gr import GradioChatbot
+from personal_chatbot.fake_llm import register_fake_provider
+from personal_chatbot.history_store import ChatHistoryStore
+from personal_chatbot.session_backend import (
+    RedisSessionBackend,
+    SQLiteSessionBackend,
+    open_session_backend,
+)
+
+ENGINE = "Fake-shared"
+BROWSER = SimpleNamespace(session_hash="browser-1")
+
+
+class DictRedis:
+    """
+    Minimal in-process stand-in for the Redis commands the backend uses.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hmget(self, key, fields):
+        return [self.hget(key, field) for field in fields]
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def hincrby(self, key, field, amount):
+        value = int(self.hget(key, field) or 0) + amount
+        self.hset(key, field, str(value))
+        return value
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def pipeline(self):
+        client, calls = self, []
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return lambda *args: calls.append((name, args))
+
+            def execute(self):
+                return [getattr(client, name)(*args) for name, args in calls]
+
+        return Pipeline()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteSessionBackend(str(tmp_path / "sessions.sqlite3"))
+    return RedisSessionBackend(DictRedis())
+
+
+def test_backend_versions_every_save(backend):
+    assert backend.load("s1") is None
+    assert backend.version("s1") == 0
+
+    assert backend.save("s1", {"engine": "A"}) == 1
+    assert backend.save("s1", {"engine": "B"}) == 2
+    assert backend.load("s1") == ({"engine": "B"}, 2)
+    assert backend.version("s2") == 0
+
+    backend.delete("s1")
+    assert backend.load("s1") is None
+
+
+def test_open_session_backend(tmp_path):
+    assert open_session_backend(None) is None
+    path = tmp_path / "sessions.sqlite3"
+    assert isinstance(open_session_backend(f"sqlite:///{path}"), SQLiteSessionBackend)
+    with pytest.raises(ValueError):
+        open_session_backend("postgres://localhost/chat")
+
+
+def test_unchanged_session_is_not_reloaded(fake_provider, tmp_path):
+    engine = fake_provider(ENGINE, response="pong")
+    chatbot = GradioChatbot(
+        history_store=ChatHistoryStore(":memory:"),
+        session_backend=SQLiteSessionBackend(str(tmp_path / "sessions.sqlite3")),
+    )
+    chatbot.choose_engine(engine, BROWSER)
+    manager = chatbot.get_session(BROWSER).llm_chain_manager
+
+    asyncio.run(collect(chatbot.send_message("ping", BROWSER)))
+
+    assert chatbot.get_session(BROWSER).llm_chain_manager is manager
+
+
+async def collect(outputs):
+    return [output async for output in outputs]
+
+
+_chatbot = None
+
+
+def worker_turn(backend_path, text, settings=False):
+    """
+    Serve one turn of BROWSER's conversation in this worker process, returning
+    what the worker saw.
+    """
+    global _chatbot
+    if _chatbot is None:
+        register_fake_provider(ENGINE, response="pong")
+        _chatbot = GradioChatbot(
+            history_store=ChatHistoryStore(":memory:"),
+            session_backend=SQLiteSessionBackend(backend_path),
+        )
+    if settings:
+        _chatbot.choose_engine(ENGINE, BROWSER)
+        _chatbot.change_temperature("0.3", BROWSER)
+        _chatbot.change_system_prompt("Answer in one word.", BROWSER)
+    outputs = asyncio.run(collect(_chatbot.send_message(text, BROWSER)))
+    session = _chatbot.get_session(BROWSER)
+    return {
+        "pid": os.getpid(),
+        "output": outputs[-1],
+        "engine": session.engine,
+        "temperature": session.llm_chain_manager.temperature,
+        "system_prompt": session.llm_chain_manager.system_prompt,
+        "memory": [
+            message.content
+            for message in session.llm_chain_manager.memory.chat_memory.messages
+        ],
+    }
+
+
+def test_conversation_continues_across_worker_processes(tmp_path):
+    backend_path = str(tmp_path / "sessions.sqlite3")
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as worker_a, ProcessPoolExecutor(
+        1, mp_context=context
+    ) as worker_b:
+        first = worker_a.submit(worker_turn, backend_path, "one", True).result()
+        second = worker_b.submit(worker_turn, backend_path, "two").result()
+        third = worker_a.submit(worker_turn, backend_path, "three").result()
+
+    assert first["pid"] == third["pid"] != second["pid"]
+    assert second["output"] == "USER: two\nAI: pong"
+    # Worker B picked up the settings chosen on worker A
+    assert second["engine"] == ENGINE
+    assert second["temperature"] == 0.3
+    assert second["system_prompt"] == "Answer in one word."
+    assert second["memory"] == ["one", "pong", "two", "pong"]
+    # and worker A caught up with the turn served by worker B
+    assert third["memory"] == ["one", "pong", "two", "pong", "three", "pong"]
@@ -0,0 +1,41 @@
+import pytest
+
+from personal_chatbot.batch import iter_rows
+from personal_chatbot.templates import PromptTemplate, compile_template, keyed_rows
+
+TEXT = "Cover letter for [JOB_POSITION] at [COMPANY], why I like [COMPANY]. [sic]"
+
+
+def test_placeholders_are_parsed_in_order_without_duplicates():
+    template = PromptTemplate(TEXT)
+    assert template.variables == ["JOB_POSITION", "COMPANY"]
+
+
+def test_render_substitutes_every_occurrence():
+    rendered = PromptTemplate(TEXT).render({"JOB_POSITION": "[CEO]", "COMPANY": "Acme"})
+    assert rendered == "Cover letter for [CEO] at Acme, why I like Acme. [sic]"
+
+
+def test_unfilled_placeholders_stay_unless_strict():
+    template = PromptTemplate(TEXT)
+    assert template.render({"COMPANY": "Acme"}).startswith("Cover letter for [JOB_")
+    with pytest.raises(ValueError, match="JOB_POSITION"):
+        template.render({"COMPANY": "Acme", "JOB_POSITION": ""}, strict=True)
+
+
+def test_templates_are_compiled_once():
+    compile_template.cache_clear()
+    assert compile_template(TEXT) is compile_template(TEXT)
+    assert compile_template.cache_info().misses == 1
+
+
+def test_csv_rows_are_keyed_by_id_or_number(tmp_path):
+    source = tmp_path / "jobs.csv"
+    source.write_text("id,JOB_POSITION,COMPANY\na,Engineer,Acme\n,Analyst,Initech\n")
+
+    rows = list(keyed_rows(iter_rows(str(source))))
+
+    assert [row_id for row_id, _ in rows] == ["a", "2"]
+    assert compile_template(TEXT).render(rows[0][1]) == (
+        "Cover letter for Engineer at Acme, why I like Acme. [sic]"
+    )
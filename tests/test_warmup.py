@@ -0,0 +1,102 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from personal_chatbot import warmup
+from personal_chatbot.chatbot_gr import GradioChatbot
+from personal_chatbot.fake_llm import FakeLLMError
+from personal_chatbot.history_store import ChatHistoryStore
+from personal_chatbot.llm_chain_manager import LLMChainManager
+
+# Simulated DNS + TLS cost of the first call on a fresh client
+CONNECT_LATENCY = 0.3
+
+
+@pytest.fixture
+def provider(fake_provider):
+    def register(name="Fake-cold", config=None, **params):
+        return fake_provider(
+            name, config, response="ok", connect_latency=CONNECT_LATENCY, **params
+        )
+
+    return register
+
+
+def build(provider):
+    manager = LLMChainManager(system_prompt="Be brief.", temperature=0.5)
+    manager.init_llm(provider)
+    manager.init_prompt()
+    manager.init_memory()
+    manager.init_llm_chain()
+    return manager
+
+
+def timed_send(manager):
+    start = time.perf_counter()
+    manager.send("hello")
+    return time.perf_counter() - start
+
+
+def test_first_message_after_warm_up_costs_no_more_than_later_ones(provider):
+    manager = build(provider())
+
+    assert manager.warm_up() >= CONNECT_LATENCY
+    first = timed_send(manager)
+    steady = timed_send(manager)
+
+    assert first < CONNECT_LATENCY / 3
+    assert first < steady + 0.05
+
+
+def test_async_warm_up_prepares_the_async_path(provider):
+    manager = build(provider("Fake-cold-async"))
+
+    async def run():
+        await manager.awarm_up()
+        start = time.perf_counter()
+        await manager.asend("hello")
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) < CONNECT_LATENCY / 3
+
+
+def test_bad_credentials_fail_the_warm_up(provider):
+    manager = build(provider("Fake-bad-key", error_rate=1.0))
+
+    with pytest.raises(FakeLLMError):
+        manager.warm_up()
+
+
+def test_ollama_models_are_preloaded(provider, monkeypatch):
+    calls = []
+
+    def post(url, json, timeout):
+        calls.append((url, json))
+        return SimpleNamespace(raise_for_status=lambda: None)
+
+    monkeypatch.setattr(warmup.httpx, "post", post)
+    manager = build(provider("Fake-ollama", {"warmup": "ollama"}))
+    manager.llm.__dict__["model"] = "phi3"
+
+    manager.warm_up()
+
+    assert calls == [
+        (
+            "http://localhost:11434/api/generate",
+            {"model": "phi3", "keep_alive": warmup.OLLAMA_KEEP_ALIVE},
+        )
+    ]
+
+
+def test_gradio_reports_warm_up_result(provider):
+    chatbot = GradioChatbot(history_store=ChatHistoryStore(":memory:"))
+    good = SimpleNamespace(session_hash="good")
+    bad = SimpleNamespace(session_hash="bad")
+
+    chatbot.choose_engine(provider("Fake-cold-gradio"), good)
+    chatbot.choose_engine(provider("Fake-bad-gradio", error_rate=1.0), bad)
+
+    assert "ready in" in asyncio.run(chatbot.warm_up_engine(good))
+    assert asyncio.run(chatbot.warm_up_engine(bad)).startswith("Error:")